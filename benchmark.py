@@ -0,0 +1,260 @@
+#!/usr/bin/python
+
+# Measures the cost of the referee itself : a synthetic engine (engines/bench.py) plays against bots
+# answering right away (bots/echo.py), for several values of Threads and several logging modes
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import datetime
+import platform
+import tempfile
+import threading
+import subprocess
+import multiprocessing as mp
+
+root = os.path.dirname(os.path.abspath(__file__))
+
+# Settings of the referee for every logging mode
+logging_modes = {'quiet':   {'Log stderr': False, 'Log scores': False},
+                 'scores':  {'Log stderr': False, 'Log scores': True},
+                 'stderr':  {'Log stderr': True,  'Log scores': True},
+                 'replays': {'Log stderr': True,  'Log scores': True, 'Record replays': True}}
+
+engine_modes = ('lines', 'framed', 'plugin')
+
+class Sampler(threading.Thread):
+    def __init__(self, pid, period=0.05):
+        ''' Follows the processes of the referee while it runs : the main process and the processes of its
+        pool, which are forks of it, but not the engines and bots. Their CPU time is read in /proc until they
+        exit, so the last period of every process is missed, and their peak memory is read from VmHWM.
+
+        Args:
+          pid    (int):   The main process of the referee
+          period (float): Time between two samples in seconds
+        '''
+        threading.Thread.__init__(self)
+        self.daemon  = True
+        self.pid     = pid
+        self.period  = period
+        self.cpu     = {}  # Last CPU time seen for every process, in seconds
+        self.hwm     = {}  # Peak resident memory of every process, in kB
+        self.stopped = threading.Event()
+        self.cmdline = None
+        self.ticks   = float(os.sysconf('SC_CLK_TCK'))
+
+    def processes(self):
+        ''' The pids of the referee processes alive '''
+        pids = [self.pid]
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open('/proc/{}/stat'.format(entry)) as f:
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+                if ppid != self.pid:
+                    continue
+                with open('/proc/{}/cmdline'.format(entry)) as f:
+                    if f.read() == self.cmdline:
+                        pids.append(int(entry))
+            except (IOError, OSError, ValueError, IndexError):
+                pass
+        return pids
+
+    def sample(self):
+        for pid in self.processes():
+            try:
+                with open('/proc/{}/stat'.format(pid)) as f:
+                    fields = f.read().rsplit(')', 1)[1].split()
+                with open('/proc/{}/status'.format(pid)) as f:
+                    hwm = [line for line in f if line.startswith('VmHWM:')]
+            except (IOError, OSError):
+                continue
+            self.cpu[pid] = (int(fields[11]) + int(fields[12])) / self.ticks
+            if hwm:
+                self.hwm[pid] = max(self.hwm.get(pid, 0), int(hwm[0].split()[1]))
+
+    def run(self):
+        try:
+            with open('/proc/{}/cmdline'.format(self.pid)) as f:
+                self.cmdline = f.read()
+        except (IOError, OSError):
+            return
+        while not self.stopped.is_set():
+            self.sample()
+            self.stopped.wait(self.period)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def make_config(args, threads, logging, engine):
+    ''' The configuration of the referee for one case of the benchmark '''
+    settings = {'Runs':                  args.games,
+                'Threads':               threads,
+                'Games per thread':      args.per_thread,
+                'Seed':                  1,
+                'Zygote':                args.zygote,
+                'Time limit':            10.0,
+                'Time limit first turn': 10.0}
+    settings.update(logging_modes[logging])
+
+    game = {'Name': 'Bench'}
+    options = {'players': args.players, 'turns': args.turns, 'lines': args.lines, 'line_size': args.line_size}
+    if engine == 'plugin':
+        game['Plugin']         = os.path.join(root, 'engines', 'bench.py') + ':BenchEngine'
+        game['Plugin options'] = options
+        game['Game bin']       = sys.executable
+        game['Arguments']      = []
+    else:
+        game['Game bin']  = sys.executable
+        game['Arguments'] = [os.path.join(root, 'engines', 'bench.py'), '$seed']
+        for key, value in sorted(options.items()):
+            game['Arguments'] += ['--' + key.replace('_', '-'), str(value)]
+        if engine == 'framed':
+            game['Arguments'] += ['--framed']
+        if not settings['Log stderr']:
+            # Nobody reads the logs of the engine then
+            game['Arguments'] += ['--quiet']
+
+    bots = [{'Name':      'echo_{}'.format(i+1),
+             'Bin':       sys.executable,
+             'Arguments': [os.path.join(root, 'bots', 'echo.py')]} for i in range(args.players)]
+    return {'Game': game, 'Bots': bots, 'Settings': settings}
+
+def run_case(config, work_dir, turns):
+    ''' Plays one session of the referee in its own folder
+
+    Args:
+      config   (dict):   The configuration of the referee, see make_config
+      work_dir (string): The folder of the session
+      turns    (int):    Turns played by every bot in a game
+
+    Returns:
+      The measures of the session, a dictionary
+    '''
+    if os.path.exists(work_dir):
+        shutil.rmtree(work_dir)
+    os.makedirs(work_dir)
+    with open(os.path.join(work_dir, 'bench.json'), 'w') as f:
+        json.dump(config, f, indent=2)
+
+    output  = open(os.path.join(work_dir, 'referee.out'), 'w')
+    t_start = time.time()
+    process = subprocess.Popen([sys.executable, os.path.join(root, 'referee.py'), 'bench.json'], cwd=work_dir,
+                               stdout=output, stderr=subprocess.STDOUT)
+    sampler = Sampler(process.pid)
+    sampler.start()
+    # wait4 gives the resources used by the referee and every process it waited for
+    pid, status, usage = os.wait4(process.pid, 0)
+    wall = time.time() - t_start
+    process.returncode = status
+    sampler.stop()
+    output.close()
+
+    games = config['Settings']['Runs']
+    turns = games * len(config['Bots']) * turns
+    return {'status':           status,
+            'wall':             wall,
+            'games_per_s':      games / wall,
+            'turns_per_s':      turns / wall,
+            'cpu_per_turn_us':  (usage.ru_utime + usage.ru_stime) / turns * 1e6,
+            'overhead_turn_us': sum(sampler.cpu.values()) / turns * 1e6,
+            'main_rss_kb':      sampler.hwm.get(process.pid, 0),
+            'peak_rss_kb':      sum(sampler.hwm.values())}
+
+def git_version():
+    ''' The commit of the referee, None if it is not known '''
+    try:
+        with open(os.devnull, 'w') as null:
+            return subprocess.check_output(['git', 'describe', '--always', '--dirty'], cwd=root,
+                                           stderr=null).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(cases, base_file):
+    ''' Prints the speed and memory of the cases relative to a previous benchmark '''
+    with open(base_file) as f:
+        base = json.load(f)
+    key = lambda case: (case['engine'], case['logging'], case['threads'])
+    previous = dict((key(case), case) for case in base['cases'])
+
+    print('Compared to {} ({}) :'.format(base_file, base.get('version')))
+    print('{:<8}{:<9}{:>8}{:>12}{:>12}{:>12}'.format('engine', 'logging', 'threads', 'turns/s', 'overhead', 'RSS'))
+    for case in cases:
+        old = previous.get(key(case))
+        if old is None:
+            continue
+        ratio = lambda name: float(case[name]) / old[name] if old[name] else float('nan')
+        print('{:<8}{:<9}{:>8}{:>11.2f}x{:>11.2f}x{:>11.2f}x'.format(case['engine'], case['logging'], case['threads'],
+                                                                    ratio('turns_per_s'), ratio('overhead_turn_us'),
+                                                                    ratio('peak_rss_kb')))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measures the cost of the referee with a synthetic engine '
+                                                 'and bots answering right away')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, mp.cpu_count()],
+                        help='Values of Threads to measure')
+    parser.add_argument('--logging', nargs='+', choices=sorted(logging_modes), default=['quiet', 'stderr'],
+                        help='Logging modes to measure : quiet (no logs), scores (Log scores), stderr '
+                             '(Log stderr and Log scores) and replays (stderr and Record replays)')
+    parser.add_argument('--engine', nargs='+', choices=engine_modes, default=['framed'],
+                        help='How the engine runs : its own process sending the lines one by one or framed, '
+                             'or a plugin')
+    parser.add_argument('--games', type=int, default=40, help='Games played by every session')
+    parser.add_argument('--per-thread', type=int, default=1, help='Games per thread')
+    parser.add_argument('--players', type=int, default=2, help='Players of the synthetic game')
+    parser.add_argument('--turns', type=int, default=100, help='Turns of every player')
+    parser.add_argument('--lines', type=int, default=10, help='Lines of input of a turn')
+    parser.add_argument('--line-size', type=int, default=32, help='Characters of these lines')
+    parser.add_argument('--zygote', action='store_true', help='Fork the engine and the bots from preloaded interpreters')
+    parser.add_argument('--repeat', type=int, default=1, help='Sessions played for every case, the fastest is kept')
+    parser.add_argument('--output', default='benchmark.json', help='Where the results are written')
+    parser.add_argument('--compare', metavar='FILE', help='Results of a previous benchmark to compare with')
+    parser.add_argument('--keep', action='store_true', help='Keep the folders of the sessions')
+    args = parser.parse_args()
+
+    work_root = tempfile.mkdtemp(prefix='cg_bench_')
+    cases     = []
+    print('{:<8}{:<9}{:>8}{:>9}{:>10}{:>11}{:>14}{:>12}{:>10}'.format('engine', 'logging', 'threads', 'wall s',
+                                                                      'games/s', 'turns/s', 'overhead us', 'cpu us',
+                                                                      'RSS MB'))
+    try:
+        for engine in args.engine:
+            for logging in args.logging:
+                for threads in args.threads:
+                    config   = make_config(args, threads, logging, engine)
+                    work_dir = os.path.join(work_root, '{}_{}_{}'.format(engine, logging, threads))
+                    runs     = [run_case(config, work_dir, args.turns) for i in range(max(1, args.repeat))]
+                    case     = min(runs, key=lambda r: r['wall'])
+                    case.update({'engine':  engine,
+                                 'logging': logging,
+                                 'threads': threads,
+                                 'walls':   [r['wall'] for r in runs]})
+                    cases.append(case)
+
+                    failed = ' (failed, see referee.out with --keep)' if case['status'] != 0 else ''
+                    print('{:<8}{:<9}{:>8}{:>9.2f}{:>10.2f}{:>11.0f}{:>14.1f}{:>12.1f}{:>10.1f}{}'.format(
+                        engine, logging, threads, case['wall'], case['games_per_s'], case['turns_per_s'],
+                        case['overhead_turn_us'], case['cpu_per_turn_us'], case['peak_rss_kb'] / 1024.0, failed))
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_root, ignore_errors=True)
+
+    results = {'version':    git_version(),
+               'date':       datetime.datetime.now().isoformat(),
+               'python':     platform.python_version(),
+               'platform':   platform.platform(),
+               'cores':      mp.cpu_count(),
+               'parameters': vars(args),
+               'cases':      cases}
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print('Results written to {}'.format(args.output))
+
+    if args.compare:
+        compare(cases, args.compare)
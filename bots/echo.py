@@ -0,0 +1,12 @@
+import sys
+
+# Zero-think bot for the synthetic engine (engines/bench.py) : the first line of a turn holds the
+# number of lines following it, and the bot answers right away with that first line
+while True:
+    line = sys.stdin.readline()
+    if not line:
+        break
+    for i in range(int(line)):
+        sys.stdin.readline()
+    sys.stdout.write(line)
+    sys.stdout.flush()
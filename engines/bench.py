@@ -0,0 +1,82 @@
+import os
+import sys
+import argparse
+from engine_io import send_turn_info # Without numpy, unlike the GITC engine
+
+
+class BenchEngine(object):
+    def __init__(self, log_file=None, players=2, turns=100, lines=10, line_size=32):
+        ''' A synthetic game measuring the cost of the referee (see benchmark.py). It has no rules : every
+        player gets the same number of lines every turn, its answer is ignored, and the ranking only depends
+        on the seed. The first line of a turn holds the number of lines following it, so that a bot can read
+        the turn without knowing the game (see bots/echo.py).
+
+        Args:
+          log_file  (file): Where one line per turn is logged, None to stay silent
+          players   (int):  Number of players
+          turns     (int):  Number of turns played by every player
+          lines     (int):  Number of lines sent to a player every turn
+          line_size (int):  Number of characters of these lines
+        '''
+        self.log_file  = log_file
+        self.players   = int(players)
+        self.turns     = int(turns)
+        self.lines     = max(1, int(lines))
+        self.line_size = int(line_size)
+
+    def init(self, seed):
+        ''' Starts a new game '''
+        self.seed    = int(seed)
+        self.turn    = 0
+        self.current = 0
+        filler       = ('{} '.format(self.seed) * (self.line_size // 2 + 1))[:self.line_size]
+        self.block   = '{}\n'.format(self.lines - 1) + (filler + '\n') * (self.lines - 1)
+
+    def next_request(self):
+        ''' Returns (-1, ranking) once every player played its turns, otherwise (N, block) with the N lines
+        of input of the current player '''
+        if self.turn >= self.turns:
+            first = self.seed % self.players
+            return -1, ' '.join(str((first + i) % self.players) for i in range(self.players))
+        return self.lines, self.block
+
+    def apply(self, action):
+        ''' Moves on to the next player, the answer being ignored '''
+        if self.log_file is not None:
+            self.log_file.write('Turn {} : player {} answers {}\n'.format(self.turn, self.current, action))
+        self.current += 1
+        if self.current == self.players:
+            self.current  = 0
+            self.turn    += 1
+
+
+# Main loop
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Synthetic engine for the benchmarks of cg_referee')
+    parser.add_argument('seed', nargs='?', default=1, type=int, help='Seed of the game, picking the ranking')
+    parser.add_argument('--players', type=int, default=2, help='Number of players')
+    parser.add_argument('--turns', type=int, default=100, help='Number of turns of every player')
+    parser.add_argument('--lines', type=int, default=10, help='Number of lines of input of a turn')
+    parser.add_argument('--line-size', type=int, default=32, help='Number of characters of these lines')
+    parser.add_argument('--framed', action='store_true',
+                        help='Send the inputs of the bots as one block announced with its size in bytes')
+    parser.add_argument('--quiet', action='store_true', help='Do not log the turns on stderr')
+    cmd_args = parser.parse_args()
+
+    log_stream = None if cmd_args.quiet else os.fdopen(sys.stderr.fileno(), 'w', 1 << 16)
+    engine = BenchEngine(log_stream, cmd_args.players, cmd_args.turns, cmd_args.lines, cmd_args.line_size)
+    engine.init(cmd_args.seed)
+    try:
+        while True:
+            code, block = engine.next_request()
+            if code < 0:
+                break
+
+            send_turn_info(code, block, cmd_args.framed)
+            engine.apply(raw_input())
+    finally:
+        if log_stream is not None:
+            log_stream.flush()
+
+    print(-1)
+    print(block)
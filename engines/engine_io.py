@@ -0,0 +1,18 @@
+import sys
+
+# The protocol of the engines running in their own process, shared by the engines of this folder.
+# Keep this module free of heavy imports : the engines are started for every game.
+
+def send_turn_info(n, block, framed=False):
+    ''' Writes the N lines of input of a player, held in block, for the referee
+
+    Args:
+      n      (int):    Number of lines of the block
+      block  (string): The lines, each one ending with a newline
+      framed (bool):   Announces the size of the block in bytes, so the referee reads it at once
+    '''
+    if framed:
+        sys.stdout.write('{} {}\n'.format(n, len(block)) + block)
+    else:
+        sys.stdout.write('{}\n'.format(n) + block)
+    sys.stdout.flush()
@@ -0,0 +1,591 @@
+import random
+import math
+import numpy as np
+
+# Simulator of the rules of Ghost in the Cell. It is used by the engine gitc.py, and can be imported
+# by bots or analysis tools to play turns on the exact same rules :
+#
+#   state = GitcState(seed)
+#   child = state.clone()
+#   child.step('MOVE 1 4 10', 'WAIT')
+#   if child.is_terminal(): ...
+
+min_factory_count = 7
+max_factory_count = 15
+min_prod_rate = 0
+max_prod_rate = 3
+min_tot_prod_rate = 4
+min_init_units = 15
+max_init_units = 30
+extra_space_between_fac = 300
+cost_increase_prod = 10
+damage_duration = 5
+max_turns = 200
+
+# The game state is stored as struct of arrays : one row per attribute, one column per entity.
+# The id of a factory is its column.
+F_X, F_Y, F_OWNER, F_CYBORGS, F_PROD, F_BLOCKED = range(6)
+T_OWNER, T_FROM, T_TO, T_CYBORGS, T_ETA = range(5)
+B_OWNER, B_FROM, B_TO, B_TIMER = range(4)
+
+
+class GameOver(Exception):
+    def __init__(self, result):
+        ''' Raised when the game is finished
+
+        Args:
+          result (string): The ranking of the players, or 'tied'
+        '''
+        Exception.__init__(self, result)
+        self.result = result
+
+
+def dist(x1, y1, x2, y2):
+    return math.sqrt((x1-x2)**2 + (y1-y2)**2)
+
+
+# Log levels, each one includes the messages of the previous ones
+LOG_OFF, LOG_SUMMARY, LOG_TURN, LOG_ACTION = range(4)
+log_levels = {'off': LOG_OFF, 'summary': LOG_SUMMARY, 'turn': LOG_TURN, 'action': LOG_ACTION}
+
+class Logger(object):
+    def __init__(self, stream=None, level='action'):
+        ''' Writes the messages of the game up to a level. The messages are given as a format string
+        and its arguments, and only formatted if their level is enabled :
+
+          log(LOG_ACTION, 'Player {} sending bomb from {} to {}', pid, f_from, f_to)
+
+        Args:
+          stream (file):   Where the messages are written, None to stay silent
+          level  (string): 'off', 'summary' (map and result), 'turn' (answers of the players) or
+                           'action' (everything)
+        '''
+        self.stream = stream
+        self.level  = log_levels[level] if stream is not None else LOG_OFF
+
+    def __call__(self, level, msg, *args):
+        if level <= self.level:
+            if args:
+                msg = msg.format(*args)
+            self.stream.write(msg + '\n')
+
+    def flush(self):
+        if self.stream is not None:
+            self.stream.flush()
+
+no_log = Logger()
+
+
+class GitcState(object):
+    def __init__(self, seed, log=no_log):
+        ''' Generates the map of a new game. The players are 1 (first player) and -1 (second player).
+
+        Args:
+          seed (int or string): Seed of the map generation. The engine uses the string given on its command line.
+          log  (Logger):        Where the messages describing the game are written
+        '''
+        self.log       = log
+        self.seed      = seed
+        self.troops    = np.zeros((5, 0), dtype=np.int64)
+        self.bombs     = np.zeros((4, 0), dtype=np.int64)
+        self.nbombs    = [2, 0, 2]
+        self.scores    = [0, 0, 0]
+        self.turn      = 0     # Number of turns played
+        self.result    = None  # Ranking once the game is over, see end_game
+        self.map_block = None  # Inputs of the first turn describing the map, see turn_payload
+        self.reset_payloads()
+        self.init(random.Random(seed))
+
+    def reset_payloads(self):
+        ''' Forgets the inputs of the players kept by turn_payload '''
+        self.payloads      = None  # Inputs of both players for the turn payload_turn
+        self.payload_turn  = None
+        self.factory_state = None  # Factories as they were when their lines were formatted
+        self.factory_lines = None  # Lines of the factories seen by each player
+
+    def clone(self):
+        ''' Returns an independent copy of the state. The distance table never changes so it is shared. '''
+        state = GitcState.__new__(GitcState)
+        state.log        = self.log
+        state.seed       = self.seed
+        state.factories  = self.factories.copy()
+        state.troops     = self.troops.copy()
+        state.bombs      = self.bombs.copy()
+        state.dist_table = self.dist_table
+        state.map_block  = self.map_block
+        state.nbombs     = list(self.nbombs)
+        state.scores     = list(self.scores)
+        state.turn       = self.turn
+        state.result     = self.result
+        state.reset_payloads()
+        return state
+
+    def is_terminal(self):
+        ''' Is the game over ? The ranking is then held by self.result. '''
+        return self.result is not None
+
+    def step(self, p1_orders, p2_orders):
+        ''' Plays one turn with the orders of both players
+
+        Args:
+          p1_orders (string): The output of the first player for this turn
+          p2_orders (string): The output of the second player for this turn
+
+        Returns:
+          True if the game is over
+        '''
+        try:
+            # Evolving the situation according to both players
+            self.evolve(p1_orders, p2_orders)
+
+            # Advancing turn info and checking for end of game
+            self.turn += 1
+            if self.turn > max_turns:
+                self.final_ranking()
+        except GameOver as e:
+            self.result = e.result
+        return self.is_terminal()
+
+    def init(self, rand):
+        log = self.log
+        log(LOG_SUMMARY, 'Initialising game')
+        log(LOG_SUMMARY, ' - Random seed = {}', self.seed)
+
+        factory_count = rand.randint(min_factory_count, max_factory_count)
+        if factory_count % 2 == 0:
+            factory_count += 1
+
+        factory_radius = 600 if factory_count > 10 else 700
+        min_space = 2 * (factory_radius + extra_space_between_fac)
+
+        factories = np.zeros((6, factory_count), dtype=np.int64)
+        self.factories = factories
+
+        log(LOG_SUMMARY, ' - n_factories = {}', factory_count)
+
+        # Adding one at the center
+        factories[F_X, 0]    = 8000
+        factories[F_Y, 0]    = 3250
+        factories[F_PROD, 0] = 0
+
+
+        total_prod = 0
+        i = 1
+        while i < factory_count:
+            x = rand.randint(0, 8000 - 2 * factory_radius) + factory_radius + extra_space_between_fac
+            y = rand.randint(0, 6500 - 2 * factory_radius) + factory_radius + extra_space_between_fac
+
+            valid = True
+            for fx, fy in zip(factories[F_X, :i].tolist(), factories[F_Y, :i].tolist()):
+                if dist(fx, fy, x, y) < min_space:
+                    valid = False
+                    break
+
+
+            if valid:
+                prod_rate = rand.randint(min_prod_rate, max_prod_rate)
+
+                if i == 1:
+                    init_unit = rand.randint(min_init_units, max_init_units)
+                else:
+                    init_unit = rand.randint(0, 5*prod_rate)
+
+                factories[F_X, i]       = x
+                factories[F_Y, i]       = y
+                factories[F_CYBORGS, i] = init_unit
+                factories[F_PROD, i]    = prod_rate
+
+                factories[F_X, i+1]       = 16000 - x
+                factories[F_Y, i+1]       = 6500  - y
+                factories[F_CYBORGS, i+1] = init_unit
+                factories[F_PROD, i+1]    = prod_rate
+
+                if i == 1:
+                    factories[F_OWNER, i]   = 1
+                    factories[F_OWNER, i+1] = -1
+                else:
+                    factories[F_OWNER, i]   = 0
+                    factories[F_OWNER, i+1] = 0
+
+
+                total_prod += 2 * prod_rate
+                i += 2
+
+        # Balancing the total production
+        i = 1
+        while total_prod < min_prod_rate:
+            if factories[F_PROD, i] < max_prod_rate:
+                factories[F_PROD, i] += 1
+                total_prod += 1
+
+            i += 1
+
+        # Computing the distances
+        # (the rounding of Python is kept on purpose, numpy rounds halves to even)
+        dist_table = np.zeros((factory_count, factory_count), dtype=np.int64)
+        xs = factories[F_X].tolist()
+        ys = factories[F_Y].tolist()
+        for f1 in range(factory_count-1):
+            for f2 in range(f1+1, factory_count):
+                d = int(round((dist(xs[f1], ys[f1], xs[f2], ys[f2]) - 2*factory_radius) / 800.0))
+                dist_table[f1, f2] = d
+                dist_table[f2, f1] = d
+        self.dist_table = dist_table
+
+        # Debug info
+        if log.level >= LOG_TURN:
+            log(LOG_TURN, ' - Distance table :')
+            for i1 in range(factory_count):
+                s = '    '
+                for i2 in range(factory_count):
+                    s += '{:>3d}'.format(dist_table[i1, i2])
+                log(LOG_TURN, s)
+
+        log(LOG_SUMMARY, ' - Factories :')
+        self.log_factories()
+
+    def log_factories(self):
+        log = self.log
+        if log.level < LOG_SUMMARY:
+            return
+        log(LOG_SUMMARY, '\t\t#ID\tOwner\tProd\tUnits')
+        for fid, (owner, cyborgs, prod) in enumerate(zip(*self.factories[F_OWNER:F_PROD+1].tolist())):
+            log(LOG_SUMMARY, '\t\t{}\t{}\t{}\t{}', fid, owner, prod, cyborgs)
+
+    def turn_info(self, player):
+        ''' Returns the lines of input of a player for the current turn
+
+        Args:
+          player (int): 0 for the first player, 1 for the second one. The second player sees the sides swapped.
+        '''
+        return self.turn_payload(player)[1].split('\n')[:-1]
+
+    def turn_payload(self, player):
+        ''' Returns the inputs of a player for the current turn as (N, block), block holding the N lines,
+        each one ending with an end of line. The inputs of both players are built at once and kept for
+        the turn, and the line of a factory is only formatted again when it changed.
+
+        Args:
+          player (int): 0 for the first player, 1 for the second one. The second player sees the sides swapped.
+        '''
+        if self.payload_turn != self.turn:
+            self.payloads     = self.build_payloads()
+            self.payload_turn = self.turn
+        return self.payloads[player]
+
+    def build_payloads(self):
+        ''' The inputs of both players for the current turn, see turn_payload '''
+        factories, troops, bombs = self.factories, self.troops, self.bombs
+        nfactories = factories.shape[1]
+        lines      = ([], [])
+
+        # Factories : only the ones that changed since the last turn are formatted again
+        state = factories[F_OWNER:F_BLOCKED+1]
+        if self.factory_state is None:
+            self.factory_lines = ([None] * nfactories, [None] * nfactories)
+            changed = list(range(nfactories))
+        else:
+            changed = np.flatnonzero((state != self.factory_state).any(axis=0)).tolist()
+        mine, theirs = self.factory_lines
+        for fid, (owner, cyborgs, prod, blocked) in zip(changed, state[:, changed].T.tolist()):
+            rest = ' {} {} {} -1'.format(cyborgs, prod, blocked)
+            mine[fid]   = '{} FACTORY {}'.format(fid, owner) + rest
+            theirs[fid] = '{} FACTORY {}'.format(fid, -owner) + rest
+        self.factory_state = state.copy()
+        lines[0].extend(mine)
+        lines[1].extend(theirs)
+
+        # Troops : their ETA changes every turn. The owners are 1 or -1.
+        eid = nfactories
+        for owner, f_from, f_to, cyborgs, eta in zip(*troops.tolist()):
+            rest  = ' {} {} {} {}'.format(f_from, f_to, cyborgs, eta)
+            first = str(eid)
+            lines[0].append(first + (' TROOP 1' if owner == 1 else ' TROOP -1') + rest)
+            lines[1].append(first + (' TROOP -1' if owner == 1 else ' TROOP 1') + rest)
+            eid += 1
+
+        # Bombs : the enemy does not know their target
+        for owner, f_from, f_to, timer in zip(*bombs.tolist()):
+            known  = '{} BOMB 1 {} {} {} -1'.format(eid, f_from, f_to, timer)
+            hidden = '{} BOMB -1 {} -1 -1 -1'.format(eid, f_from)
+            lines[0].append(known if owner == 1 else hidden)
+            lines[1].append(hidden if owner == 1 else known)
+            eid += 1
+
+        count = len(lines[0])
+        head  = '{}\n'.format(count)
+        nhead = 1
+        # If first turn, we send all the info of the map to the player
+        if self.turn == 0:
+            if self.map_block is None:
+                links = ['{} {} {}'.format(i, j, d) for i, row in enumerate(self.dist_table.tolist())
+                                                    for j, d in enumerate(row) if j > i]
+                self.map_block = '{}\n{}\n'.format(nfactories, len(links)) + ''.join(link + '\n' for link in links)
+            head   = self.map_block + head
+            nhead += self.map_block.count('\n')
+        return [(nhead + count, head + '\n'.join(side) + '\n' if side else head) for side in lines]
+
+    def end_game(self, ranking, tied=False):
+        res = ranking
+        if tied:
+            res = 'tied'
+        self.log(LOG_SUMMARY, 'Game ending with ranking : {}', res)
+        raise GameOver(res)
+
+    def execute_orders(self, pid, actions):
+        ''' Applies the orders of a player. The troops and bombs sent are appended at the end of the arrays.
+
+        Returns:
+          False if the orders are invalid, and the player loses
+        '''
+        new_troops = []
+        new_bombs  = []
+        try:
+            return self.apply_orders(pid, actions, new_troops, new_bombs)
+        finally:
+            if new_troops:
+                self.troops = np.concatenate((self.troops, np.array(new_troops, dtype=np.int64).T), axis=1)
+            if new_bombs:
+                self.bombs = np.concatenate((self.bombs, np.array(new_bombs, dtype=np.int64).T), axis=1)
+
+    def apply_orders(self, pid, actions, new_troops, new_bombs):
+        log        = self.log
+        nbombs     = self.nbombs
+        dist_table = self.dist_table
+        nfactories = self.factories.shape[1]
+        owner      = self.factories[F_OWNER]
+        cyborgs    = self.factories[F_CYBORGS]
+        prod       = self.factories[F_PROD]
+
+        actions = [action.strip() for action in actions.split(';')]
+        for i in range(len(actions)):
+            if actions[i].startswith('BOMB'):
+                actions[i] = '0_'+actions[i]
+            elif actions[i].startswith('MOVE'):
+                actions[i] = '1_'+actions[i]
+            elif actions[i].startswith('INC'):
+                actions[i] = '2_'+actions[i]
+
+        bomb_paths = []
+
+        actions.sort() # We sort to get the order of the operations right
+        for a_token in actions:
+            action = a_token.split(' ')
+
+            atype = action[0]
+
+            if atype == '0_BOMB':
+                f_from = int(action[1])
+                f_to   = int(action[2])
+                valid = True
+
+                if nbombs[pid+1] == 0:
+                    log(LOG_ACTION, 'WARNING : Player {} tries to send a bomb, but no bombs left !', pid)
+                    valid = False
+
+                if f_from < 0 or f_from >= nfactories:
+                    log(LOG_SUMMARY, 'Player {} : non-existent factory {}', pid, f_from)
+                    return False
+
+                if f_to < 0 or f_to >= nfactories:
+                    log(LOG_SUMMARY, 'Player {} : non-existent factory {}', pid, f_to)
+                    return False
+
+                if f_to == f_from:
+                    log(LOG_SUMMARY, 'Player {} : can\'t bomb the sender ! : from == to ...', pid)
+                    return False
+
+                if valid:
+                    bomb_paths += [(f_from, f_to)]
+
+                    new_bombs += [(pid, f_from, f_to, dist_table[f_from, f_to])]
+                    nbombs[pid+1] -= 1
+                    log(LOG_ACTION, 'Player {} sending bomb from {} to {}', pid, f_from, f_to)
+
+
+            elif atype == '1_MOVE':
+                f_from = int(action[1])
+                f_to   = int(action[2])
+                valid = True
+
+                # Errors
+                if f_from < 0 or f_from >= nfactories:
+                    log(LOG_SUMMARY, 'Player {} : non-existent factory {}', pid, f_from)
+                    return False
+
+                if f_to < 0 or f_to >= nfactories:
+                    log(LOG_SUMMARY, 'Player {} : non-existent factory {}', pid, f_to)
+                    return False
+
+                if f_to == f_from:
+                    log(LOG_SUMMARY, 'Player {} : sending units : from == to ...', pid)
+                    return False
+
+                if owner[f_from] != pid:
+                    log(LOG_SUMMARY, 'Player {} tries to move units from enemy factory {}', pid, f_from)
+                    return False
+
+                count  = int(action[3])
+
+                if count < 0:
+                    log(LOG_SUMMARY, 'Player {} tries to move {} units ...', pid, count)
+                    return False
+
+                if count <= 0 or (f_from, f_to) in bomb_paths or cyborgs[f_from] <= 0:
+                    valid = False
+
+                # If everything is ok, we create the troop
+                if valid:
+
+                    if count > cyborgs[f_from]:
+                        count = int(cyborgs[f_from])
+                        log(LOG_ACTION, 'WARNING : Player {} tries to more more units than available at factory {}. Scaled down to {}',
+                            pid, f_from, count)
+                    eta = dist_table[f_from, f_to]
+                    new_troops += [(pid, f_from, f_to, count, eta)]
+                    cyborgs[f_from] -= count
+                    log(LOG_ACTION, 'Player {} creating new troop, {} {} {}, ETA = {}', pid, f_from, f_to, count, eta)
+                elif (f_from, f_to) in bomb_paths:
+                    log(LOG_ACTION, 'WARNING : Player {} tries to send troops from bomb source {} to bomb destination {}, move cancelled',
+                        pid, f_from, f_to)
+                elif count == 0:
+                    log(LOG_ACTION, 'WARNING : Player {} tries to send 0 troops ! Move ignored.', pid)
+
+            elif atype == '2_INC':
+                f_from = int(action[1])
+                valid = True
+                # Errors
+                if f_from < 0 or f_from >= nfactories:
+                    log(LOG_SUMMARY, 'Player {} : non-existent factory {}', pid, f_from)
+                    return False
+
+                if owner[f_from] != pid:
+                    log(LOG_SUMMARY, 'Player {} tries to move units from enemy factory {}', pid, f_from)
+                    return False
+
+                if cyborgs[f_from] < 10:
+                    log(LOG_ACTION, 'Player {} tries to inc a factory {} with not enough robots', pid, f_from)
+                    valid = False
+
+                if prod[f_from] == 3:
+                    log(LOG_ACTION, 'WARNING : Player {} tries to inc the already maxxed factory {}', pid, f_from)
+                    valid = False
+
+                if valid:
+                    prod[f_from]    += 1
+                    cyborgs[f_from] -= 10
+
+                    log(LOG_ACTION, 'Player {} increases production of factory {} to {}', pid, f_from, prod[f_from])
+            elif atype == 'TIMEOUT':
+                log(LOG_SUMMARY, 'Player {} exceeded its time limit and forfeits', pid)
+                return False
+            elif atype == 'MSG':
+                log(LOG_ACTION, 'Player {} says {}', pid, action)
+            elif atype == 'WAIT':
+                pass
+
+        return True
+
+    def evolve(self, a1, a2):
+        factories  = self.factories
+        nfactories = factories.shape[1]
+        owner      = factories[F_OWNER]
+        cyborgs    = factories[F_CYBORGS]
+
+        # 1- Moving troops and bombs
+        troops = self.troops
+        troops[T_ETA] -= 1
+        t_to_resolve = troops[T_ETA] == 0
+        attackers = np.zeros((3, nfactories), dtype=np.int64)
+        np.add.at(attackers, (troops[T_OWNER, t_to_resolve] + 1, troops[T_TO, t_to_resolve]),
+                  troops[T_CYBORGS, t_to_resolve])
+
+        bombs = self.bombs
+        bombs[B_TIMER] -= 1
+        b_to_resolve = bombs[B_TIMER] == 0
+        b_targets    = bombs[B_TO, b_to_resolve].tolist()
+
+        # 2- Decreasing disabled countdown
+        np.maximum(factories[F_BLOCKED] - 1, 0, out=factories[F_BLOCKED])
+
+        # 3- Executing orders
+        r0 = self.execute_orders(1, a1)
+        r1 = self.execute_orders(-1, a2)
+
+        # Are we finished because of an error
+        if not r0 and not r1:
+            self.end_game('0 1', True)
+        elif not r0:
+            self.end_game('1 0')
+        elif not r1:
+            self.end_game('0 1')
+
+
+        # 4- Production
+        producing = (owner != 0) & (factories[F_BLOCKED] == 0)
+        cyborgs += np.where(producing, factories[F_PROD], 0)
+
+        # 5- BATTLES
+        units = np.minimum(attackers[0], attackers[2])
+        attackers[0] -= units
+        attackers[2] -= units
+
+        for pid in (-1, 1):
+            att      = attackers[pid+1]
+            owned    = owner == pid
+            captured = ~owned & (att > cyborgs)
+            cyborgs[:] = np.where(owned, cyborgs + att, np.abs(cyborgs - att))
+            owner[captured] = pid
+
+        # 6- Bombs
+        for f_to in b_targets:
+            units = max(10, cyborgs[f_to] // 2)
+            cyborgs[f_to] = max(0, cyborgs[f_to] - units)
+            factories[F_BLOCKED, f_to] = 5
+
+        # 7- Cleaning, the troops and bombs sent this turn are kept
+        n_new = self.troops.shape[1] - troops.shape[1]
+        self.troops = self.troops[:, np.concatenate((~t_to_resolve, np.ones(n_new, dtype=bool)))]
+        n_new = self.bombs.shape[1] - bombs.shape[1]
+        self.bombs  = self.bombs[:, np.concatenate((~b_to_resolve, np.ones(n_new, dtype=bool)))]
+
+        # 8- Updating score
+        troops = self.troops
+        self.scores = [int(cyborgs[owner == pid].sum() + troops[T_CYBORGS, troops[T_OWNER] == pid].sum())
+                       for pid in (-1, 0, 1)]
+
+        if self.scores[0] == 0:
+            prod = factories[F_PROD, owner == -1].sum()
+
+            if prod == 0:
+                self.end_game('0 1')
+        elif self.scores[2] == 0:
+            prod = factories[F_PROD, owner == 1].sum()
+
+            if prod == 0:
+                self.end_game('1 0')
+
+
+    def final_ranking(self):
+        ''' Ends the game once the maximum number of turns has elapsed '''
+        log = self.log
+        count = [0, 0, 0]
+        for owner, cyborgs in zip(self.factories[F_OWNER].tolist(), self.factories[F_CYBORGS].tolist()):
+            count[owner+1] += cyborgs
+            log(LOG_ACTION, '{}', count)
+        log(LOG_ACTION, '--------')
+        for owner, cyborgs in zip(self.troops[T_OWNER].tolist(), self.troops[T_CYBORGS].tolist()):
+            count[owner+1] += cyborgs
+            log(LOG_ACTION, '{}', count)
+
+        log(LOG_SUMMARY, 'Maximum turns elapsed, Scores = {} / {}', count[0], count[2])
+        log(LOG_SUMMARY, 'Final state of the game :')
+        self.log_factories()
+
+
+        if count[0] == count[2]:
+            self.end_game('0 1', True)
+        elif count[0] > count[2]:
+            self.end_game('1 0')
+        else:
+            self.end_game('0 1')
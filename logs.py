@@ -0,0 +1,105 @@
+#!/usr/bin/python
+
+# Reads the error streams written to the "Log archive" of a session (see LogArchive in referee.py) :
+#
+#   python logs.py runs/GITC                     lists the runs archived and their streams
+#   python logs.py runs/GITC --run 12            writes the logs of run 12 to runs/GITC/run_012/
+#   python logs.py runs/GITC --run 12 --stream b1.err
+#                                                prints the error stream of b1 during run 12
+import os
+import sys
+import json
+import zlib
+import argparse
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+codecs = {'.log.gz': 'gzip', '.log.zst': 'zstd'}
+
+def read_index(directory):
+    ''' The streams archived in a folder, from the indexes of its segments
+
+    Args:
+      directory (string): The folder of the archive, runs/<Game>/logs
+
+    Returns:
+      A dictionary of the entries of the indexes by (run, stream), each one completed with the path of
+      its segment. A stream archived twice (a run played again after resuming a session) is the last one.
+    '''
+    entries = {}
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.idx'):
+            continue
+        segment = os.path.join(directory, name[:-len('.idx')])
+        with open(os.path.join(directory, name)) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue # Last line of a segment still written
+                entry['segment'] = segment
+                previous = entries.get((entry['run'], entry['stream']))
+                if previous is None or os.path.getmtime(previous['segment']) <= os.path.getmtime(segment):
+                    entries[entry['run'], entry['stream']] = entry
+    return entries
+
+def extract(entry):
+    ''' The content of an archived stream '''
+    codec = [codec for ext, codec in codecs.items() if entry['segment'].endswith(ext)][0]
+    with open(entry['segment'], 'rb') as f:
+        f.seek(entry['offset'])
+        data = f.read(entry['length'])
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ImportError('the zstandard module is needed to read {}'.format(entry['segment']))
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Reads the log archive of a session of cg_referee')
+    parser.add_argument('folder', help='Folder of the game, runs/<Game name>')
+    parser.add_argument('--run', type=int, help='Run whose logs are extracted')
+    parser.add_argument('--stream', help='Only this stream of the run, printed on the standard output '
+                                         '(<Game name>.log for the engine, <Bot name>.err for a bot)')
+    parser.add_argument('--output', help='Folder where the logs of the run are written, by default '
+                                         'runs/<Game name>/run_<run>/ as with "Log stderr"')
+    args = parser.parse_args()
+
+    directory = os.path.join(args.folder, 'logs')
+    if not os.path.isdir(directory):
+        sys.stderr.write('Error : no log archive in {}\n'.format(args.folder))
+        sys.exit(1)
+    entries = read_index(directory)
+
+    if args.run is None:
+        runs = sorted(set(run for run, stream in entries))
+        print('{} runs archived in {}'.format(len(runs), directory))
+        for run in runs:
+            streams = sorted(stream for r, stream in entries if r == run)
+            print(' - Run {} : {}'.format(run, ', '.join('{} ({} bytes)'.format(stream, entries[run, stream]['size'])
+                                                        for stream in streams)))
+        sys.exit(0)
+
+    streams = sorted(stream for run, stream in entries if run == args.run)
+    if args.stream is not None:
+        streams = [stream for stream in streams if stream == args.stream]
+    if not streams:
+        sys.stderr.write('Error : run {} is not archived{}\n'.format(args.run, ' with this stream' if args.stream else ''))
+        sys.exit(1)
+
+    if args.stream is not None:
+        out = getattr(sys.stdout, 'buffer', sys.stdout)
+        out.write(extract(entries[args.run, args.stream]))
+        sys.exit(0)
+
+    output = args.output or os.path.join(args.folder, 'run_{:03d}'.format(args.run))
+    if not os.path.exists(output):
+        os.makedirs(output)
+    for stream in streams:
+        with open(os.path.join(output, stream), 'wb') as f:
+            f.write(extract(entries[args.run, stream]))
+    print('Logs of run {} written to {}'.format(args.run, output))
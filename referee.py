@@ -6,155 +6,2830 @@ import os
 import subprocess
 import json
 import shutil
+import imp
 import multiprocessing as mp
 import numpy as np
 import random
+import select
 import time
+import multiprocessing.util
+import struct
+import mmap
+import hashlib
+import binascii
+import math
+import itertools
+import argparse
+import socket
+import threading
+import collections
+import datetime
+import functools
+import tempfile
+import errno
+import fcntl
+import signal
+import cProfile
+import pstats
+import zlib
+import sqlite3
+from multiprocessing.connection import Listener, Client
 from copy import copy
 
-seed_bank = []
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 debug = False
 
-t_limit = 0.1
-t_limit_large = 1.0
-t_limit_sigma = 0.05 # Variation accepted on the max time, to make sure communication time is not impairing a bot
+t_limit = 0.1
+t_limit_large = 1.0
+t_limit_sigma = 0.05 # Variation accepted on the max time, to make sure communication time is not impairing a bot
+
+# Upper bounds (in seconds) of the bins of the response time histograms, the last bin is unbounded
+latency_bins = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0]
+
+# Answer given to the engine in place of the one of a bot that exceeded its time limit
+timeout_answer = 'TIMEOUT'
+
+def run_seed(base, group):
+    ''' Seed given to the engine for a group of runs (the runs of a seed, one per seating). It only
+    depends on the seed of the session and on the index of the group, so that changing Runs or resuming
+    a session does not change the maps of the first games.
+
+    Args:
+      base  (int):  The seed of the session
+      group (int):  Index of the group of runs
+    '''
+    digest = hashlib.sha1('{}:{}'.format(base, group).encode('utf-8')).hexdigest()
+    return int(digest, 16) % 100001
+
+def log(p_from, p_to, msg):
+    print('{} to {} -- {}'.format(p_from, p_to, msg))
+
+# Monotonic clock for the timings : time.monotonic does not exist in Python 2, so we ask the libc directly
+try:
+    monotonic = time.monotonic
+except AttributeError:
+    import ctypes
+    import ctypes.util
+
+    class _timespec(ctypes.Structure):
+        _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+    def _libc_monotonic():
+        t = _timespec()
+        _libc.clock_gettime(1, ctypes.byref(t)) # 1 = CLOCK_MONOTONIC
+        return t.tv_sec + t.tv_nsec * 1e-9
+
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c'))
+        _libc_monotonic()
+        monotonic = _libc_monotonic
+    except (OSError, AttributeError, TypeError):
+        monotonic = time.time
+
+# With the "cpu" time basis, a bot waiting without computing still forfeits after this many times its limit
+cpu_wall_factor = 10.0
+
+def set_affinity(cores):
+    ''' Pins the current process, and the processes it starts afterwards, to a list of cores.
+    os.sched_setaffinity does not exist in Python 2, so we ask the libc directly.
+    Returns False if the affinity could not be set. '''
+    try:
+        os.sched_setaffinity(0, cores)
+        return True
+    except AttributeError:
+        pass
+    except OSError:
+        return False
+
+    import ctypes
+    import ctypes.util
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        word = 8 * ctypes.sizeof(ctypes.c_ulong)
+        mask = (ctypes.c_ulong * (1024 // word))() # cpu_set_t, 1024 cores
+        for core in cores:
+            mask[core // word] |= 1 << (core % word)
+        return libc.sched_setaffinity(0, ctypes.sizeof(mask), ctypes.byref(mask)) == 0
+    except (OSError, AttributeError, TypeError):
+        return False
+
+def ignore_interrupt(*args):
+    ''' Handler of SIGINT in the processes of a Pool : Ctrl-C is handled by the main process, which
+    terminates them. Unlike SIG_IGN, a handler is not inherited by the bots they start. '''
+    pass
+
+def init_pool_worker(nthreads=None):
+    ''' Initializer of the processes of a Pool, see ignore_interrupt and pin_pool_worker '''
+    signal.signal(signal.SIGINT, ignore_interrupt)
+    signal.siginterrupt(signal.SIGINT, False) # The games go on until the process is terminated
+    if nthreads is not None:
+        pin_pool_worker(nthreads)
+
+def pin_pool_worker(nthreads):
+    ''' Gives a process of a Pool its share of the cores (see "CPU affinity") '''
+    ncores = mp.cpu_count()
+    share  = max(1, ncores // nthreads)
+    index  = (mp.current_process()._identity or (1,))[0] - 1
+    first  = (index % nthreads) * share
+    if not set_affinity([(first + i) % ncores for i in range(share)]):
+        print('Warning : the CPU affinity of {} can\'t be set'.format(mp.current_process().name))
+
+# Thanks to Steven Bethard for this nice trick, found on :
+# https://bytes.com/topic/python/answers/552476-why-cant-you-pickle-instancemethods
+# Allows the methods of Bot and Referee to be pickled for multiprocessing
+import copy_reg
+import types
+
+def _pickle_method(method):
+    func_name = method.im_func.__name__
+    obj = method.im_self
+    cls = method.im_class
+    return _unpickle_method, (func_name, obj, cls)
+
+def _unpickle_method(func_name, obj, cls):
+    for cls in cls.__mro__:
+        try:
+            func = cls.__dict__[func_name]
+            return func.__get__(obj, cls)
+        except KeyError:
+            pass
+    return None
+
+copy_reg.pickle(types.MethodType, _pickle_method, _unpickle_method)
+
+# Phases of a game timed with "Profile phases". The multiplexed games share the time their process
+# waits for data between them ('wait'), as it waits on the engines and the bots at once.
+profile_phases = ['spawn', 'engine wait', 'forward to bot', 'bot wait', 'forward to engine', 'teardown', 'wait']
+
+class PhaseClock(object):
+    def __init__(self):
+        ''' Accumulates the time a game spends in every phase (see profile_phases). The time is counted
+        in the current phase until the next switch, and nowhere while the phase is None. '''
+        self.phases  = {}
+        self.current = None
+        self.t_last  = monotonic()
+
+    def switch(self, phase):
+        ''' Moves to another phase, returning the previous one '''
+        now = monotonic()
+        if self.current is not None:
+            self.phases[self.current] = self.phases.get(self.current, 0.0) + now - self.t_last
+        previous, self.current, self.t_last = self.current, phase, now
+        return previous
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+def timed_phase(phase):
+    ''' Decorates a method of an object holding a clock (a PhaseClock or None) : its time counts in
+    the given phase, then the clock goes back to the phase it was in '''
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.clock is None:
+                return method(self, *args, **kwargs)
+            previous = self.clock.switch(phase)
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.clock.switch(previous)
+        return wrapper
+    return decorator
+
+# cProfile profiler of the current process, with "Profile workers"
+profiler = None
+
+def profiled(method):
+    ''' Decorates the methods of the Referee playing a list of runs : with "Profile workers", they run
+    under the profiler of their process, and its statistics are written after every task, to
+    runs/<Game>/profile/<process>.prof, as the processes of a pool are terminated without notice. '''
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        global profiler
+        if not self.profile_workers:
+            return method(self, *args)
+        if profiler is None:
+            profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return method(self, *args)
+        finally:
+            profiler.disable()
+            directory = 'runs/' + self.game_name + '/profile/'
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+            profiler.dump_stats(directory + self.process_name().replace('/', '_') + '.prof')
+    return wrapper
+
+# Line sent to a persistent bot before the inputs of every game but the first one it plays
+new_game_signal = '###NEWGAME###'
+
+# Idle persistent bots kept alive by the current process, indexed by their position in the Bots list
+warm_bots = {}
+
+def release_warm_bots():
+    ''' Kills every persistent bot still alive in the current process '''
+    for idle in warm_bots.values():
+        for bot in idle:
+            bot.stop(force=True)
+    warm_bots.clear()
+
+class LineBuffer(object):
+    def __init__(self, pipe, name='Process'):
+        ''' Line reader working directly on the descriptor of a pipe, without blocking unless asked to
+
+        Args:
+          pipe (file):   The pipe to read from
+          name (string): Name of the process writing in the pipe, for the error messages
+        '''
+        self.fd   = pipe.fileno()
+        self.name = name
+        self.data = ''
+        self.eof  = False
+
+    def fill(self):
+        ''' Reads everything available on the pipe without blocking more than one read '''
+        chunk = os.read(self.fd, 65536)
+        if chunk:
+            self.data += chunk
+        else:
+            self.eof = True
+
+    def readline(self):
+        ''' Returns the next complete line without its end of line, or None if there is none yet '''
+        end = self.data.find('\n')
+        if end < 0:
+            return None
+        line = self.data[:end].strip()
+        self.data = self.data[end+1:]
+        return line
+
+    def take(self, nbytes):
+        ''' Returns at most nbytes of the data already received '''
+        chunk = self.data[:nbytes]
+        self.data = self.data[nbytes:]
+        return chunk
+
+    def wait(self, timeout=None):
+        ''' Waits for data on the pipe and reads it
+
+        Args:
+          timeout (float): Maximum time to wait in seconds, None to wait forever
+
+        Returns:
+          False if nothing was received in time
+        '''
+        if self.eof:
+            raise IOError('{} closed its output'.format(self.name))
+
+        deadline = None if timeout is None else monotonic() + max(0, timeout)
+        while True:
+            try:
+                if deadline is None:
+                    ready, _, _ = select.select([self.fd], [], [])
+                else:
+                    ready, _, _ = select.select([self.fd], [], [], max(0, deadline - monotonic()))
+                break
+            except select.error as e:
+                if e.args[0] != errno.EINTR:
+                    raise # Waiting again after a signal, see init_pool_worker
+
+        if ready:
+            self.fill()
+        return bool(ready)
+
+    def read_line(self, timeout=None):
+        ''' Reads one line, blocking if necessary
+
+        Args:
+          timeout (float): Maximum time to wait for the line in seconds, None to wait forever
+
+        Returns:
+          The line without its end of line, or None if it was not received in time
+        '''
+        if timeout is not None:
+            deadline = monotonic() + timeout
+
+        line = self.readline()
+        while line is None:
+            if timeout is None:
+                self.wait()
+            elif not self.wait(deadline - monotonic()):
+                return None
+            line = self.readline()
+        return line
+
+    def read_bytes(self, nbytes):
+        ''' Reads exactly nbytes, blocking if necessary '''
+        while len(self.data) < nbytes:
+            self.wait()
+        return self.take(nbytes)
+
+class PipeWriter(object):
+    def __init__(self, pipe):
+        ''' Writer working directly on the descriptor of a pipe, without ever blocking : what the pipe
+        can't take yet is kept until it is writable again. The pipe stays non-blocking until close.
+
+        Args:
+          pipe (file): The pipe to write to
+        '''
+        self.fd      = pipe.fileno()
+        self.pending = ''
+        self.flags   = fcntl.fcntl(self.fd, fcntl.F_GETFL)
+        fcntl.fcntl(self.fd, fcntl.F_SETFL, self.flags | os.O_NONBLOCK)
+
+    def write(self, data):
+        self.pending += data
+        self.flush()
+
+    def flush(self):
+        ''' Writes as much of the pending data as the pipe takes. Returns True once it is all written '''
+        while self.pending:
+            try:
+                written = os.write(self.fd, self.pending)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    return False
+                raise
+            self.pending = self.pending[written:]
+        return True
+
+    def close(self):
+        ''' Drops the pending data and makes the pipe blocking again, for the next user of the process '''
+        self.pending = ''
+        fcntl.fcntl(self.fd, fcntl.F_SETFL, self.flags)
+
+# Where the error streams go when they are neither logged nor buffered
+devnull = open(os.devnull, 'w')
+
+class RingBuffer(object):
+    def __init__(self, size):
+        ''' Keeps the last size bytes written to it, see StderrDrain. With the write interface of a
+        file, it can also be the log file of an engine plugin.
+
+        Args:
+          size (int): Number of bytes kept
+        '''
+        self.size    = size
+        self.chunks  = collections.deque()
+        self.length  = 0                  # Bytes held by the chunks
+        self.dropped = 0                  # Bytes dropped before the chunks
+        self.lock    = threading.Lock()
+        self.closed  = threading.Event()  # Set at the end of the stream
+
+    def write(self, data):
+        with self.lock:
+            self.chunks.append(data)
+            self.length += len(data)
+            while self.length - len(self.chunks[0]) >= self.size:
+                chunk = self.chunks.popleft()
+                self.length  -= len(chunk)
+                self.dropped += len(chunk)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed.set()
+
+    def getvalue(self):
+        ''' Returns the bytes kept and the number of bytes dropped before them '''
+        with self.lock:
+            data    = ''.join(self.chunks)
+            dropped = self.dropped
+        excess = max(0, len(data) - self.size)
+        return data[excess:], dropped + excess
+
+class StderrDrain(object):
+    def __init__(self):
+        ''' Reads the error streams of the engines and bots started by the current process in a
+        background thread, each one into its RingBuffer or ArchiveStream, so that their pipes never fill up. It is
+        only started by the first stream, see stderr_drain. '''
+        self.pid     = os.getpid()
+        self.lock    = threading.Lock()
+        self.streams = {}  # descriptor -> (pipe, RingBuffer or ArchiveStream)
+        self.wake_r, self.wake_w = os.pipe()
+        self.thread  = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def add(self, pipe, buf):
+        ''' Drains a pipe into buf, a RingBuffer or an ArchiveStream, which is returned. The pipe is
+        closed at its end. '''
+        with self.lock:
+            self.streams[pipe.fileno()] = (pipe, buf)
+        os.write(self.wake_w, 'x')
+        return buf
+
+    def run(self):
+        poller     = select.poll()
+        registered = set()
+        poller.register(self.wake_r, select.POLLIN)
+        while True:
+            try:
+                events = poller.poll()
+            except select.error:
+                continue # Interrupted by a signal
+
+            for fd, event in events:
+                if fd == self.wake_r:
+                    # New streams
+                    os.read(self.wake_r, 4096)
+                    with self.lock:
+                        for new in set(self.streams) - registered:
+                            poller.register(new, select.POLLIN)
+                            registered.add(new)
+                    continue
+
+                try:
+                    data = os.read(fd, 65536)
+                except OSError:
+                    data = ''
+                if data:
+                    self.streams[fd][1].write(data)
+                    continue
+                poller.unregister(fd)
+                registered.discard(fd)
+                with self.lock:
+                    pipe, buf = self.streams.pop(fd)
+                pipe.close()
+                buf.close()
+
+# Drain of the current process, see stderr_drain
+drain = None
+
+def stderr_drain():
+    ''' The StderrDrain of the current process, started if needed. A forked process does not inherit the
+    thread of its parent, so it starts its own. '''
+    global drain
+    if drain is None or drain.pid != os.getpid():
+        drain = StderrDrain()
+    return drain
+
+# Codecs of the log archives : the extension of the segments, and a factory of compressors
+archive_codecs = {'gzip': '.log.gz', 'zstd': '.log.zst'}
+
+def make_compressor(codec):
+    ''' A compressor of the codec, with the compress and flush methods of zlib. Every stream is
+    compressed to one gzip member or zstd frame, and these can follow each other in a file. '''
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor().compressobj()
+    return zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+def make_decompressor(codec):
+    ''' The decompressor matching make_compressor '''
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().decompressobj()
+    return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+class ArchiveStream(object):
+    def __init__(self, codec):
+        ''' Compresses an error stream as it is written, for the "Log archive". Like RingBuffer, it
+        is filled by StderrDrain, or is the log file of an engine plugin.
+
+        Args:
+          codec (string): 'gzip' or 'zstd'
+        '''
+        self.codec      = codec
+        self.compressor = make_compressor(codec)
+        self.chunks     = []
+        self.size       = 0                  # Bytes written since the last take
+        self.lock       = threading.Lock()
+        self.closed     = threading.Event()  # Set at the end of the stream
+
+    def write(self, data):
+        with self.lock:
+            self.size += len(data)
+            self.chunks.append(self.compressor.compress(data))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed.set()
+
+    def take(self):
+        ''' Ends the compressed member of the data written so far, and returns it with the size of the
+        data. The stream of a persistent bot goes on in a new member. '''
+        with self.lock:
+            data = ''.join(self.chunks) + self.compressor.flush()
+            size = self.size
+            self.compressor = make_compressor(self.codec)
+            self.chunks     = []
+            self.size       = 0
+        return data, size
+
+class LogArchive(object):
+    def __init__(self, directory, name, codec, segment_size, keep):
+        ''' The segments of the "Log archive" written by one process, in runs/<Game>/logs/. Every
+        segment holds the streams of whole games, one compressed member after the other, so that it
+        can be read by zcat or zstdcat. Next to it, its index (.idx) has one line of JSON per stream :
+        the run, the name of the stream (as the file it would have been written to), the offset and
+        length of the member in the segment, and the size of the stream. See logs.py to read them.
+
+        Args:
+          directory    (string): The folder of the archive
+          name         (string): The name of the process, starting the names of its segments
+          codec        (string): 'gzip' or 'zstd'
+          segment_size (int):    Bytes after which a new segment is started
+          keep         (int):    Segments kept in the folder, the oldest are removed. 0 keeps them all.
+        '''
+        self.directory    = directory
+        self.name         = name.replace(':', '_').replace(os.sep, '_')
+        self.codec        = codec
+        self.segment_size = segment_size
+        self.keep         = keep
+        self.pid          = os.getpid()
+        self.count        = 0
+        self.segment      = None
+        self.index        = None
+
+    def open_segment(self):
+        ''' Starts a new segment, and removes the oldest ones beyond the retention limit '''
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        while True:
+            self.count += 1
+            path = os.path.join(self.directory, '{}-{:04d}{}'.format(self.name, self.count, archive_codecs[self.codec]))
+            if not os.path.exists(path):
+                break
+        self.segment = open(path, 'wb')
+        self.index   = open(path + '.idx', 'w')
+        if self.keep > 0:
+            self.prune()
+
+    def prune(self):
+        ''' Removes the oldest segments of the folder, of every process, beyond the "Archive segments kept" '''
+        segments = []
+        for entry in os.listdir(self.directory):
+            path = os.path.join(self.directory, entry)
+            if entry.endswith(('.log.gz', '.log.zst')) and path != self.segment.name:
+                try:
+                    segments.append((os.path.getmtime(path), path))
+                except OSError:
+                    pass # Removed by another process
+        for t, path in sorted(segments)[:max(0, len(segments) + 1 - self.keep)]:
+            for f in (path, path + '.idx'):
+                try:
+                    os.remove(f)
+                except OSError:
+                    pass
+
+    def write(self, run, streams):
+        ''' Appends the streams of a game to the current segment
+
+        Args:
+          run     (int):  The id of the run
+          streams (list): Couples (name of the stream, ArchiveStream)
+        '''
+        if self.segment is None:
+            self.open_segment()
+        for name, stream in streams:
+            data, size = stream.take()
+            offset = self.segment.tell()
+            self.segment.write(data)
+            self.index.write(json.dumps({'run': run, 'stream': name, 'offset': offset, 'length': len(data),
+                                         'size': size}) + '\n')
+        # The archive can be read while the session goes on
+        self.segment.flush()
+        self.index.flush()
+        if self.segment.tell() >= self.segment_size:
+            self.close()
+
+    def close(self):
+        if self.segment is not None:
+            self.segment.close()
+            self.index.close()
+            self.segment = None
+            self.index   = None
+
+# Archive of the current process, see log_archive
+archive = None
+
+def log_archive(referee):
+    ''' The LogArchive of the current process, opened if needed '''
+    global archive
+    if archive is None or archive.pid != os.getpid():
+        archive = LogArchive('runs/' + referee.game_name + '/logs', referee.process_name(), referee.log_archive,
+                             referee.archive_segment, referee.archive_keep)
+    return archive
+
+class EngineProcess(object):
+    def __init__(self, process, stderr_buffer=None):
+        ''' A game binary running in its own process, talking through its standard streams
+
+        Args:
+          process       (Popen):      The process of the game binary
+          stderr_buffer (RingBuffer): The end of its error stream, if it is buffered
+        '''
+        self.process = process
+        self.stdin   = process.stdin
+        self.reader  = LineBuffer(process.stdout, 'Engine')
+        self.stderr_buffer = stderr_buffer
+
+    def next_request(self):
+        ''' Reads what the engine expects for the current bot
+
+        Returns:
+          A couple (code, data). See the protocol in Referee.run_game. If the code is followed by a
+          number of bytes, the lines come as one block of that size, which is kept as is (framed protocol).
+        '''
+        header = self.reader.read_line().split()
+        exec_code = int(header[0])
+        if exec_code < 0:
+            return exec_code, self.reader.read_line()
+        elif exec_code == 0:
+            return exec_code, None
+        elif len(header) > 1:
+            return exec_code, self.reader.read_bytes(int(header[1]))
+        else:
+            return exec_code, ''.join(self.reader.read_line() + '\n' for i in range(exec_code))
+
+    def apply(self, action):
+        ''' Sends the answer of the current bot to the engine '''
+        self.stdin.write(action + '\n')
+
+    def stop(self):
+        ''' Kills the engine if it is still running '''
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+
+
+# Zygotes started by the current process, indexed by their interpreter and script (see Zygote)
+zygotes = {}
+
+zygote_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'zygote.py')
+
+class ZygoteProcess(object):
+    def __init__(self, pid):
+        ''' A process forked by a zygote, with the interface of Popen used by the referee. It is not a
+        child of the referee, the zygote reaps it : it is alive as long as its pid exists. '''
+        self.pid        = pid
+        self.stdin      = None
+        self.stdout     = None
+        self.stderr     = None
+        self.returncode = None
+
+    def poll(self):
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, 0)
+            except OSError:
+                self.returncode = -signal.SIGKILL
+        return self.returncode
+
+    def kill(self):
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    def wait(self):
+        while self.poll() is None:
+            time.sleep(0.001)
+        return self.returncode
+
+class Zygote(object):
+    def __init__(self, interpreter, script):
+        ''' A preloaded Python interpreter forking the processes of an engine or a bot (see zygote.py)
+
+        Args:
+          interpreter (string): The Python interpreter of the engine or bot
+          script      (string): Its script
+        '''
+        self.script  = script
+        self.process = subprocess.Popen([interpreter, zygote_script, script], stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, stderr=open(os.devnull, 'w'))
+        if self.process.stdout.readline().strip() != 'ready':
+            raise OSError('The zygote of {} could not start'.format(script))
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def spawn(self, arguments, stderr_path=None, stderr_pipe=False):
+        ''' Forks a process running the script
+
+        Args:
+          arguments   (list):   The arguments of the script
+          stderr_path (string): The file where its error stream is written, None to discard it
+          stderr_pipe (bool):   Gives its error stream to the referee instead, as the stderr of the process
+
+        Returns:
+          A ZygoteProcess, talking through its standard streams as if it had been started by Popen
+        '''
+        fifos    = tempfile.mkdtemp(prefix='cg_zygote_')
+        fifo_in  = os.path.join(fifos, 'stdin')
+        fifo_out = os.path.join(fifos, 'stdout')
+        fifo_err = os.path.join(fifos, 'stderr') if stderr_pipe else None
+        outputs  = [fifo_out] + ([fifo_err] if stderr_pipe else [])
+        for fifo in [fifo_in] + outputs:
+            os.mkfifo(fifo)
+        # Opening the reading ends first does not wait for the child
+        fds = [os.open(fifo, os.O_RDONLY | os.O_NONBLOCK) for fifo in outputs]
+        try:
+            self.process.stdin.write(json.dumps({'argv':        arguments,
+                                                 'stdin':       fifo_in,
+                                                 'stdout':      fifo_out,
+                                                 'stderr':      stderr_path and os.path.abspath(stderr_path),
+                                                 'stderr_fifo': fifo_err}) + '\n')
+            self.process.stdin.flush()
+            answer = self.process.stdout.readline().strip()
+            if not answer.isdigit():
+                raise OSError('The zygote of {} could not fork : {}'.format(self.script, answer or 'it died'))
+            process = ZygoteProcess(int(answer))
+
+            # The writing end can only be opened once the child opened the reading end
+            while True:
+                try:
+                    fds.insert(0, os.open(fifo_in, os.O_WRONLY | os.O_NONBLOCK))
+                    break
+                except OSError as e:
+                    if e.errno != errno.ENXIO or process.poll() is not None:
+                        raise
+                    time.sleep(0.0005)
+        except:
+            for fd in fds:
+                os.close(fd)
+            raise
+        finally:
+            # The child opens its outputs before its stdin, so every FIFO is open by now
+            for fifo in [fifo_in] + outputs:
+                os.unlink(fifo)
+            os.rmdir(fifos)
+
+        for fd in fds:
+            fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) & ~os.O_NONBLOCK)
+        process.stdin  = os.fdopen(fds[0], 'wb', 0)
+        process.stdout = os.fdopen(fds[1], 'rb', 0)
+        if stderr_pipe:
+            process.stderr = os.fdopen(fds[2], 'rb', 0)
+        return process
+
+def get_zygote(command):
+    ''' The zygote of the current process for a command line, started if needed. Returns None if the
+    command is not a Python interpreter directly followed by a script. '''
+    if len(command) < 2 or 'python' not in os.path.basename(command[0]) or not command[1].endswith('.py'):
+        return None
+    key = (command[0], command[1])
+    if key not in zygotes or not zygotes[key].alive():
+        zygotes[key] = Zygote(command[0], command[1])
+    return zygotes[key]
+
+# Engine classes already imported by the current process, indexed by their "Plugin" string
+plugins = {}
+
+def load_plugin(spec):
+    ''' Imports an engine plugin class
+
+    Args:
+      spec (string): "path/to/module.py:ClassName"
+    '''
+    if spec not in plugins:
+        path, cls_name = spec.rsplit(':', 1)
+        # The module can import its neighbours
+        directory = os.path.dirname(os.path.abspath(path))
+        if directory not in sys.path:
+            sys.path.insert(0, directory)
+        module = imp.load_source(os.path.splitext(os.path.basename(path))[0], path)
+        plugins[spec] = getattr(module, cls_name)
+    return plugins[spec]
+
+class EnginePlugin(object):
+    def __init__(self, cls, seed, log_file, options):
+        ''' A game engine running inside the referee process. The engine class must provide :
+          - a constructor taking the file where to write its logs (None if not logged) and
+            the "Plugin options" of the Game section as keyword arguments,
+          - init(seed), starting a new game, the seed being a string as it would be on the command line,
+          - next_request(), returning a couple (code, data) : (-1, ranking) at the end of the game,
+            (0, None) if the current bot is dead, or (N, block) where block holds the N lines to
+            send to the current bot, each one ending with an end of line,
+          - apply(action), applying the answer of the current bot.
+
+        Args:
+          cls      (class):  The engine class
+          seed     (int):    The seed of the game
+          log_file (file):   Where the engine writes its logs, or None
+          options  (dict):   Keyword arguments of the constructor
+        '''
+        self.log_file = log_file
+        self.engine   = cls(log_file, **options)
+        self.engine.init(seed)
+        self.stderr_buffer = log_file if isinstance(log_file, (RingBuffer, ArchiveStream)) else None
+
+    def next_request(self):
+        return self.engine.next_request()
+
+    def apply(self, action):
+        self.engine.apply(action)
+
+    def stop(self):
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+
+
+# Binary replays, see ReplayWriter
+replay_magic       = 'CGRP'
+replay_index_magic = 'CGRX'
+replay_version     = 1
+REC_INPUT, REC_DEAD, REC_ANSWER, REC_END = range(1, 5)
+replay_record = struct.Struct('<BBiI') # Kind, bot, value, size of the payload
+replay_footer = struct.Struct('<QI4s') # Offset of the index, number of turns, magic
+
+class ReplayWriter(object):
+    def __init__(self, path, meta):
+        ''' Records the traffic between the engine and the bots during one game. The file starts with
+        'CGRP', the version (uint16), the size (uint32) and the text of a JSON header describing the game.
+        Then come the records, each one made of its kind (uint8), the bot (uint8), a value (int32),
+        the size of the payload (uint32) and the payload :
+          - REC_INPUT  : the inputs of a turn for the bot, the value being the number of lines,
+          - REC_DEAD   : the bot is dead for this turn (code 0),
+          - REC_ANSWER : the answer given to the engine, the value being the response time in
+                         microseconds, or -1 if the referee answered for a bot out of the game,
+          - REC_END    : the ranking line.
+        The file ends with the index : the offsets (uint64) of the first record of every turn, then the
+        offset of the index (uint64), the number of turns (uint32) and 'CGRX'. All numbers are little endian.
+
+        Args:
+          path (string): The file to write
+          meta (dict):   The JSON header
+        '''
+        meta = json.dumps(meta)
+        self.f       = open(path, 'wb', 1 << 16)
+        self.size    = 0
+        self.offsets = []
+        self.write(replay_magic + struct.pack('<HI', replay_version, len(meta)) + meta)
+
+    def write(self, data):
+        self.f.write(data)
+        self.size += len(data)
+
+    def record(self, kind, bot, value, payload=''):
+        self.write(replay_record.pack(kind, bot, value, len(payload)) + payload)
+
+    def request(self, bot, code, data):
+        ''' Records the request of the engine starting a turn, see EngineProcess.next_request '''
+        self.offsets.append(self.size)
+        if code == 0:
+            self.record(REC_DEAD, bot, 0)
+        else:
+            self.record(REC_INPUT, bot, code, data)
+
+    def answer(self, bot, line, elapsed=None):
+        ''' Records the answer given to the engine, elapsed being None if the bot did not answer itself '''
+        self.record(REC_ANSWER, bot, -1 if elapsed is None else int(elapsed * 1e6), line)
+
+    def end(self, ranking):
+        self.record(REC_END, 0, 0, ranking)
+
+    def close(self):
+        ''' Writes the index. A game interrupted by an error keeps the turns played so far. '''
+        if self.f.closed:
+            return
+        index = self.size
+        self.write(struct.pack('<{}Q'.format(len(self.offsets)), *self.offsets))
+        self.write(replay_footer.pack(index, len(self.offsets), replay_index_magic))
+        self.f.close()
+
+class ReplayReader(object):
+    def __init__(self, path):
+        ''' Reads a replay written by ReplayWriter. The file is mapped in memory and only the records
+        of the turns asked for are decoded.
+
+        Args:
+          path (string): The replay file
+        '''
+        self.f    = open(path, 'rb')
+        self.data = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:4] != replay_magic:
+            raise IOError('{} is not a replay'.format(path))
+        version, meta_size = struct.unpack_from('<HI', self.data, 4)
+        if version != replay_version:
+            raise IOError('{} : unsupported replay version {}'.format(path, version))
+        self.meta  = json.loads(self.data[10:10+meta_size])
+        self.start = 10 + meta_size
+
+        index, nturns, magic = replay_footer.unpack_from(self.data, len(self.data) - replay_footer.size)
+        if magic == replay_index_magic:
+            self.end     = index
+            self.offsets = np.frombuffer(self.data, dtype='<u8', count=nturns, offset=index)
+        else:
+            # The referee died before writing the index, it is rebuilt from the records
+            self.end     = len(self.data)
+            self.offsets = np.array([offset for offset, kind, _, _, _ in self.records()
+                                     if kind in (REC_INPUT, REC_DEAD)], dtype=np.uint64)
+
+    def __len__(self):
+        ''' Number of turns, counting every bot '''
+        return len(self.offsets)
+
+    def records(self, offset=None):
+        ''' Iterates over the records from an offset, as tuples (offset, kind, bot, value, payload) '''
+        offset = self.start if offset is None else int(offset)
+        while offset + replay_record.size <= self.end:
+            kind, bot, value, size = replay_record.unpack_from(self.data, offset)
+            payload_start = offset + replay_record.size
+            if payload_start + size > self.end:
+                return
+            yield offset, kind, bot, value, self.data[payload_start:payload_start+size]
+            offset = payload_start + size
+
+    def turn(self, n):
+        ''' Returns the turn n as a tuple (bot, code, inputs, answer, response time in seconds). The answer is
+        None if the game stopped before it, and the response time None if the referee answered for the bot. '''
+        records = self.records(self.offsets[n])
+        _, _, bot, code, inputs = next(records)
+        answer, elapsed = None, None
+        for _, kind, _, value, payload in records:
+            if kind == REC_ANSWER:
+                answer = payload
+                if value >= 0:
+                    elapsed = value * 1e-6
+            break
+        return bot, code, inputs if code != 0 else None, answer, elapsed
+
+    def ranking(self):
+        ''' Returns the ranking line, or None if the game did not end '''
+        last = self.offsets[-1] if len(self.offsets) else None
+        for _, kind, _, _, payload in self.records(last):
+            if kind == REC_END:
+                return payload
+        return None
+
+    def close(self):
+        self.offsets = None
+        self.data.close()
+        self.f.close()
+
+
+class Bot(object):
+    def __init__(self, name, bin_file, arguments, game_name, log_stderr=False, persistent=False,
+                 time_limit=t_limit, time_limit_first=t_limit_large, zygote=False, stderr_size=0,
+                 archive=None):
+        ''' Constructor for the Bot class
+
+        Args:
+          name             (string): Name of te bot
+          bin_file         (string): Path to the binary corresponding to the bot
+          game_name        (string): Name of the game
+          log_stderr       (bool):   Shall we log stderr to a file ?
+          persistent       (bool):   Shall we keep the process alive between games ?
+          time_limit       (float):  Time allowed to answer a turn, in seconds
+          time_limit_first (float):  Time allowed to answer the first turn, in seconds
+          zygote           (bool):   Shall we fork the process from a preloaded interpreter ?
+          stderr_size      (int):    If stderr is not logged, bytes of it kept in memory (see "Stderr buffer")
+          archive          (string): If stderr is logged, the codec of the "Log archive" it goes to, None for a file
+        '''
+        #print(' - Creating bot {}. Command line : {} {}'.format(name, bin_file, ' '.join(arguments)))
+        self.name       = name        
+        self.game_name  = game_name
+        self.arguments  = arguments
+        self.bin_file   = bin_file    
+        self.log_stderr = log_stderr  
+        self.persistent = persistent
+        self.t_limit    = time_limit
+        self.t_limit_large = time_limit_first
+        self.forfeited  = False
+        self.warm       = False
+        self.restarted  = False
+        self.cpu_start  = 0.0
+        self.games      = 0
+        self.stderr_f   = None        
+        self.process    = None
+        self.stdin      = None
+        self.stdout     = None
+        self.reader     = None
+        self.clock      = None        # PhaseClock of the current game, with "Profile phases"
+        self.zygote     = zygote
+        self.stderr_size   = stderr_size
+        self.archive       = archive
+        self.stderr_buffer = None     # RingBuffer or ArchiveStream of the error stream
+
+    def cpu_time(self):
+        ''' CPU time (user + system) consumed so far by all the threads of the bot process, None if it
+        can't be read. The scheduler statistics of the threads (/proc/<pid>/task/*/schedstat) count
+        nanoseconds but miss the threads that ended, /proc/<pid>/stat only counts clock ticks (10 ms)
+        but includes them : the larger of the two is kept. '''
+        try:
+            with open('/proc/{}/stat'.format(self.process.pid)) as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except (IOError, OSError, AttributeError):
+            return None
+        ticks = (int(fields[11]) + int(fields[12])) / float(os.sysconf('SC_CLK_TCK'))
+
+        threads  = 0.0
+        task_dir = '/proc/{}/task'.format(self.process.pid)
+        try:
+            tids = os.listdir(task_dir)
+        except (IOError, OSError):
+            tids = []
+        for tid in tids:
+            try:
+                with open(os.path.join(task_dir, tid, 'schedstat')) as f:
+                    threads += int(f.read().split()[0]) * 1e-9
+            except (IOError, OSError, ValueError, IndexError):
+                pass # Thread ended meanwhile, or no scheduler statistics
+        return max(ticks, threads)
+
+    def alive(self):
+        ''' Is the process of the bot still running ? '''
+        return self.process is not None and self.process.poll() is None
+
+    @timed_phase('spawn')
+    def start(self, log_dir):
+        ''' Starts the bot process and open descriptors to log the error stream if necessary.
+        A persistent bot that is still alive is only sent the new game signal.
+        
+        Args:
+          run (int): The id of the current run, to store the logs in the right subdir
+        '''
+        self.games += 1
+        self.forfeited = False
+        if self.persistent and self.alive():
+            try:
+                self.drain() # Written since the bot was parked
+                self.stdin.write(new_game_signal + '\n')
+                self.warm      = True
+                self.restarted = False
+                self.cpu_start = self.cpu_time() or 0.0
+                return
+            except IOError:
+                pass
+
+        # A persistent bot that crashed or was killed since the last game is restarted cleanly
+        self.restarted = self.persistent and self.games > 1
+        if self.process is not None:
+            self.stop(force=True)
+
+        self.warm      = False
+        self.cpu_start = 0.0
+        archived = self.log_stderr and self.archive is not None
+        buffered = not self.log_stderr and self.stderr_size > 0
+        logged   = self.log_stderr and not archived
+        zygote   = get_zygote([self.bin_file] + self.arguments) if self.zygote else None
+        if zygote is not None:
+            # The child opens its log itself
+            self.process = zygote.spawn(self.arguments[1:], log_dir + self.name + '.err' if logged else None,
+                                        archived or buffered)
+        else:
+            if logged:
+                self.stderr_f = open(log_dir + self.name + '.err', 'w')
+                stderr_f = self.stderr_f
+            elif archived or buffered:
+                stderr_f = subprocess.PIPE # Drained in the background, see StderrDrain
+            else:
+                stderr_f = devnull # Nothing appears on screen, and a chatty bot can't fill a pipe
+
+            self.process = subprocess.Popen([self.bin_file] + self.arguments, stdin=subprocess.PIPE,
+                                            stdout=subprocess.PIPE, stderr=stderr_f)
+        self.stderr_buffer = None
+        if archived:
+            self.stderr_buffer = stderr_drain().add(self.process.stderr, ArchiveStream(self.archive))
+        elif buffered:
+            self.stderr_buffer = stderr_drain().add(self.process.stderr, RingBuffer(self.stderr_size))
+
+        # Redirecting handles
+        self.stdin  = self.process.stdin
+        self.stdout = self.process.stdout
+        self.reader = LineBuffer(self.stdout, 'Bot ' + self.name)
+
+    def read_line(self, timeout=None):
+        ''' Reads one line of output of the bot
+
+        Args:
+          timeout (float): Maximum time to wait for the line in seconds, None to wait forever
+
+        Returns:
+          The line without its end of line, or None if the bot did not answer in time
+        '''
+        return self.reader.read_line(timeout)
+
+    def drain(self, max_reads=64):
+        ''' Discards the output of the bot that was not read as an answer (lines written after its last
+        answer of a game), so that the next game does not take it for the answer to its first turn.
+
+        Args:
+          max_reads (int): Maximum number of reads, so that a bot writing endlessly can't hold the referee
+        '''
+        if self.reader is None:
+            return
+        try:
+            for _ in range(max_reads):
+                if self.reader.eof or not self.reader.wait(0):
+                    break
+        except (IOError, OSError):
+            pass # The bot closed its output, it is restarted at its next game
+        self.reader.data = ''
+
+    def forfeit(self):
+        ''' Kills a bot that exceeded its time limit. It is then out of the game. '''
+        self.forfeited = True
+        self.stop(force=True)
+
+    @timed_phase('teardown')
+    def stop(self, force=False):
+        ''' Stops the process running the bot. Persistent bots are kept alive unless forced to stop.
+
+        Args:
+          force (bool): Kill the process even if the bot is persistent
+        '''
+        if self.persistent and not force:
+            return
+
+        if self.alive():
+            self.process.kill()
+        if self.process is not None:
+            self.process.wait()
+            self.process = None
+        if self.log_stderr and self.stderr_f is not None:
+            self.stderr_f.close()
+            self.stderr_f = None
+
+
+class MultiplexedGame(object):
+    def __init__(self, referee, run_info):
+        ''' A game driven by the event loop of Referee.run_multiplexed rather than by blocking reads.
+        It speaks the same protocol with the engine as Referee.run_game.
+
+        Args:
+          referee  (Referee): The referee of the session
+          run_info (tuple):   The id of the run, the path to the logs, the seed and the seats, see Referee.run_game
+        '''
+        self.referee  = referee
+        self.ite, self.log_dir, self.seed, self.seats = run_info
+        self.engine    = None
+        self.bots      = []
+        self.buffers   = {}      # descriptor -> LineBuffer of the outputs of the engine and the bots
+        self.writers   = {}      # descriptor -> PipeWriter of their inputs
+        self.stats     = None
+        self.replay    = None
+        self.finished  = False
+
+        self.state     = 'code'  # What we are waiting for : 'code', 'rank', 'lines', 'block' or 'answer'
+        self.cur_bot   = 0
+        self.turn      = 0
+        self.exec_code = 0
+        self.remaining = 0       # Lines or bytes still to forward to the bot
+        self.inputs    = []      # Inputs forwarded so far for the turn, for the replay
+        self.t_start   = None
+        self.cpu_start = None
+        self.deadline  = None  # Monotonic time at which the current bot forfeits, if time limits are hard
+        self.t_game    = None  # Monotonic time at which the game started
+        self.clock     = PhaseClock() if referee.profile_phases else None
+
+    def start(self):
+        ''' Starts the processes of the game. Returns False if the game could not be started '''
+        print(' - Playing run {}'.format(self.ite+1))
+        self.t_game = monotonic()
+        if self.clock is not None:
+            self.clock.switch('spawn')
+        try:
+            self.engine = self.referee.start_engine(self.log_dir, self.seed)
+            self.bots = self.referee.init_bots(self.seats)
+            for bot in self.bots:
+                bot.clock = self.clock
+                bot.start(self.log_dir)
+        except (OSError, IOError) as e:
+            self.fail(e)
+            return False
+        finally:
+            if self.clock is not None:
+                self.clock.switch(None)
+
+        self.stats  = self.referee.init_stats(self.ite, self.seats, self.bots)
+        self.replay = self.referee.start_recorder(self.log_dir, self.seed, self.seats)
+        self.buffers[self.engine.reader.fd] = self.engine.reader
+        self.bot_buffers = [bot.reader for bot in self.bots]
+        for buf in self.bot_buffers:
+            self.buffers[buf.fd] = buf
+        # A bot that stops reading its inputs must not block the other games of the process
+        self.engine_writer = PipeWriter(self.engine.stdin)
+        self.bot_writers   = [PipeWriter(bot.stdin) for bot in self.bots]
+        for writer in [self.engine_writer] + self.bot_writers:
+            self.writers[writer.fd] = writer
+        return True
+
+    def close_writers(self):
+        ''' Makes the inputs of the processes blocking again, as the persistent bots go on with other games '''
+        for writer in self.writers.values():
+            writer.close()
+
+    def fail(self, error):
+        ''' Ends the game on an error '''
+        print('Error while running run {} : {}: {}'.format(self.ite+1, type(error).__name__, error))
+        self.close_writers()
+        if self.engine is not None:
+            self.engine.stop()
+        # We don't know in which state the bots are, so persistent ones are restarted next game
+        for bot in self.bots:
+            bot.stop(force=True)
+        self.referee.park_bots(self.bots, self.seats)
+        if self.stats is None:
+            self.stats = self.referee.init_stats(self.ite, self.seats, self.bots)
+        self.stats['error'] = type(error).__name__
+        if self.replay is not None:
+            self.replay.close()
+        self.finished = True
+
+    def record(self):
+        ''' The record of the game once it is over, see Referee.game_over '''
+        for bot in self.bots:
+            bot.clock = None
+        if self.referee.stderr_size > 0 and not self.referee.settings['Log stderr']:
+            self.referee.dump_stderr(self.ite, self.engine, self.bots, self.stats)
+        elif self.referee.log_archive is not None and self.referee.settings['Log stderr']:
+            self.referee.archive_logs(self.ite, self.engine, self.bots)
+        self.stats['duration'] = monotonic() - self.t_game
+        return self.referee.game_over(self.stats, self.seed, self.clock)
+
+    def on_readable(self, fd):
+        ''' Reads the data available on a descriptor and moves the game forward as much as possible '''
+        buf = self.buffers[fd]
+        if self.clock is not None:
+            self.clock.switch('forward to bot' if buf is self.engine.reader else 'forward to engine')
+        try:
+            buf.fill()
+            self.advance()
+            # Only a bot that forfeited is allowed to close its output before the end of the game
+            forfeited = [bot.forfeited for bot, b in zip(self.bots, self.bot_buffers) if b is buf]
+            if buf.eof and not self.finished and not any(forfeited):
+                raise IOError('Unexpected end of stream')
+        except Exception as e:
+            self.fail(e)
+        if self.clock is not None:
+            self.clock.switch(None)
+
+    def on_writable(self, fd):
+        ''' Writes the data waiting for a pipe that can take it again '''
+        try:
+            self.writers[fd].flush()
+        except Exception as e:
+            self.fail(e)
+
+    def next_bot(self):
+        self.cur_bot  = (self.cur_bot + 1) % len(self.bots)
+        self.turn    += 1
+        self.state    = 'code'
+        self.deadline = None
+
+    def answer(self, line, elapsed=None):
+        ''' Sends the answer of the current bot to the engine and moves to the next bot
+
+        Args:
+          line    (string): The answer
+          elapsed (float):  The response time of the bot, None if the referee answers for it
+        '''
+        if debug:
+            log(self.bots[self.cur_bot].name, 'Engine', line)
+        if self.replay is not None:
+            self.replay.answer(self.cur_bot, line, elapsed)
+        self.engine_writer.write(line + '\n')
+        self.next_bot()
+
+    def forward(self, data):
+        ''' Sends inputs of the current turn to the current bot, self.remaining being already updated '''
+        bot = self.bots[self.cur_bot]
+        if self.replay is not None:
+            self.inputs.append(data)
+            if self.remaining == 0:
+                self.replay.request(self.cur_bot, self.exec_code, ''.join(self.inputs))
+                self.inputs = []
+        if bot.forfeited:
+            # The bot is out of the game, the engine gets the timeout answer right away
+            if self.remaining == 0:
+                self.answer(timeout_answer)
+            return
+
+        if self.t_start is None and self.referee.time_basis == 'cpu':
+            self.cpu_start = bot.cpu_time()
+        self.bot_writers[self.cur_bot].write(data)
+        if self.t_start is None:
+            self.t_start = monotonic()
+            if self.referee.hard_limits:
+                self.deadline = self.t_start + self.referee.time_limit(self.bots, self.cur_bot, self.turn)
+        if self.remaining == 0:
+            self.state = 'answer'
+
+    def check_deadline(self, now):
+        ''' Makes the current bot forfeit if its deadline has passed
+
+        Args:
+          now (float): The current monotonic time
+        '''
+        if self.finished or self.deadline is None or now < self.deadline:
+            return
+        # With the CPU time basis, the bot may not have used its time yet
+        left = self.referee.time_left(self.bots[self.cur_bot], self.referee.time_limit(self.bots, self.cur_bot, self.turn),
+                                      self.t_start, self.cpu_start, now)
+        if left > 0:
+            self.deadline = now + left
+            return
+        if self.clock is not None:
+            self.clock.switch('forward to engine')
+        try:
+            self.referee.forfeit(self.ite, self.bots, self.cur_bot, self.turn, now - self.t_start, self.stats)
+            self.bot_writers[self.cur_bot].pending = '' # The bot is dead
+            self.answer(timeout_answer)
+            self.advance()
+        except Exception as e:
+            self.fail(e)
+        if self.clock is not None:
+            self.clock.switch(None)
+
+    def advance(self):
+        ''' Consumes the complete lines received so far, following the protocol of run_game '''
+        while not self.finished:
+            bot = self.bots[self.cur_bot]
+            if self.state == 'block':
+                if not self.engine.reader.data:
+                    return
+                block = self.engine.reader.take(self.remaining)
+                self.remaining -= len(block)
+                if debug:
+                    log('Engine', bot.name, block.rstrip('\n'))
+                self.forward(block)
+                continue
+
+            if self.state == 'answer':
+                line = self.bot_buffers[self.cur_bot].readline()
+            else:
+                line = self.engine.reader.readline()
+            if line is None:
+                return
+
+            if self.state == 'code':
+                header = line.split()
+                exec_code = int(header[0])
+                if debug:
+                    log('Engine', 'Referee', line)
+                self.exec_code = exec_code
+                if exec_code < 0:
+                    self.state = 'rank'
+                elif exec_code == 0:
+                    if self.replay is not None:
+                        self.replay.request(self.cur_bot, 0, None)
+                    self.next_bot()
+                elif len(header) > 1:
+                    self.remaining = int(header[1])
+                    self.t_start   = None
+                    self.state     = 'block'
+                else:
+                    self.remaining = exec_code
+                    self.t_start   = None
+                    self.state     = 'lines'
+            elif self.state == 'rank':
+                if debug:
+                    log('Engine', 'Referee', line)
+                if line == 'tied':
+                    ranking = 'tied'
+                else:
+                    ranking = [int(x) for x in line.split(' ')]
+                self.stats['ranking'] = ranking
+                if self.clock is not None:
+                    self.clock.switch('teardown')
+                self.close_writers()
+                self.referee.park_bots(self.bots, self.seats)
+                if self.replay is not None:
+                    self.replay.end(line)
+                    self.replay.close()
+                self.finished = True
+            elif self.state == 'lines':
+                # Forwarding at once all the lines already received for the bot
+                lines = [line]
+                while len(lines) < self.remaining:
+                    line = self.engine.reader.readline()
+                    if line is None:
+                        break
+                    lines += [line]
+                if debug:
+                    for line in lines:
+                        log('Engine', bot.name, line)
+
+                self.remaining -= len(lines)
+                self.forward('\n'.join(lines) + '\n')
+            else:
+                t_end = monotonic()
+                self.referee.check_time(self.ite, self.bots, self.cur_bot, self.turn, self.t_start, t_end,
+                                        self.cpu_start, self.stats)
+                self.answer(line, t_end - self.t_start)
+
+
+# Default parameters of the SPRT : the first bot is tested for being stronger than the second one
+# by at least Elo1 (H1) against being at most Elo0 stronger (H0), with error rates Alpha and Beta
+sprt_defaults = {'Elo0': 0.0, 'Elo1': 10.0, 'Alpha': 0.05, 'Beta': 0.05, 'Min games': 20}
+
+def elo_to_score(elo):
+    ''' Expected score of a bot stronger by elo points '''
+    return 1.0 / (1.0 + 10.0 ** (-elo / 400.0))
+
+def score_to_elo(score):
+    return -400.0 * np.log10(1.0 / score - 1.0)
+
+def constrained_mle(freqs, outcomes, mean):
+    ''' The probabilities of the outcomes maximizing the likelihood of the frequencies observed, among
+    the distributions of the given mean score. They are p_i = f_i / (1 + x (a_i - mean)), where x solves
+    sum(f_i (a_i - mean) / (1 + x (a_i - mean))) = 0, found by bisection as this sum decreases with x.
+
+    Args:
+      freqs    (list):  Frequencies of the outcomes, all positive, summing to 1
+      outcomes (list):  Scores of the outcomes, between 0 and 1
+      mean     (float): Mean score of the distribution, strictly between 0 and 1
+    '''
+    shifts = [a - mean for a in outcomes]
+    f  = lambda x: sum(p * d / (1.0 + x * d) for p, d in zip(freqs, shifts))
+    lo = -1.0 / max(shifts) * (1.0 - 1e-12)
+    hi = -1.0 / min(shifts) * (1.0 - 1e-12)
+    for i in range(100):
+        mid = 0.5 * (lo + hi)
+        if f(mid) > 0:
+            lo = mid
+        else:
+            hi = mid
+    x = 0.5 * (lo + hi)
+    return [p / (1.0 + x * d) for p, d in zip(freqs, shifts)]
+
+def sprt(wins, losses, ties, elo0, elo1, alpha, beta, min_games=0):
+    ''' Sequential probability ratio test on the results of the first bot against the second one. The
+    log-likelihood ratio is the exact one of the trinomial model (win, tie, loss), each hypothesis
+    taking the distribution of the results most likely given the expected score of its Elo difference.
+    Half a win and half a loss are added to the counts, so that a one-sided match can still be decided,
+    but not before min_games games.
+
+    Returns:
+      A dictionary holding the LLR, its bounds, the Elo difference with its 95% margin, and the
+      decision : 'H1', 'H0' or None while the test goes on
+    '''
+    w, l, d = wins + 0.5, losses + 0.5, float(ties)
+    n = w + l + d
+    score = (w + 0.5 * d) / n
+    var   = (w * (1.0 - score) ** 2 + l * score ** 2 + d * (0.5 - score) ** 2) / n
+
+    # Only the outcomes observed count in the likelihood
+    counts, outcomes = zip(*[(c, a) for c, a in ((w, 1.0), (d, 0.5), (l, 0.0)) if c > 0])
+    freqs = [c / n for c in counts]
+    p0 = constrained_mle(freqs, outcomes, elo_to_score(elo0))
+    p1 = constrained_mle(freqs, outcomes, elo_to_score(elo1))
+    llr = sum(c * math.log(q1 / q0) for c, q0, q1 in zip(counts, p0, p1))
+
+    lower = np.log(beta / (1.0 - alpha))
+    upper = np.log((1.0 - beta) / alpha)
+    margin = 1.96 * np.sqrt(var / n)
+    decision = None
+    if wins + losses + ties < min_games:
+        pass
+    elif llr >= upper:
+        decision = 'H1'
+    elif llr <= lower:
+        decision = 'H0'
+    return {'llr':      llr,
+            'lower':    lower,
+            'upper':    upper,
+            'elo':      score_to_elo(score),
+            'elo_low':  score_to_elo(max(score - margin, 1e-6)),
+            'elo_high': score_to_elo(min(score + margin, 1.0 - 1e-6)),
+            'decision': decision}
+
+# TrueSkill parameters of the tournament ratings : rating and uncertainty of a new bot, deviation of
+# the performance of a bot in one game, dynamic factor keeping the ratings open to changes, and draw
+# margin (about 10% of draws between bots of equal ratings)
+ts_mu      = 25.0
+ts_sigma   = ts_mu / 3.0
+ts_beta    = ts_sigma / 2.0
+ts_tau     = ts_sigma / 100.0
+ts_epsilon = 0.74
+
+def norm_pdf(x):
+    return math.exp(-x * x / 2.0) / math.sqrt(2.0 * math.pi)
+
+def norm_cdf(x):
+    return 0.5 * (1.0 + math.erf(x / math.sqrt(2.0)))
+
+def trueskill_update(winner, loser, tie=False):
+    ''' Updates in place the ratings [mu, sigma] of two bots after one of them beat the other
+
+    Args:
+      winner (list): Rating of the winner
+      loser  (list): Rating of the loser
+      tie    (bool): The game is a tie, the order of the bots does not matter
+    '''
+    for r in (winner, loser):
+        r[1] = math.sqrt(r[1] ** 2 + ts_tau ** 2)
+    c = math.sqrt(2.0 * ts_beta ** 2 + winner[1] ** 2 + loser[1] ** 2)
+    t = (winner[0] - loser[0]) / c
+    e = ts_epsilon / c
+    if tie:
+        p = max(norm_cdf(e - t) - norm_cdf(-e - t), 1e-12)
+        v = (norm_pdf(-e - t) - norm_pdf(e - t)) / p
+        w = v ** 2 + ((e - t) * norm_pdf(e - t) + (e + t) * norm_pdf(e + t)) / p
+    else:
+        x = t - e
+        p = norm_cdf(x)
+        v = norm_pdf(x) / p if p > 1e-12 else -x
+        w = v * (v + x)
+
+    for r, sign in ((winner, 1.0), (loser, -1.0)):
+        r[0] += sign * r[1] ** 2 / c * v
+        r[1] *= math.sqrt(max(1.0 - r[1] ** 2 / c ** 2 * w, 1e-6))
+
+def match_quality(r1, r2):
+    ''' Probability of a draw between two bots, relative to the one between two equal bots : close to 1
+    for an even match, close to 0 for a foregone one '''
+    c2 = 2.0 * ts_beta ** 2 + r1[1] ** 2 + r2[1] ** 2
+    return math.sqrt(2.0 * ts_beta ** 2 / c2) * math.exp(-(r1[0] - r2[0]) ** 2 / (2.0 * c2))
+
+class Tournament(object):
+    def __init__(self, params, names):
+        ''' Schedules the games of a tournament between the bots of the Bots list, a few of them
+        per game, and rates the bots as the results come in.
+
+        Args:
+          params (dict): The "Tournament" dictionary of the settings
+          names  (list): The names of the bots
+        '''
+        n = len(names)
+        self.names    = names
+        self.mode     = params.get('Mode', 'round robin')
+        self.players  = params.get('Players', 2)
+        self.ratings  = [[ts_mu, ts_sigma] for name in names]
+        self.score    = np.zeros((n, n)) # Points of the bot of the row against the bot of the column, 1 by win, 0.5 by tie
+        self.met      = np.zeros((n, n)) # Games between the bot of the row and the bot of the column
+        self.games    = np.zeros(n, dtype=int)
+        self.pending  = {}               # Games in progress, by group of bots (sorted)
+        self.schedule = None             # Seats of every run, unless adaptive
+        self.started  = 0                # Games scheduled, for the rotation of the seats
+
+        per_pairing = params.get('Games per pairing', 2)
+        if self.mode == 'round robin':
+            groups = list(itertools.combinations(range(n), self.players))
+        elif self.mode == 'gauntlet':
+            challenger = names.index(params.get('Challenger', names[0]))
+            others = [i for i in range(n) if i != challenger]
+            groups = [(challenger,) + group for group in itertools.combinations(others, self.players - 1)]
+        elif self.mode == 'adaptive':
+            groups = None
+            self.length = params['Games']
+        else:
+            raise ValueError('Unknown tournament mode : {}'.format(self.mode))
+
+        if groups is not None:
+            # The seats are rotated over the games of a group, so that every bot plays from every seat
+            self.schedule = [list(group[k % self.players:] + group[:k % self.players])
+                             for group in groups for k in range(per_pairing)]
+            self.length = len(self.schedule)
+
+    def next_seats(self):
+        ''' Picks the most informative game to play next, for the adaptive mode : the bot whose rating
+        is the most uncertain, against the opponents giving the most even game while being uncertain
+        too. The games in progress count as reducing the uncertainty of their bots. '''
+        busy = np.zeros(len(self.names))
+        for group, count in self.pending.items():
+            busy[list(group)] += count
+        uncertainty = np.array([r[1] for r in self.ratings]) / np.sqrt(1.0 + self.games + busy)
+
+        group = [int(np.argmax(uncertainty))]
+        while len(group) < self.players:
+            candidates = [i for i in range(len(self.names)) if i not in group]
+            value = [uncertainty[i] * np.prod([match_quality(self.ratings[i], self.ratings[j]) for j in group])
+                     for i in candidates]
+            group += [candidates[int(np.argmax(value))]]
+
+        # Rotating the seats from a game to the next
+        k = self.started % self.players
+        self.started += 1
+        return group[k:] + group[:k]
+
+    def start(self, seats):
+        ''' Counts a game as in progress '''
+        group = tuple(sorted(seats))
+        self.pending[group] = self.pending.get(group, 0) + 1
+
+    def finish(self, seats):
+        group = tuple(sorted(seats))
+        if self.pending.get(group):
+            self.pending[group] -= 1
+
+    def update(self, seats, ranking):
+        ''' Updates the ratings with the result of a game
+
+        Args:
+          seats   (list):           The indices of the bots, in the order of their seats
+          ranking (list or string): The seats in order, or 'tied'
+        '''
+        if ranking == 'tied':
+            order = list(seats)
+        else:
+            order = [seats[seat] for seat in ranking]
+
+        self.games[order] += 1
+        for rank, i in enumerate(order):
+            for j in order[rank+1:]:
+                self.met[i, j] += 1
+                self.met[j, i] += 1
+                if ranking == 'tied':
+                    self.score[i, j] += 0.5
+                    self.score[j, i] += 0.5
+                else:
+                    self.score[i, j] += 1
+
+        # A game between several bots is rated as the games between the bots of consecutive ranks
+        for i, j in zip(order[:-1], order[1:]):
+            trueskill_update(self.ratings[i], self.ratings[j], ranking == 'tied')
+
+    def ladder(self):
+        ''' Returns the rows of the ladder, best first : name, mu, sigma, conservative rating
+        (mu - 3 sigma), games and score in percents against the opponents met '''
+        rows = []
+        for i, name in enumerate(self.names):
+            mu, sigma = self.ratings[i]
+            met = self.met[i].sum()
+            score = 100.0 * self.score[i].sum() / met if met else 0.0
+            rows += [[name, mu, sigma, mu - 3 * sigma, int(self.games[i]), score]]
+        return sorted(rows, key=lambda row: -row[3])
+
+# Digests of the files already read by the current process, indexed by their path
+file_digests = {}
+
+def file_digest(path):
+    ''' SHA-1 of the content of a file '''
+    if path not in file_digests:
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), ''):
+                h.update(chunk)
+        file_digests[path] = h.hexdigest()
+    return file_digests[path]
+
+def command_id(args):
+    ''' Identifies a command line : the arguments naming a file are replaced by its digest, so the
+    identity changes when a binary or a script is modified '''
+    return [file_digest(arg) if os.path.isfile(arg) else arg for arg in args]
+
+class ResultCache(object):
+    def __init__(self, path, max_size):
+        ''' Results of deterministic games stored on disk, one small JSON file per game, named after
+        its key. When the files take more than max_size bytes, the least recently used ones are removed.
+
+        Args:
+          path     (string): The folder of the cache
+          max_size (int):    Maximum size of the cache in bytes
+        '''
+        self.path     = path
+        self.max_size = max_size
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+    def get(self, key):
+        ''' Returns the result stored for a key, or None '''
+        entry = os.path.join(self.path, key)
+        try:
+            with open(entry, 'r') as f:
+                result = json.load(f)
+        except (IOError, ValueError):
+            return None
+        os.utime(entry, None) # Marks the entry as recently used
+        return result
+
+    def put(self, key, result):
+        entry = os.path.join(self.path, key)
+        with open(entry + '.tmp', 'w') as f:
+            json.dump(result, f)
+        os.rename(entry + '.tmp', entry)
+
+    def evict(self):
+        ''' Removes the least recently used entries until the cache fits in its maximum size '''
+        entries = []
+        for name in os.listdir(self.path):
+            st = os.stat(os.path.join(self.path, name))
+            entries += [(st.st_mtime, st.st_size, name)]
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_size:
+                break
+            os.remove(os.path.join(self.path, name))
+            total -= size
+
+
+# Tables of the results database, see ResultStore. The lists of a game (seats, ranking) are stored as JSON.
+results_schema = '''
+CREATE TABLE IF NOT EXISTS sessions (id INTEGER PRIMARY KEY, started TEXT, finished TEXT, game TEXT,
+                                     game_version TEXT, runs INTEGER, config TEXT);
+CREATE TABLE IF NOT EXISTS bots     (session INTEGER, bot INTEGER, name TEXT, version TEXT, PRIMARY KEY (session, bot));
+CREATE TABLE IF NOT EXISTS games    (session INTEGER, run INTEGER, seed INTEGER, seats TEXT, ranking TEXT,
+                                     duration REAL, error TEXT, reused INTEGER, PRIMARY KEY (session, run));
+CREATE TABLE IF NOT EXISTS results  (session INTEGER, run INTEGER, bot INTEGER, seat INTEGER, rank INTEGER,
+                                     timeouts INTEGER, PRIMARY KEY (session, run, bot));
+CREATE TABLE IF NOT EXISTS turns    (session INTEGER, run INTEGER, bot INTEGER, turn INTEGER, latency REAL, cpu REAL);
+CREATE INDEX IF NOT EXISTS games_seed     ON games (seed);
+CREATE INDEX IF NOT EXISTS bots_name      ON bots (name);
+CREATE INDEX IF NOT EXISTS bots_version   ON bots (version);
+CREATE INDEX IF NOT EXISTS results_bot    ON results (session, bot);
+CREATE INDEX IF NOT EXISTS turns_game     ON turns (session, run, bot);
+'''
+
+class ResultStore(object):
+    def __init__(self, path, turns=False, batch=256, period=5.0):
+        ''' Records the games of the sessions in a SQLite database, in the main process. Every session
+        gets its id in the table sessions, with the name and digest (see Referee.session_ids) of its
+        bots in bots. Every game is a row of games, and a row of results for each of its bots, its rank
+        being None if the game failed (0 for every bot of a tied game). With turns, the response time
+        and CPU time of every turn of the bots are stored in turns. The rows are inserted by batches, in
+        one transaction, so that millions of them don't slow down the session. See results.py to
+        compare the sessions.
+
+        Args:
+          path   (string): The database file, created if needed
+          turns  (bool):   Shall we store every turn ?
+          batch  (int):    Games inserted at once
+          period (float):  Seconds after which the games waiting are inserted, even if the batch is not full
+        '''
+        self.path    = path
+        self.turns   = turns
+        self.batch   = batch
+        self.period  = period
+        self.session = None
+        self.pending = []
+        self.t_flush = monotonic()
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(results_schema)
+
+    def __getstate__(self):
+        # The processes of the pool get a copy of the referee, but only the main process writes
+        state = dict(self.__dict__)
+        state['db'] = None
+        state['pending'] = []
+        return state
+
+    def start(self, game, game_version, bots, bot_versions, runs, config):
+        ''' Creates the session
+
+        Args:
+          game         (string): Name of the game
+          game_version (string): Digest of the engine
+          bots         (list):   Names of the bots
+          bot_versions (list):   Digests of the bots
+          runs         (int):    Runs of the session
+          config       (dict):   The parameter file
+        '''
+        with self.db:
+            cursor = self.db.execute('INSERT INTO sessions (started, game, game_version, runs, config) VALUES (?, ?, ?, ?, ?)',
+                                     (datetime.datetime.now().isoformat(), game, game_version, runs, json.dumps(config)))
+            self.session = cursor.lastrowid
+            self.db.executemany('INSERT INTO bots VALUES (?, ?, ?, ?)',
+                                [(self.session, i, name, version) for i, (name, version) in enumerate(zip(bots, bot_versions))])
+
+    def add(self, stats, reused=False):
+        ''' Adds a finished game, see Referee.game_over. A game taken from the journal or the cache is reused. '''
+        self.pending.append((stats, reused))
+        if len(self.pending) >= self.batch or monotonic() - self.t_flush > self.period:
+            self.flush()
+
+    def flush(self):
+        ''' Inserts the games waiting '''
+        games, results, turns = [], [], []
+        for stats, reused in self.pending:
+            run     = stats['run']
+            seats   = stats['seats']
+            ranking = stats['ranking']
+            games.append((self.session, run, stats.get('seed'), json.dumps(seats), json.dumps(ranking),
+                          stats.get('duration'), stats.get('error'), int(reused)))
+            for seat, bot in enumerate(seats):
+                if ranking is None:
+                    rank = None
+                elif ranking == 'tied':
+                    rank = 0
+                else:
+                    rank = ranking.index(seat)
+                results.append((self.session, run, bot, seat, rank, stats['timeouts'][bot]))
+                if self.turns and 'latency' in stats:
+                    times = stats['latency'][bot][0] + stats['latency'][bot][1]
+                    cpu   = stats['cpu'][bot][0] + stats['cpu'][bot][1]
+                    cpu   = cpu + [None] * (len(times) - len(cpu))
+                    turns.extend((self.session, run, bot, turn, t, c) for turn, (t, c) in enumerate(zip(times, cpu)))
+        with self.db:
+            self.db.executemany('INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?)', games)
+            self.db.executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)', results)
+            if turns:
+                self.db.executemany('INSERT INTO turns VALUES (?, ?, ?, ?, ?, ?)', turns)
+        self.pending = []
+        self.t_flush = monotonic()
+
+    def close(self):
+        ''' Inserts the last games and marks the session as finished '''
+        self.flush()
+        with self.db:
+            self.db.execute('UPDATE sessions SET finished = ? WHERE id = ?', (datetime.datetime.now().isoformat(), self.session))
+        self.db.close()
+
+
+# Defaults of the "Distributed" settings : address of the coordinator, seconds between two signs of life
+# of a worker, and seconds after which an idle worker plays again a game still running on another worker.
+# The key authenticating the workers has no default : the messages are pickled, so whoever knows the key
+# can run code on the coordinator, and the coordinator runs its commands on the workers.
+distributed_defaults = {'Address': '127.0.0.1:6000', 'Heartbeat': 5.0, 'Steal after': 30.0}
+
+def parse_address(address):
+    ''' Turns "host:port" into a (host, port) tuple '''
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+class RemoteTask(object):
+    def __init__(self, tid, method, args):
+        ''' A game (or a batch of games) handed to the workers by the Coordinator. It has the
+        interface of the results of Pool.apply_async.
+
+        Args:
+          tid    (int):    Identifier of the task in the session
+          method (string): The method of the Referee playing it, run_game or run_multiplexed
+          args   (tuple):  Its arguments
+        '''
+        self.id      = tid
+        self.method  = method
+        self.args    = args
+        self.workers = set() # Workers playing the task
+        self.started = None  # When it was first handed to a worker
+        self.result  = None
+        self.done    = threading.Event()
+
+    def ready(self):
+        return self.done.is_set()
+
+    def wait(self, timeout=None):
+        self.done.wait(timeout)
+
+    def get(self):
+        self.done.wait()
+        return self.result
+
+
+class Coordinator(object):
+    def __init__(self, params, config):
+        ''' Hands the games of a session to the workers connecting over TCP (see serve_worker), in
+        place of a Pool. Every worker plays as many games at a time as it has slots.
+        A worker that disconnects or stops sending signs of life is dropped, and its games are
+        queued again. A worker left without games plays again the oldest game running elsewhere for
+        more than "Steal after" seconds, the first result being kept, so a slow machine does not
+        hold the end of the session.
+
+        Args:
+          params (dict): The "Distributed" dictionary of the settings
+          config (dict): The content of the parameter file, sent to the workers
+        '''
+        params = dict(distributed_defaults, **params)
+        self.config      = config
+        self.heartbeat   = float(params['Heartbeat'])
+        self.steal_after = float(params['Steal after'])
+        self.queue       = collections.deque() # Tasks waiting for a worker
+        self.running     = {}                  # Tasks handed to a worker and not finished, by id
+        self.workers     = {}                  # Slots of the workers connected, by name
+        self.threads     = []
+        self.next_id     = 0
+        self.closed      = False
+        self.cond        = threading.Condition()
+
+        self.authkey  = params.get('Authkey', '').encode('utf-8') # JSON strings are unicode
+        if not self.authkey:
+            self.authkey = binascii.hexlify(os.urandom(16))
+            print(' - No "Authkey" given, the workers must be started with --authkey {}'.format(self.authkey))
+        self.listener = Listener(parse_address(params['Address']), authkey=self.authkey)
+        self.acceptor = threading.Thread(target=self.accept)
+        self.acceptor.daemon = True
+        self.acceptor.start()
+        print(' - Waiting for workers on {}'.format(params['Address']))
+
+    def slots(self):
+        ''' Number of games the workers connected can play at the same time '''
+        with self.cond:
+            return sum(self.workers.values())
+
+    def apply_async(self, func, args):
+        with self.cond:
+            task = RemoteTask(self.next_id, func.__name__, args)
+            self.next_id += 1
+            self.queue.append(task)
+        return task
+
+    def accept(self):
+        ''' Accepts the workers, each one being served by its own thread '''
+        while not self.closed:
+            try:
+                conn = self.listener.accept()
+            except mp.AuthenticationError:
+                print('Warning : a worker failed to authenticate')
+                continue
+            except (IOError, socket.error):
+                break
+            if self.closed:
+                conn.close()
+                break
+            thread = threading.Thread(target=self.serve, args=(conn,))
+            thread.daemon = True
+            thread.start()
+            self.threads += [thread]
+
+    def take(self, name):
+        ''' Returns the next task for a worker, or None. Must be called with the lock held. '''
+        now = monotonic()
+        if self.queue:
+            task = self.queue.popleft()
+        else:
+            # Work stealing : the oldest task running alone on another worker for too long
+            late = [task for task in self.running.values() if not task.ready() and len(task.workers) == 1
+                    and name not in task.workers and now - task.started > self.steal_after]
+            if not late:
+                return None
+            task = min(late, key=lambda task: task.started)
+
+        if task.started is None:
+            task.started = now
+        task.workers.add(name)
+        self.running[task.id] = task
+        return task
+
+    def complete(self, tid, result):
+        ''' Records the result of a task, unless another worker returned it first '''
+        with self.cond:
+            task = self.running.pop(tid, None)
+        if task is not None:
+            task.result = result
+            task.done.set()
+
+    def serve(self, conn):
+        ''' Talks with one worker : sends it games while it has free slots, and receives the results '''
+        name     = None
+        assigned = set()
+        try:
+            hello = conn.recv()
+            name, slots = hello['name'], hello['slots']
+            conn.send({'config': self.config, 'heartbeat': self.heartbeat})
+            with self.cond:
+                self.workers[name] = slots
+            if not self.closed:
+                print(' - Worker {} connected ({} slots)'.format(name, slots))
+
+            last = monotonic()
+            while not self.closed:
+                tasks = []
+                with self.cond:
+                    while len(assigned) + len(tasks) < slots:
+                        task = self.take(name)
+                        if task is None:
+                            break
+                        tasks += [task]
+                for task in tasks:
+                    assigned.add(task.id)
+                    conn.send((task.id, task.method, task.args))
+
+                if conn.poll(0.05):
+                    message = conn.recv()
+                    last = monotonic()
+                    if message[0] == 'result':
+                        assigned.discard(message[1])
+                        self.complete(message[1], message[2])
+                elif monotonic() - last > 3 * self.heartbeat:
+                    raise IOError('no sign of life for {:.0f} s'.format(monotonic() - last))
+            conn.send(None)
+        except (EOFError, IOError, socket.error) as e:
+            if name is not None:
+                print('Warning : worker {} lost ({})'.format(name, str(e) or type(e).__name__))
+        finally:
+            conn.close()
+            with self.cond:
+                self.workers.pop(name, None)
+                # The games of the worker that nobody else plays are queued again
+                requeued = 0
+                for tid in assigned:
+                    task = self.running.get(tid)
+                    if task is None:
+                        continue
+                    task.workers.discard(name)
+                    if not task.workers:
+                        del self.running[tid]
+                        self.queue.appendleft(task)
+                        requeued += 1
+            if requeued and not self.closed:
+                print(' - {} runs of worker {} queued again'.format(requeued, name))
+
+    def close(self):
+        ''' Ends the session : the workers are released, and wait for the next one '''
+        self.closed = True
+
+    def join(self):
+        for thread in self.threads:
+            thread.join(1.0)
+
+        # Waking up the thread waiting for workers, so that it sees the session is over. The connection
+        # is made from another thread, in case the acceptor stopped on its own and never answers it.
+        waker = threading.Thread(target=self.wake)
+        waker.daemon = True
+        waker.start()
+        self.acceptor.join(1.0)
+        self.listener.close()
+
+    def wake(self):
+        host, port = self.listener.address
+        try:
+            Client(('127.0.0.1' if host == '0.0.0.0' else host, port), authkey=self.authkey).close()
+        except (EOFError, IOError, socket.error, mp.AuthenticationError):
+            pass
+
+
+class Progress(object):
+    def __init__(self, total, period=2.0):
+        ''' Follows the games finished during a session, in the main process, and prints the progress
+        at most every period seconds : games done, games per second and estimated time left.
+
+        Args:
+          total  (int):   Number of games to play, at most
+          period (float): Seconds between two prints
+        '''
+        self.total  = total
+        self.period = period
+        self.done   = 0
+        self.errors = collections.Counter() # Games that failed, by type of error
+        self.start  = monotonic()
+        self.last   = self.start
+
+    def update(self, stats):
+        self.done += 1
+        if stats['error'] is not None:
+            self.errors[stats['error']] += 1
+
+        now = monotonic()
+        if now - self.last >= self.period or self.done == self.total:
+            self.last = now
+            print(self.summary(now))
+
+    def summary(self, now=None, eta=True):
+        elapsed = (now or monotonic()) - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        s = ' - Progress : {}/{} games, {:.2f} games/s'.format(self.done, self.total, rate)
+        if eta and rate > 0 and self.done < self.total:
+            s += ', ETA {}'.format(datetime.timedelta(seconds=int((self.total - self.done) / rate)))
+        if self.errors:
+            s += ', errors : ' + ', '.join('{} {}'.format(name, count) for name, count in sorted(self.errors.items()))
+        return s
+
+
+class Referee(object):
+    def __init__(self, param_file, resume=False):
+        ''' Constructor for the Referee class
+        
+        Args:
+          param_file (string): Path to the JSON file holding the parameters of the game
+          resume     (bool):   Plays only the runs missing from the journal of the previous session
+        '''
+        # Reading the JSON-param file
+        f_in = open(param_file, 'r')
+        data_s = f_in.read()
+        config = json.loads(data_s)
+        f_in.close()
+
+        print(' - Reading parameter file : {}'.format(param_file))
+        self.load_config(config)
+
+        # Are we logging the results ?
+        if self.settings['Log scores']:
+            self.score_log = open('runs/' + self.game_name + '/scores.log', 'w')
+        else:
+            self.score_log = None
+
+        self.runs = int(self.settings['Runs'])
+
+        # Every seed is played with several seatings of the bots, to cancel the advantage of a seat
+        nbots = len(self.bots_list)
+        self.seatings = [list(range(nbots))]
+        permutations = self.settings.get('Seat permutations')
+        if permutations == 'mirror':
+            self.seatings += [list(reversed(range(nbots)))]
+        elif permutations == 'all':
+            self.seatings = [list(p) for p in itertools.permutations(range(nbots))]
+        elif permutations is not None:
+            print('Warning : unknown "Seat permutations" {}, the bots keep their seats'.format(permutations))
+        if 'Tournament' in self.settings and len(self.seatings) > 1:
+            print('Warning : a tournament rotates the seats itself, "Seat permutations" is ignored')
+            self.seatings = self.seatings[:1]
+        self.runs *= len(self.seatings)
+
+        # Tournament between the bots, a few of them per game. The schedule sets the number of runs.
+        self.tournament = None
+        if 'Tournament' in self.settings:
+            self.tournament = Tournament(self.settings['Tournament'], [bot['Name'] for bot in self.bots_list])
+            self.runs = self.tournament.length
+            print(' - Tournament ({}) : {} games of {} players'.format(self.tournament.mode, self.runs,
+                                                                    self.tournament.players))
+
+        # Sequential test stopping a head-to-head session once it is decided
+        self.sprt = None
+        if 'SPRT' in self.settings:
+            if self.tournament is not None:
+                print('Warning : the SPRT is ignored in a tournament')
+            elif len(self.bots_list) == 2:
+                self.sprt = dict(sprt_defaults, **self.settings['SPRT'])
+                self.sprt_stop = None # Result of the test once decided, see sprt_result
+            else:
+                print('Warning : the SPRT compares two bots, it is ignored')
+
+        # Every finished game is appended to the journal, so an interrupted session can be resumed
+        self.journal = 'runs/' + self.game_name + '/journal.jsonl'
+        self.resume  = resume
+
+        # Results of the games already played with the same binaries and seeds
+        self.cache = None
+        if 'Result cache' in self.settings:
+            if self.game_dict.get('Deterministic', True):
+                self.cache = ResultCache(self.settings['Result cache'],
+                                         int(self.settings.get('Result cache size', 64) * 1024 * 1024))
+                self.game_id, self.bot_ids = self.session_ids()
+                print(' - Result cache : {}'.format(self.settings['Result cache']))
+                # Only the games of the bots that are not deterministic are always played
+                random_bots = [bot['Name'] for bot in self.bots_list if not bot.get('Deterministic', True)]
+                if random_bots:
+                    print(' - Not cached : the games of {}, not deterministic'.format(', '.join(random_bots)))
+            else:
+                print(' - Result cache disabled : the game is not deterministic')
+
+        # Games played by workers on other machines, see Coordinator
+        self.distributed = self.settings.get('Distributed')
+
+        # Every game recorded in a SQLite database, see ResultStore
+        self.store = None
+        if 'Results database' in self.settings:
+            self.store = ResultStore(self.settings['Results database'], self.settings.get('Results turns', False))
+            print(' - Results database : {}'.format(self.settings['Results database']))
+
+        if "Seed" in self.settings:
+            random.seed(self.settings['Seed'])
+            self.seed_base = self.settings['Seed']
+        else:
+            random.seed()
+            self.seed_base = random.randint(0, 1 << 31)
+
+
+        print('Playing games :')
+        self.run()
+
+    def load_config(self, config):
+        ''' Reads the description of the game, of the bots and the settings playing a game needs
+
+        Args:
+          config (dict): The content of the parameter file
+        '''
+        # Distributing the values over dictionaries
+        self.config    = config
+        self.game_dict = config['Game']
+        self.bots_list = config['Bots']
+        self.settings  = config['Settings']
+
+        self.game_name = self.game_dict['Name']
+        print(' - Refering for game : {}'.format(self.game_name))
+
+        # Engines given as a plugin are imported once, before the threads are created
+        self.plugin = None
+        if 'Plugin' in self.game_dict:
+            self.plugin = load_plugin(self.game_dict['Plugin'])
+            print(' - Engine plugin : {}'.format(self.game_dict['Plugin']))
+
+        # We make sure the necessary subfolders exist
+        if not os.path.exists('runs'):
+            os.mkdir('runs')
+
+        if not os.path.exists('runs/' + self.game_name):
+            os.mkdir('runs/' + self.game_name)
+
+        # Time limits of the bots, in seconds. When hard, a bot exceeding them is killed and forfeits.
+        self.t_limit       = self.settings.get('Time limit', t_limit)
+        self.t_limit_large = self.settings.get('Time limit first turn', t_limit_large)
+        self.hard_limits   = self.settings.get('Hard time limits', False)
+
+        # The time limits apply to the wall time or to the CPU time of the bots. With the CPU affinity, every
+        # process of the pool (and the games it plays) gets its own cores.
+        self.time_basis = self.settings.get('Time basis', 'wall')
+        self.affinity   = self.settings.get('CPU affinity', False)
+
+        # Forking the Python engines and bots from preloaded interpreters
+        self.zygote = self.settings.get('Zygote', False)
+
+        # Without "Log stderr", the last KB of the error streams kept in memory, written to the folder of
+        # the run when it fails or times out, and every N runs
+        self.stderr_size   = int(self.settings.get('Stderr buffer', 0) * 1024)
+        self.stderr_sample = self.settings.get('Stderr sample', 0)
+
+        # With "Log stderr", the error streams of a session compressed into the segments of runs/<Game>/logs/
+        # instead of a file per stream and run
+        self.log_archive     = self.settings.get('Log archive') or None
+        self.archive_segment = int(self.settings.get('Archive segment size', 64) * 1024 * 1024)
+        self.archive_keep    = self.settings.get('Archive segments kept', 0)
+        if self.log_archive is True:
+            self.log_archive = 'gzip'
+        if self.log_archive not in (None, 'gzip', 'zstd'):
+            print('Warning : unknown "Log archive" {}, gzip is used'.format(self.log_archive))
+            self.log_archive = 'gzip'
+        if self.log_archive == 'zstd' and zstandard is None:
+            print('Warning : the zstandard module is missing, the log archive uses gzip')
+            self.log_archive = 'gzip'
+
+        # Time spent by the games in every phase, and cProfile statistics of every process
+        self.profile_phases  = self.settings.get('Profile phases', False)
+        self.profile_workers = self.settings.get('Profile workers', False)
+
+        # Recording the traffic of every game in runs/<Game>/run_<i>/replay.cgr
+        self.record_replays = self.settings.get('Record replays', False)
+
+    def session_ids(self):
+        ''' Digests of everything deciding the result of a game, except the seed and the bots seated :
+        the engine command (with the digest of the files it names, and of its "Dependencies") and the
+        time limits, then the same for every bot.
+
+        Returns:
+          The digest of the game and the list of the digests of the bots
+        '''
+        game = {'Dependencies': command_id(self.game_dict.get('Dependencies', [])),
+                'Hard time limits': self.hard_limits}
+        if self.plugin is not None:
+            game['Plugin']  = command_id(self.game_dict['Plugin'].rsplit(':', 1))
+            game['Options'] = self.game_dict.get('Plugin options', {})
+        else:
+            game['Command'] = command_id(self.engine_command('$seed'))
+        bots = [{'Command':      command_id([bot['Bin']] + bot['Arguments']),
+                 'Dependencies': command_id(bot.get('Dependencies', [])),
+                 'Limits':       [bot.get('Time limit', self.t_limit), bot.get('Time limit first turn', self.t_limit_large)]}
+                for bot in self.bots_list]
+        digest = lambda x: hashlib.sha1(json.dumps(x, sort_keys=True)).hexdigest()
+        return digest(game), [digest(bot) for bot in bots]
+
+    def cacheable(self, seats):
+        ''' Can the result of a game played by the bots seated be cached ? Only if they are all deterministic. '''
+        return self.cache is not None and all(self.bots_list[i].get('Deterministic', True) for i in seats)
+
+    def cache_key(self, seed, seats):
+        ''' Key of the result of the game played with a seed by the bots seated, in this order '''
+        return hashlib.sha1(':'.join([self.game_id] + [self.bot_ids[i] for i in seats] + [str(seed)])).hexdigest()
+
+    def init_bots(self, seats):
+        ''' Initialises bots for the run
+
+        Args:
+          seats (list): The indices in the Bots list of the bots playing, in the order of their seats
+        '''
+        bots = []
+        for i in seats:
+            bot = self.bots_list[i]
+            if warm_bots.get(i):
+                bots += [warm_bots[i].pop()]
+                continue
+
+            b_name       = bot['Name']
+            b_bin        = bot['Bin']
+            b_arguments  = bot['Arguments']
+            b_persistent = bot.get('Persistent', False)
+            b_limit      = bot.get('Time limit', self.t_limit)
+            b_limit_1st  = bot.get('Time limit first turn', self.t_limit_large)
+            stderr       = (self.settings['Log stderr'])
+            b_zygote     = bot.get('Zygote', self.zygote)
+            bots += [Bot(b_name, b_bin, b_arguments, self.game_dict["Name"], stderr, b_persistent,
+                         b_limit, b_limit_1st, b_zygote, self.stderr_size, self.log_archive)]
+        return bots
+
+    def park_bots(self, bots, seats):
+        ''' Stops the bots at the end of a game. Persistent ones are kept for the next games of this process.
+
+        Args:
+          bots  (list): The bots of the game
+          seats (list): The indices of the bots in the Bots list
+        '''
+        for i, bot in zip(seats, bots):
+            bot.stop()
+            if bot.persistent:
+                bot.drain()
+                if not warm_bots:
+                    # Pool workers run the finalizers at exit, so the warm processes die with them
+                    multiprocessing.util.Finalize(None, release_warm_bots, exitpriority=10)
+                warm_bots.setdefault(i, []).append(bot)
+
+    def start_engine(self, log_dir, seed):
+        ''' Starts the game engine for one run, in its own process or as a plugin
+
+        Args:
+          log_dir (string): The folder where the logs of the run are stored
+          seed    (int):    The seed given to the game in place of $seed
+
+        Returns:
+          An EngineProcess or an EnginePlugin
+        '''
+        archived = self.settings['Log stderr'] and self.log_archive is not None
+        buffered = not self.settings['Log stderr'] and self.stderr_size > 0
+        logged   = self.settings['Log stderr'] and not archived
+        if self.plugin is not None:
+            log_file = None
+            if logged:
+                log_file = open(log_dir + self.game_dict['Name'] + '.log', 'w')
+            elif archived:
+                log_file = ArchiveStream(self.log_archive)
+            elif buffered:
+                log_file = RingBuffer(self.stderr_size)
+            # The seed is given as it would be on the command line, so both kinds of engines play the same games
+            return EnginePlugin(self.plugin, str(seed), log_file, self.game_dict.get('Plugin options', {}))
+
+        start_list = self.engine_command(seed)
+
+        zygote = get_zygote(start_list) if self.game_dict.get('Zygote', self.zygote) else None
+        if zygote is not None:
+            log_file = log_dir + self.game_dict['Name'] + '.log' if logged else None
+            process  = zygote.spawn(start_list[2:], log_file, archived or buffered)
+        else:
+            if logged:
+                stderr_f = open(log_dir + self.game_dict['Name'] + '.log', 'w')
+            elif archived or buffered:
+                stderr_f = subprocess.PIPE # Drained in the background, see StderrDrain
+            else:
+                stderr_f = devnull # We don't get anything on the screen, and the engine can't fill a pipe
+
+            process = subprocess.Popen(start_list, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=stderr_f)
+        stderr_buffer = None
+        if archived:
+            stderr_buffer = stderr_drain().add(process.stderr, ArchiveStream(self.log_archive))
+        elif buffered:
+            stderr_buffer = stderr_drain().add(process.stderr, RingBuffer(self.stderr_size))
+        return EngineProcess(process, stderr_buffer)
+
+    def engine_command(self, seed):
+        ''' Command line of the game binary for a seed '''
+        game_bin   = self.game_dict['Game bin']
+
+        args = copy(self.game_dict['Arguments'])
+        for i, arg in enumerate(args):
+            if arg == '$seed':
+                args[i] = str(seed)
+
+        return [game_bin] + args
+
+    def start_recorder(self, log_dir, seed, seats):
+        ''' Opens the replay of a run if "Record replays" is set, returns None otherwise
+
+        Args:
+          log_dir (string):    The folder where the logs of the run are stored
+          seed    (int):       The seed of the game
+          seats   (list[int]): The bot of every seat, as indices in the Bots list
+        '''
+        if not self.record_replays:
+            return None
 
-def log(p_from, p_to, msg):
-    print('{} to {} -- {}'.format(p_from, p_to, msg))
+        if self.plugin is not None:
+            engine = {'plugin': self.game_dict['Plugin'], 'options': self.game_dict.get('Plugin options', {})}
+        else:
+            engine = {'command': self.engine_command(seed)}
+        meta = {'game':   self.game_name,
+                'seed':   str(seed),
+                'bots':   [self.bots_list[i]['Name'] for i in seats], # By seat, as the turns and the ranking
+                'engine': engine}
+        return ReplayWriter(log_dir + 'replay.cgr', meta)
 
-# Thanks to Steven Bethard for this nice trick, found on :
-# https://bytes.com/topic/python/answers/552476-why-cant-you-pickle-instancemethods
-# Allows the methods of Bot and Referee to be pickled for multiprocessing
-import copy_reg
-import types
+    def init_stats(self, ite, seats, bots):
+        ''' Creates the record returned for one game. The lists are indexed by seat until the game is over. '''
+        return {'run':         ite,
+                'seats':       seats,
+                'ranking':     None, # Seats of the bots in order or 'tied', None if the game failed
+                'error':       None, # Type of the exception that ended the game, if it failed
+                'startup_cpu': [None] * len(bots),
+                'warm':        [bot.warm for bot in bots],
+                'restarted':   [bot.restarted for bot in bots],
+                'timeouts':    [0] * len(bots),
+                'latency':     [([], []) for bot in bots], # Response times of the first turn and of the others
+                'cpu':         [([], []) for bot in bots]} # CPU times of the bots for the same turns
 
-def _pickle_method(method):
-    func_name = method.im_func.__name__
-    obj = method.im_self
-    cls = method.im_class
-    return _unpickle_method, (func_name, obj, cls)
+    def time_limit(self, bots, cur_bot, turn):
+        ''' Time allowed to the current bot for its turn, margin included, in seconds
 
-def _unpickle_method(func_name, obj, cls):
-    for cls in cls.__mro__:
-        try:
-            func = cls.__dict__[func_name]
-            return func.__get__(obj, cls)
-        except KeyError:
-            pass
-    return None
+        Args:
+          bots    (list): The bots of the game
+          cur_bot (int):  Index of the current bot
+          turn    (int):  Index of the turn in the game (counting every bot)
+        '''
+        if turn < len(bots):
+            return bots[cur_bot].t_limit_large * (1.0 + t_limit_sigma)
+        else:
+            return bots[cur_bot].t_limit * (1.0 + t_limit_sigma)
 
-copy_reg.pickle(types.MethodType, _pickle_method, _unpickle_method)
+    def time_left(self, bot, limit, t_start, cpu_start, now):
+        ''' Seconds the current bot can still take before it exceeds its time limit. With the "cpu" time
+        basis, only the CPU time of the bot counts, up to cpu_wall_factor times the limit in wall time.
+        As the CPU time never runs faster than the wall time, waiting for the time left can't miss the limit.
+
+        Args:
+          bot       (Bot):   The current bot
+          limit     (float): Its time limit, see time_limit
+          t_start   (float): Time at which the inputs were sent
+          cpu_start (float): CPU time of the bot at that time, None if unknown
+          now       (float): The current monotonic time
+        '''
+        wall = now - t_start
+        cpu  = bot.cpu_time() if self.time_basis == 'cpu' and cpu_start is not None else None
+        if cpu is None:
+            return limit - wall
+        return min(limit - (cpu - cpu_start), limit * cpu_wall_factor - wall)
 
-lock = mp.Lock()
-rankings = None
+    def read_answer(self, bot, limit, t_start, cpu_start):
+        ''' Reads the answer of the current bot, or returns None once it exceeded its time limit if the
+        time limits are hard (see time_left) '''
+        if not self.hard_limits:
+            return bot.read_line()
+        while True:
+            left = self.time_left(bot, limit, t_start, cpu_start, monotonic())
+            if left <= 0:
+                return None
+            line = bot.read_line(left)
+            if line is not None:
+                return line
 
-class Bot(object):
-    def __init__(self, name, bin_file, arguments, game_name, log_stderr=False):
-        ''' Constructor for the Bot class
+    def forfeit(self, ite, bots, cur_bot, turn, elapsed, stats):
+        ''' Kills the current bot after it exceeded its time limit and records the timeout
 
         Args:
-          name       (string): Name of te bot
-          bin_file   (string): Path to the binary corresponding to the bot
-          game_name  (string): Name of the game
-          log_stderr (bool):   Shall we log stderr to a file ?
+          ite     (int):   Id of the run
+          bots    (list):  The bots of the game
+          cur_bot (int):   Index of the bot that timed out
+          turn    (int):   Index of the turn in the game (counting every bot)
+          elapsed (float): Time waited for the bot
+          stats   (dict):  The statistics of the game
         '''
-        #print(' - Creating bot {}. Command line : {} {}'.format(name, bin_file, ' '.join(arguments)))
-        self.name       = name        
-        self.game_name  = game_name
-        self.arguments  = arguments
-        self.bin_file   = bin_file    
-        self.log_stderr = log_stderr  
-        self.stderr_f   = None        
-        self.process    = None
-        self.stdin      = None
-        self.stdout     = None
+        print('Run {} : Bot {} exceeds allocated time and forfeits !'.format(ite+1, bots[cur_bot].name))
+        stats['timeouts'][cur_bot] += 1
+        stats['latency'][cur_bot][turn >= len(bots)].append(elapsed)
+        bots[cur_bot].forfeit()
+
+    def check_time(self, ite, bots, cur_bot, turn, t_start, t_end, cpu_start, stats):
+        ''' Checks the response time of a bot after one of its turns
 
-    def start(self, log_dir):
-        ''' Starts the bot process and open descriptors to log the error stream if necessary
-        
         Args:
-          run (int): The id of the current run, to store the logs in the right subdir
+          ite       (int):   Id of the run
+          bots      (list):  The bots of the game
+          cur_bot   (int):   Index of the bot that just answered
+          turn      (int):   Index of the turn in the game (counting every bot)
+          t_start   (float): Time at which the inputs were sent
+          t_end     (float): Time at which the answer was received
+          cpu_start (float): CPU time of the bot when the inputs were sent, None if unknown
+          stats     (dict):  The statistics of the game
         '''
-        if self.log_stderr:
-            self.stderr_f = open(log_dir + self.name + '.err', 'w')
+        phase = turn >= len(bots)
+        # Reading the CPU time costs a few system calls per thread of the bot : it is only needed with the
+        # CPU time basis, and for the first answer of a persistent bot, whose startup time is reported
+        startup = turn < len(bots) and bots[cur_bot].persistent
+        cpu = bots[cur_bot].cpu_time() if self.time_basis == 'cpu' or startup else None
+        if cpu is not None and startup:
+            stats['startup_cpu'][cur_bot] = cpu - bots[cur_bot].cpu_start
+        if cpu is not None and cpu_start is not None:
+            cpu -= cpu_start
+            stats['cpu'][cur_bot][phase].append(cpu)
         else:
-            self.stderr_f = subprocess.PIPE # We pipe so nothing appears on screen
+            cpu = None
 
-        self.process = subprocess.Popen([self.bin_file] + self.arguments, stdin=subprocess.PIPE,
-                                        stdout=subprocess.PIPE, stderr=self.stderr_f)
+        stats['latency'][cur_bot][phase].append(t_end - t_start)
+        if self.time_basis == 'cpu' and cpu is not None:
+            if cpu > self.time_limit(bots, cur_bot, turn):
+                print('Run {} : Bot {} exceeds allocated CPU time !'.format(ite+1, bots[cur_bot].name))
+        elif (t_end - t_start) > self.time_limit(bots, cur_bot, turn):
+            print('Run {} : Bot {} exceeds allocated time !'.format(ite+1, bots[cur_bot].name))
 
-        # Redirecting handles
-        self.stdin  = self.process.stdin
-        self.stdout = self.process.stdout
+    def start_journal(self, seeds):
+        ''' Starts the journal of a new session. The first line describes the session, the other ones
+        are the results of the games, in the order they finish.
 
-    def stop(self):
-        ''' Stops the process running the bot. '''
-        self.process.kill()
-        if self.log_stderr:
-            self.stderr_f.close()
+        Args:
+          seeds (list): The seed of every run
+        '''
+        with open(self.journal, 'w') as f:
+            f.write(json.dumps({'bots': [bot['Name'] for bot in self.bots_list], 'seeds': seeds}) + '\n')
 
+    def load_journal(self, seeds):
+        ''' Reads the journal of the session to resume
 
-class Referee(object):
-    def __init__(self, param_file):
-        ''' Constructor for the Referee class
-        
         Args:
-          param_file (string): Path to the JSON file holding the parameters of the game
+          seeds (list): The seeds of the runs, used if there is no journal to resume
+
+        Returns:
+          The seeds of the session in the journal, and a dictionary of the results of the finished
+          runs indexed by their id
         '''
-        global seed_bank
-        
-        # Reading the JSON-param file
-        f_in = open(param_file, 'r')
-        data_s = f_in.read()
-        config = json.loads(data_s)
-        f_in.close()
+        if not os.path.exists(self.journal):
+            print(' - No journal to resume, starting a new session')
+            self.start_journal(seeds)
+            return seeds, {}
 
-        print(' - Reading parameter file : {}'.format(param_file))
+        with open(self.journal, 'r') as f:
+            lines = f.readlines()
+        header = json.loads(lines[0])
+        if len(header['seeds']) != self.runs or header['bots'] != [bot['Name'] for bot in self.bots_list]:
+            print('Error : the journal {} was written for other runs or bots, it can not be resumed'.format(self.journal))
+            exit(1)
 
-        # Distributing the values over dictionaries
-        self.game_dict = config['Game']
-        self.bots_list = config['Bots']
-        self.settings  = config['Settings']
+        done = {}
+        for line in lines[1:]:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue # Last line cut by the interruption
+            done[result['run']] = result
+        return header['seeds'], done
 
-        self.game_name = self.game_dict['Name']
-        print(' - Refering for game : {}'.format(self.game_name))
+    def error_streams(self, engine, bots):
+        ''' The buffered error streams of a game, once the processes that ended wrote their last bytes
 
-        # We make sure the necessary subfolders exist
-        if not os.path.exists('runs'):
-            os.mkdir('runs')
+        Args:
+          engine: The EngineProcess or EnginePlugin of the game, None if it did not start
+          bots (list): The bots of the game
 
-        if not os.path.exists('runs/' + self.game_name):
-            os.mkdir('runs/' + self.game_name)
+        Returns:
+          A list of couples (name of the log file, RingBuffer or ArchiveStream)
+        '''
+        streams = [(self.game_dict['Name'] + '.log', engine.stderr_buffer if engine is not None else None, None)]
+        streams += [(bot.name + '.err', bot.stderr_buffer, bot) for bot in bots]
+        streams = [(name, buf, bot) for name, buf, bot in streams if buf is not None]
+        for name, buf, bot in streams:
+            # The last bytes of a process that ended may still be in the pipe
+            if bot is None or bot.process is None or bot.process.poll() is not None:
+                buf.closed.wait(0.2)
+        return [(name, buf) for name, buf, bot in streams]
 
-        # Are we logging the results ?
-        if self.settings['Log scores']:
-            self.score_log = open('runs/' + self.game_name + '/scores.log', 'w')
+    def archive_logs(self, ite, engine, bots):
+        ''' Appends the error streams of a game to the "Log archive" of the process, see LogArchive '''
+        streams = self.error_streams(engine, bots)
+        if streams:
+            log_archive(self).write(ite+1, streams)
+
+    def dump_stderr(self, ite, engine, bots, stats):
+        ''' Writes the error streams kept by the "Stderr buffer" of a game to the folder of its run, if
+        the game failed, a bot timed out, or the run is sampled (see "Stderr sample")
+
+        Args:
+          ite    (int):  The id of the run
+          engine:        The EngineProcess or EnginePlugin of the game, None if it did not start
+          bots   (list): The bots of the game, in the order of their seats
+          stats  (dict): The statistics of the game, with its lists indexed by seat
+        '''
+        if stats['error'] is not None:
+            reason = 'failed'
+        elif any(stats['timeouts']):
+            reason = 'timeout'
+        elif self.stderr_sample and (ite + 1) % self.stderr_sample == 0:
+            reason = 'sample'
         else:
-            self.score_log = None
+            return
 
-        self.runs = int(self.settings['Runs'])
+        streams = self.error_streams(engine, bots)
+        if not streams:
+            return
 
-        if "Seed" in self.settings:
-            random.seed(self.settings['Seed'])
+        log_dir = 'runs/' + self.game_name + '/run_{:03d}'.format(ite+1) + '/'
+        if not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+        for name, buf in streams:
+            data, dropped = buf.getvalue()
+            with open(log_dir + name, 'w') as f:
+                if dropped:
+                    f.write('[{} bytes dropped]\n'.format(dropped))
+                f.write(data)
+        print('   . Error streams of run {} written to {} ({})'.format(ite+1, log_dir, reason))
+
+    def game_over(self, stats, seed, clock=None):
+        ''' Completes the statistics of a game once it is over : the lists indexed by seat are
+        indexed by bot instead, with None (0 for the timeouts) for the bots that did not play.
+        The finished games are written to the journal, except by a worker (see WorkerReferee).
+
+        Args:
+          stats (dict):       The statistics of the game
+          seed  (int):        The seed of the game
+          clock (PhaseClock): The time spent in every phase of the game, with "Profile phases"
+        '''
+        if clock is not None:
+            clock.switch(None)
+            stats['phases']  = clock.phases
+            stats['process'] = self.process_name()
+
+        nbots = len(self.bots_list)
+        for key, absent in (('startup_cpu', None), ('warm', None), ('restarted', None), ('timeouts', 0)):
+            by_bot = [absent] * nbots
+            for i, value in zip(stats['seats'], stats[key]):
+                by_bot[i] = value
+            stats[key] = by_bot
+
+        for key in ('latency', 'cpu'):
+            by_bot = [([], []) for i in range(nbots)]
+            for i, value in zip(stats['seats'], stats[key]):
+                by_bot[i] = value
+            stats[key] = by_bot
+        stats['seed']    = seed
+
+        if stats['ranking'] is not None and self.journal is not None:
+            self.journal_result(stats, seed)
+        return stats
+
+    def journal_result(self, stats, seed):
+        ''' Appends the result of a finished game to the journal. Every process writes its own games,
+        each line with a single write so that they don't mix, and the line is on disk when this returns.
+
+        Args:
+          stats (dict): The statistics returned by run_game
+          seed  (int):  The seed of the game
+        '''
+        line = json.dumps({'run': stats['run'], 'seed': seed, 'seats': stats['seats'], 'ranking': stats['ranking'],
+                           'timeouts': stats['timeouts']})
+        fd = os.open(self.journal, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+        try:
+            os.write(fd, line + '\n')
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def head_to_head(self):
+        ''' Wins, losses and ties of the first bot against the second one, from the rankings '''
+        wins   = int(self.rankings[1, 1]) # Second bot ranked second
+        losses = int(self.rankings[0, 1]) # First bot ranked second
+        ties   = int(self.rankings[0, 0]) - wins
+        return wins, losses, ties
+
+    def sprt_result(self):
+        ''' Runs the SPRT on the games finished so far, see sprt. The test is over the first time it is
+        decided : its result is then kept as it was, with the wins, losses and ties at that time
+        ('counts'), and the games still running at that time do not change it. '''
+        if self.sprt_stop is not None:
+            return self.sprt_stop
+        p = self.sprt
+        counts = self.head_to_head()
+        res = sprt(*counts, elo0=p['Elo0'], elo1=p['Elo1'], alpha=p['Alpha'], beta=p['Beta'], min_games=p['Min games'])
+        res['counts'] = counts
+        if res['decision'] is not None:
+            self.sprt_stop = res
+        return res
+
+    def run_dynamic(self, next_run, on_result, nthreads, per_thread):
+        ''' Plays the runs handed out one by one by next_run. Only one game per thread (or one batch of
+        "Games per thread" games) is started at a time, so what is played next can depend on the
+        results of the games finished so far.
+
+        Args:
+          next_run   (function): Returns the run_info tuple of the next game to play (see run_game), or None to start no more
+          on_result  (function): Called in this process with the statistics of every game played, or None
+          nthreads   (int):      Number of processes playing, unless the games are played by the workers of a Coordinator
+          per_thread (int):      Games multiplexed by every process
+
+        Returns:
+          The list of the statistics of the games played, see run_game
+        '''
+        def next_batch():
+            batch = []
+            while len(batch) < per_thread:
+                run_info = next_run()
+                if run_info is None:
+                    break
+                batch += [run_info]
+            return batch
+
+        results = []
+        def collect(stats_list):
+            for stats in stats_list:
+                self.collect(stats)
+                # The games of the workers are journaled by the coordinator
+                if self.distributed is not None and stats['ranking'] is not None:
+                    self.journal_result(stats, stats['seed'])
+                if on_result is not None:
+                    on_result(stats)
+            results.extend(stats_list)
+
+        if nthreads == 1 and self.distributed is None:
+            batch = next_batch()
+            while batch:
+                if per_thread > 1:
+                    collect(self.run_multiplexed(batch))
+                else:
+                    collect(self.run_games(batch))
+                batch = next_batch()
+            release_warm_bots()
         else:
-            random.seed()
-            
-        seed_bank = [random.randint(0, 100000) for _ in range(self.runs)]
+            if self.distributed is not None:
+                pool     = Coordinator(self.distributed, self.config)
+                capacity = pool.slots
+            else:
+                pool     = self.make_pool(nthreads)
+                capacity = lambda: nthreads
 
+            pending   = []
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < capacity():
+                    batch = next_batch()
+                    if not batch:
+                        exhausted = True
+                        break
+                    pending += [pool.apply_async(self.run_multiplexed if per_thread > 1 else self.run_games, (batch,))]
+                if not pending:
+                    if exhausted:
+                        break
+                    time.sleep(0.1) # No worker connected yet
+                    continue
 
-        print('Playing games :')
-        self.run()
+                pending[0].wait(0.01)
+                for task in [task for task in pending if task.ready()]:
+                    pending.remove(task)
+                    collect(task.get())
+            pool.close()
+            pool.join()
 
-    def init_bots(self):
-        ''' Initialises bots for the run '''
-        bots = []
-        for bot in self.bots_list:
-            b_name      = bot['Name']
-            b_bin       = bot['Bin']
-            b_arguments = bot['Arguments']
-            stderr      = (self.settings['Log stderr'])
-            bots += [Bot(b_name, b_bin, b_arguments, self.game_dict["Name"], stderr)]
-        return bots
+        return results
+
+    def report_sprt(self):
+        ''' Prints the result of the SPRT '''
+        p = self.sprt
+        res = self.sprt_result()
+        wins, losses, ties = res['counts']
+        names = [bot['Name'] for bot in self.bots_list]
+        print('SPRT (Elo0 = {}, Elo1 = {}, alpha = {}, beta = {}) :'.format(p['Elo0'], p['Elo1'], p['Alpha'], p['Beta']))
+        print(' - {} games : {} wins, {} losses, {} ties for {}'.format(wins + losses + ties, wins, losses, ties, names[0]))
+        final = self.head_to_head()
+        if final != res['counts']:
+            print('   ({} games in all with the games finished after the decision : {} wins, {} losses, {} ties)'.format(
+                sum(final), *final))
+        print(' - Elo difference : {:.1f} (95% : {:.1f} to {:.1f})'.format(res['elo'], res['elo_low'], res['elo_high']))
+        print(' - LLR = {:.2f} (bounds {:.2f} / {:.2f})'.format(res['llr'], res['lower'], res['upper']))
+        if res['decision'] == 'H1':
+            print(' - H1 accepted : {} is stronger than {} by at least {} Elo, with a {:.0%} risk of a false positive'.format(
+                names[0], names[1], p['Elo1'], p['Alpha']))
+        elif res['decision'] == 'H0':
+            print(' - H0 accepted : {} is not stronger than {} by more than {} Elo, with a {:.0%} risk of a false negative'.format(
+                names[0], names[1], p['Elo0'], p['Beta']))
+        else:
+            print(' - No decision, more runs are needed')
+
+    def tournament_result(self, stats):
+        ''' Rates the bots of a finished game of the tournament, and updates the ladder '''
+        self.tournament.finish(stats['seats'])
+        if stats['ranking'] is not None:
+            self.tournament.update(stats['seats'], stats['ranking'])
+        if self.settings['Log scores']:
+            self.write_ladder()
+
+    def write_ladder(self):
+        ''' Writes the ladder of the tournament to ladder.csv, and with the results of every pairing
+        to ladder.json, next to scores.log '''
+        t = self.tournament
+        rows = t.ladder()
+        with open('runs/' + self.game_name + '/ladder.csv', 'w') as f:
+            f.write('rank,bot,mu,sigma,conservative,games,score\n')
+            for rank, row in enumerate(rows):
+                f.write('{},{},{:.3f},{:.3f},{:.3f},{},{:.2f}\n'.format(rank + 1, *row))
+        with open('runs/' + self.game_name + '/ladder.json', 'w') as f:
+            json.dump({'mode':    t.mode,
+                       'ladder':  [dict(zip(('bot', 'mu', 'sigma', 'conservative', 'games', 'score'), row)) for row in rows],
+                       'bots':    t.names,
+                       'score':   t.score.tolist(),
+                       'met':     t.met.tolist()}, f, indent=2)
+
+    def report_tournament(self):
+        ''' Prints the ladder of the tournament '''
+        print('Ladder ({}, TrueSkill ratings, conservative rating = mu - 3 sigma) :'.format(self.tournament.mode))
+        print('{:<6}{:<15}\t{:>7}\t{:>7}\t{:>12}\t{:>6}\t{:>9}'.format('Rank', 'Bot name', 'mu', 'sigma',
+                                                                       'conservative', 'games', 'score (%)'))
+        for rank, row in enumerate(self.tournament.ladder()):
+            print('{:<6}{:<15}\t{:>7.2f}\t{:>7.2f}\t{:>12.2f}\t{:>6}\t{:>9.2f}'.format(rank + 1, *row))
+
+    def record_ranking(self, ranking, seats):
+        ''' Adds the result of a game to the rankings, in the main process
+
+        Args:
+          ranking (list or string): The seats of the bots in order, or 'tied'
+          seats   (list):           The indices of the bots in the Bots list, in the order of their seats
+        '''
+        # if tied : We add 1 to the first ranking of every bot
+        if ranking == 'tied':
+            for id_bot in seats:
+                self.rankings[id_bot, 0] += 1
+        else:
+            for rank, seat in enumerate(ranking):
+                self.rankings[seats[seat], rank] += 1
+
+    def collect(self, stats):
+        ''' Takes the record of a finished game in the main process : its ranking is counted, its result
+        is cached, and the progress of the session is updated '''
+        if stats['ranking'] is not None:
+            self.record_ranking(stats['ranking'], stats['seats'])
+        if self.store is not None:
+            self.store.add(stats)
+        if stats['ranking'] is not None and self.cacheable(stats['seats']):
+            # The key only knows the bots seated : their timeouts are stored by seat
+            self.cache.put(self.cache_key(stats['seed'], stats['seats']),
+                           {'ranking':       stats['ranking'],
+                            'seat_timeouts': [stats['timeouts'][bot] for bot in stats['seats']]})
+        self.progress.update(stats)
 
     def finalize(self):
         ''' Closing the log file descriptor '''
@@ -165,86 +2840,104 @@ class Referee(object):
         ''' Run one session of the game
         
         Args:
-          run_info (couple): A couple (int, string). The first element is the id of the run and the second
-                             the path to the log.
+          run_info (tuple): The id of the run, the path to the logs, the seed, and the indices in the
+                            Bots list of the bots playing, in the order of their seats.
+
+        Returns:
+          The record of the game, see init_stats, with its lists indexed by bot (see game_over)
         '''
-        global lock, rankings, seed_bank
-        
-        ite, log_dir, seed = run_info
+        ite, log_dir, seed, seats = run_info
         print(' - Playing run {}'.format(ite+1))
-        # Creating the program process
-        game_bin   = self.game_dict['Game bin']
-
-        args = copy(self.game_dict['Arguments'])
-        for i, arg in enumerate(args):
-            if arg == '$seed':
-                args[i] = str(seed)
-        
-        start_list = [game_bin] + args
-        
-        if self.settings['Log stderr']:
-            stderr_f = open(log_dir + self.game_dict['Name'] + '.log', 'w')
-        else:
-            stderr_f = subprocess.PIPE # We pipe so we don't get anything on the screen
-            
-        game_proc = subprocess.Popen(start_list, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
-                                     stderr=stderr_f)
-
-        # Creating the bots and starting them
-        bots = self.init_bots()
-        for bot in bots:
-            bot.start(log_dir)
+        engine = None
+        bots   = []
+        stats  = None
+        replay = None
+        clock  = PhaseClock() if self.profile_phases else None
+        t_game = monotonic()
 
         finished = False
         cur_bot = 0
         turn = 0
         try:
+            # Creating the program process
+            if clock is not None:
+                clock.switch('spawn')
+            engine = self.start_engine(log_dir, seed)
+
+            # Creating the bots and starting them
+            bots = self.init_bots(seats)
+            for bot in bots:
+                bot.clock = clock
+                bot.start(log_dir)
+
+            stats  = self.init_stats(ite, seats, bots)
+            replay = self.start_recorder(log_dir, seed, seats)
+
             while not finished:            
                 # Getting the exec code from the eval code :
-                exec_code = int(game_proc.stdout.readline())
+                if clock is not None:
+                    clock.switch('engine wait')
+                exec_code, data = engine.next_request()
                 if debug:
                     log('Engine', 'Referee', exec_code)
+                if replay is not None and exec_code >= 0:
+                    replay.request(cur_bot, exec_code, data)
                 # Behaviour depending on the code :
                 # < 0 : The game is finished and the bots are ranked in the next line
                 # = 0 : The current bot is not active anymore
                 # > 0 : The current bot is active and the system is providing exec_code lines to feed it
                 if exec_code < 0:
-                    rank_str = game_proc.stdout.readline().strip()
+                    rank_str = data.strip()
                     if debug:
                         log('Engine', 'Referee', rank_str)
+                    if replay is not None:
+                        replay.end(rank_str)
                     if rank_str == 'tied':
                         ranking = 'tied'
                     else:
                         ranking = [int(x) for x in rank_str.split(' ')]
                     finished = True
+                elif exec_code > 0 and bots[cur_bot].forfeited:
+                    # The bot is out of the game, the engine gets the timeout answer right away
+                    if clock is not None:
+                        clock.switch('forward to engine')
+                    line = timeout_answer
+                    if debug:
+                        log(bots[cur_bot].name, 'Engine', line)
+                    if replay is not None:
+                        replay.answer(cur_bot, line)
+                    engine.apply(line)
                 elif exec_code > 0:
                     # Sending input to the bot
-                    t_start = None
-                    t_end   = None
-                    for i in range(exec_code):
-                        line = game_proc.stdout.readline().strip()
-                        if debug:
-                            log('Engine', bots[cur_bot].name, line)
-
-                        bots[cur_bot].stdin.write(line+'\n')
-                        if i==0:
-                            t_start = time.time()
+                    if clock is not None:
+                        clock.switch('forward to bot')
+                    if debug:
+                        log('Engine', bots[cur_bot].name, data.rstrip('\n'))
+                    cpu_start = bots[cur_bot].cpu_time() if self.time_basis == 'cpu' else None
+                    bots[cur_bot].stdin.write(data)
+                    t_start = monotonic()
 
                     # Reading output
-                    line = bots[cur_bot].stdout.readline().strip()
-                    t_end = time.time()
+                    if clock is not None:
+                        clock.switch('bot wait')
+                    line  = self.read_answer(bots[cur_bot], self.time_limit(bots, cur_bot, turn), t_start, cpu_start)
+                    t_end = monotonic()
+                    if clock is not None:
+                        clock.switch('forward to engine')
 
-                    if turn < len(bots):
-                        max_time = t_limit_large * (1.0 + t_limit_sigma)
+                    elapsed = t_end - t_start
+                    if line is None:
+                        self.forfeit(ite, bots, cur_bot, turn, elapsed, stats)
+                        line    = timeout_answer
+                        elapsed = None
                     else:
-                        max_time = t_limit * (1.0 + t_limit_sigma)
-
-                    if (t_end - t_start) > max_time:
-                        print('Run {} : Bot {} exceeds allocated time !'.format(ite+1, bots[cur_bot].name))
+                        self.check_time(ite, bots, cur_bot, turn, t_start, t_end, cpu_start, stats)
                     
                     if debug:
                         log(bots[cur_bot].name, 'Engine', line)
-                    game_proc.stdin.write(line+'\n')
+                    if replay is not None:
+                        replay.answer(cur_bot, line, elapsed)
+                    engine.apply(line)
 
                 # Next bot
                 cur_bot = (cur_bot + 1) % len(bots)
@@ -258,60 +2951,348 @@ class Referee(object):
             else:
                 s += '; '.join(bots[i].name for i in ranking)
 
-            lock.acquire()
-            # if tied : We add 1 to the first ranking of every bot
-            sys.stdout.flush()
-            nbots = len(bots)
-            if ranking == 'tied':
-                for id_bot in range(nbots):
-                    rankings[id_bot * nbots] += 1
-            else:
-                nbots = len(ranking)
-                for rank, id_bot in enumerate(ranking):
-                    rankings[id_bot * nbots + rank] += 1
-            lock.release()
+            stats['ranking'] = ranking
 
             # Stopping the bots
+            if clock is not None:
+                clock.switch('teardown')
+            self.park_bots(bots, seats)
+            if self.plugin is not None:
+                engine.stop()
+        except Exception as e:
+            print('Error while running run {} : {}: {}'.format(ite+1, type(e).__name__, e))
+            if clock is not None:
+                clock.switch('teardown')
+            if engine is not None:
+                engine.stop()
+            # We don't know in which state the bots are, so persistent ones are restarted next game
             for bot in bots:
-                bot.stop()
-        except:
-            print('Error while running run {}'.format(ite+1))
+                bot.stop(force=True)
+            self.park_bots(bots, seats)
+            if stats is None:
+                stats = self.init_stats(ite, seats, bots)
+            stats['error'] = type(e).__name__
+
+        if replay is not None:
+            replay.close()
+        for bot in bots:
+            bot.clock = None
+        if self.stderr_size > 0 and not self.settings['Log stderr']:
+            self.dump_stderr(ite, engine, bots, stats)
+        elif self.log_archive is not None and self.settings['Log stderr']:
+            self.archive_logs(ite, engine, bots)
+        stats['duration'] = monotonic() - t_game
+        return self.game_over(stats, seed, clock)
+
+    @profiled
+    def run_multiplexed(self, runs, on_result=None):
+        ''' Plays a list of runs in the current process, with up to "Games per thread" games
+        in progress at the same time. Instead of blocking on one pipe, the process waits on the
+        outputs of the engines and bots of all its games and moves forward the ones that are ready.
+
+        Args:
+          runs      (list):     The run_info tuples to play, see run_game
+          on_result (function): Called with the record of every game as soon as it is over, or None
+
+        Returns:
+          The list of the statistics of the games, see run_game
+        '''
+        per_thread = self.settings.get('Games per thread', 1)
+        pending = list(runs)
+        games   = {}  # descriptor -> game
+        writing = {}  # descriptor of an input that can't take all its data yet -> game
+        results = []
+        poller  = select.poll()
+
+        while pending or games:
+            # Starting new games while there is room
+            while pending and len(set(games.values())) < per_thread:
+                game = MultiplexedGame(self, pending.pop(0))
+                if game.start():
+                    for fd in game.buffers:
+                        games[fd] = game
+                        poller.register(fd, select.POLLIN | select.POLLHUP)
+                else:
+                    results += [game.record()]
+                    if on_result is not None:
+                        on_result(results[-1])
+
+            # Waking up in time for the closest deadline
+            deadlines = [game.deadline for game in set(games.values()) if game.deadline is not None]
+            timeout = None
+            if deadlines:
+                timeout = max(0, int((min(deadlines) - monotonic()) * 1000) + 1)
+
+            t_poll = monotonic() if self.profile_phases else None
+            try:
+                events = poller.poll(timeout)
+            except select.error as e:
+                if e.args[0] != errno.EINTR:
+                    raise
+                events = [] # Interrupted by a signal, the deadlines are checked again
+            if t_poll is not None:
+                # The wait is shared by the games in progress
+                in_progress = set(games.values())
+                for game in in_progress:
+                    game.clock.add('wait', (monotonic() - t_poll) / len(in_progress))
+
+            for fd, event in events:
+                if fd in writing:
+                    writing[fd].on_writable(fd)
+                    continue
+                game = games.get(fd)
+                if game is None:
+                    continue
+
+                game.on_readable(fd)
+                if game.buffers[fd].eof:
+                    poller.unregister(fd)
+                    del games[fd]
+
+            now = monotonic()
+            for game in set(games.values()):
+                game.check_deadline(now)
+
+            # The inputs waiting for their pipe are written as soon as it can take them
+            for game in set(games.values()):
+                for fd, writer in game.writers.items():
+                    if writer.pending and fd not in writing:
+                        poller.register(fd, select.POLLOUT)
+                        writing[fd] = game
+                    elif not writer.pending and fd in writing:
+                        poller.unregister(fd)
+                        del writing[fd]
+
+            for game in set(games.values()):
+                if game.finished:
+                    for fd in list(game.buffers) + list(game.writers):
+                        if fd in games:
+                            poller.unregister(fd)
+                            del games[fd]
+                        if fd in writing:
+                            poller.unregister(fd)
+                            del writing[fd]
+                    results += [game.record()]
+                    if on_result is not None:
+                        on_result(results[-1])
+
+        return results
+
+    def make_pool(self, nthreads):
+        ''' Creates the Pool of processes playing the games, pinned to their cores with the CPU affinity '''
+        if self.affinity:
+            if nthreads > mp.cpu_count():
+                print('Warning : {} threads for {} cores, some processes share their cores'.format(nthreads, mp.cpu_count()))
+            return mp.Pool(nthreads, init_pool_worker, (nthreads,))
+        return mp.Pool(nthreads, init_pool_worker)
+
+    def process_name(self):
+        ''' Name of the current process in the reports of the session '''
+        return mp.current_process().name
+
+    @profiled
+    def run_games(self, runs):
+        ''' Plays a list of runs one after the other, see run_game '''
+        return [self.run_game(run_info) for run_info in runs]
+
+    def run_pool(self, runs, nthreads, per_thread):
+        ''' Plays the runs with a Pool of processes. The records of the games are streamed back as
+        they finish : the runs are handed out one by one (by batches of per_thread runs when they are
+        multiplexed), so the progress is reported game by game and the threads stay balanced. Ctrl-C
+        stops the processes and exits, the journal keeping the games already played.
+
+        Args:
+          runs       (list): The run_info tuples to play, see run_game
+          nthreads   (int):  Number of processes playing
+          per_thread (int):  Games multiplexed by every process
+
+        Returns:
+          The list of the records of the games played, see run_game
+        '''
+        # Every task multiplexes a batch of runs
+        chunk  = per_thread if per_thread > 1 else 1
+        chunks = [runs[i:i+chunk] for i in range(0, len(runs), chunk)]
+
+        pool = self.make_pool(nthreads)
+        results = []
+        try:
+            tasks = pool.imap_unordered(self.run_multiplexed if per_thread > 1 else self.run_games, chunks)
+            for i in range(len(chunks)):
+                # Waiting with a timeout, so that Ctrl-C is not ignored
+                for stats in tasks.next(1e9):
+                    self.collect(stats)
+                    results += [stats]
+        except KeyboardInterrupt:
+            pool.terminate()
+            pool.join()
+            if self.store is not None:
+                self.store.flush()
+            print('')
+            print('Interrupted after {} games{}'.format(len(results), ', play the missing runs with --resume'
+                                                                      if self.journal is not None else ''))
+            exit(1)
+        pool.close()
+        pool.join()
+        return results
+
+    def make_run(self, run, seed, seats):
+        ''' Returns the run_info tuple of a run (see run_game), after clearing its log folder '''
+        log_dir = ''
+        if (self.settings['Log stderr'] and self.log_archive is None) or self.record_replays:
+            # Clearing path if necessary, making sure everything is empty
+            log_dir = 'runs/' + self.game_name + '/run_{:03d}'.format(run+1) + '/'
+            if os.path.exists(log_dir):
+                shutil.rmtree(log_dir)
+            os.mkdir(log_dir)
+        return (run, log_dir, seed, seats)
 
     def run(self):
         ''' Runs the whole session of games and records the logs everything in subdirectories'''
 
-        # Creating the Pool of tasks
-        runs = []
+        # Rankings of the bots : games where the bot of the row finished at the rank of the column
         nbots = len(self.bots_list)
-        global rankings
-        rankings = mp.Array('f', [0]*(nbots*nbots))
+        self.rankings = np.zeros((nbots, nbots))
         
+        # Resuming a session : the finished runs are taken from the journal, and the others are
+        # played with the seeds of the interrupted session
+        # The runs of a seed follow each other, one for every seating
+        nseatings = len(self.seatings)
+        seeds = [run_seed(self.seed_base, group) for group in range(self.runs // nseatings)
+                                                 for seating in self.seatings]
+        done  = {}
+        if self.resume:
+            seeds, done = self.load_journal(seeds)
+            print(' - Resuming the session : {} runs already played'.format(len(done)))
+        else:
+            self.start_journal(seeds)
+        if self.profile_workers and os.path.exists('runs/' + self.game_name + '/profile'):
+            # Statistics of a previous session
+            shutil.rmtree('runs/' + self.game_name + '/profile')
+        archived = self.log_archive is not None and self.settings['Log stderr']
+        if archived and not self.resume and os.path.exists('runs/' + self.game_name + '/logs'):
+            # Logs of a previous session, whose runs have the same ids
+            shutil.rmtree('runs/' + self.game_name + '/logs')
+
+        if self.store is not None:
+            game_id, bot_ids = self.session_ids()
+            self.store.start(self.game_name, game_id, [bot['Name'] for bot in self.bots_list], bot_ids,
+                             self.runs, self.config)
+
+        reused = [] # Results of the runs not played in this session
+        def reuse(result, run, seats):
+            result['run']   = run
+            result['seats'] = list(seats)
+            result['seed']  = seeds[run]
+            self.record_ranking(result['ranking'], result['seats'])
+            if self.tournament is not None:
+                self.tournament.update(result['seats'], result['ranking'])
+            if self.store is not None:
+                self.store.add(result, reused=True)
+            reused.append(result)
+
+        def cached(run_info):
+            ''' Takes the result of a run from the cache, if it was already played with the same
+            binaries, seed and seats '''
+            if not self.cacheable(run_info[3]):
+                return False
+            result = self.cache.get(self.cache_key(run_info[2], run_info[3]))
+            if result is None or 'seat_timeouts' not in result:
+                return False # Not played, or stored with the timeouts by position in the Bots list
+            timeouts = [0] * len(self.bots_list)
+            for bot, count in zip(run_info[3], result['seat_timeouts']):
+                timeouts[bot] = count
+            reuse({'ranking': result['ranking'], 'timeouts': timeouts}, run_info[0], run_info[3])
+            return True
+
+        todo = []
         for run in range(self.runs):
-            log_dir = ''
-            if self.settings['Log stderr']:
-                # Clearing path if necessary, making sure everything is empty
-                log_dir = 'runs/' + self.game_name + '/run_{:03d}'.format(run+1) + '/'
-                if os.path.exists(log_dir):
-                    shutil.rmtree(log_dir)    
-                os.mkdir(log_dir)
-            runs += [(run, log_dir, seed_bank.pop())] 
-
-        # If mono-threaded then run everything in order
+            if run in done:
+                reuse(done[run], run, done[run].get('seats', self.seatings[run % nseatings]))
+            else:
+                todo += [run]
+        if self.tournament is not None:
+            self.tournament.started = len(done)
+
         nthreads = self.settings['Threads']
-        if nthreads == 1:
-            for run_info in runs:
-                self.run_game(run_info)
+        per_thread = self.settings.get('Games per thread', 1)
+        if per_thread > 1 and self.plugin is not None:
+            print('Warning : engine plugins play one game at a time, "Games per thread" is ignored')
+            per_thread = 1
+
+        if self.tournament is not None and self.tournament.schedule is None:
+            # Adaptive tournament : the bots of a game are picked when it starts, from the ratings at that time
+            def next_run():
+                while todo:
+                    run = todo.pop(0)
+                    run_info = self.make_run(run, seeds[run], self.tournament.next_seats())
+                    if not cached(run_info):
+                        self.tournament.start(run_info[3])
+                        return run_info
+                return None
+            self.progress = Progress(len(todo))
+            results = self.run_dynamic(next_run, self.tournament_result, nthreads, per_thread)
         else:
-            pool = mp.Pool(nthreads)
-            pool.map(self.run_game, runs)
+            # The runs already played with the same binaries, seeds and seats are taken from the cache
+            runs = []
+            for run in todo:
+                seats = self.tournament.schedule[run] if self.tournament is not None else self.seatings[run % nseatings]
+                run_info = self.make_run(run, seeds[run], list(seats))
+                if not cached(run_info):
+                    runs += [run_info]
+            if self.cache is not None:
+                print(' - {} runs found in the result cache, {} to play'.format(len(todo) - len(runs), len(runs)))
+
+            self.progress = Progress(len(runs))
+            if self.tournament is not None:
+                results = self.run_dynamic(lambda: runs.pop(0) if runs else None, self.tournament_result,
+                                           nthreads, per_thread)
+            elif self.sprt is not None:
+                # The seatings of a seed are all played, even once the test is decided
+                undecided = lambda: self.sprt_result()['decision'] is None or runs[0][0] % nseatings != 0
+                results = self.run_dynamic(lambda: runs.pop(0) if runs and undecided() else None, None,
+                                           nthreads, per_thread)
+                if runs:
+                    print(' - The SPRT is decided, {} runs are not played'.format(len(runs)))
+            elif self.distributed is not None:
+                results = self.run_dynamic(lambda: runs.pop(0) if runs else None, None, nthreads, per_thread)
+            elif nthreads == 1:
+                # If mono-threaded then run everything in order
+                if per_thread > 1:
+                    results = self.run_multiplexed(runs, self.collect)
+                else:
+                    results = []
+                    for run_info in runs:
+                        results += self.run_games([run_info])
+                        self.collect(results[-1])
+                release_warm_bots()
+            else:
+                results = self.run_pool(runs, nthreads, per_thread)
+
+        # The last progress is always printed, even when the session stops early
+        if self.progress.done != self.progress.total:
+            print(self.progress.summary(eta=False))
+
+        if self.cache is not None:
+            self.cache.evict()
+
+        # The SPRT may stop the session before all the runs are played
+        ngames = max(1, len(results) + len(reused))
+        if self.sprt is not None:
+            self.report_sprt()
+
+        # In a tournament, the bots do not play every game : the ladder replaces the statistics by rank
+        if self.tournament is not None:
+            if self.settings['Log scores']:
+                self.write_ladder()
+            self.report_tournament()
 
         # Writing the rankings to a file
-        if self.settings['Log scores']:
+        elif self.settings['Log scores']:
             score_log = open('runs/' + self.game_name + '/scores.log', 'w')
             for bot in range(nbots):
                 s = ''
                 for i in range(nbots):
-                    s += '{:.2f}'.format(rankings[bot * nbots + i] / self.settings['Runs']) + '\t'
+                    s += '{:.2f}'.format(self.rankings[bot, i] / ngames) + '\t'
                     
                 score_log.write(s + '\n')
                 score_log.flush()
@@ -319,35 +3300,337 @@ class Referee(object):
             score_log.close()
 
         # Printing the stats for every game :
-        print('Statistics (in percents) :')
-        s = '{:<15}'.format('Bot name')
-        for bot in range(nbots):
-            s += 'Rank {}\t'.format(bot + 1)
-        print(s)
+        if self.tournament is None:
+            print('Statistics (in percents) :')
+            s = '{:<15}'.format('Bot name')
+            for bot in range(nbots):
+                s += 'Rank {}\t'.format(bot + 1)
+            print(s)
+
+            for bot in range(nbots):
+                s = '{:<15}\t'.format(self.bots_list[bot]['Name'])
+                for i in range(nbots):
+                    s += '{:.2f}'.format(self.rankings[bot, i] * 100.0 / ngames) + '\t'
+                print(s)
 
+        timeouts = [sum(r['timeouts'][bot] for r in results + reused) for bot in range(nbots)]
+        if any(timeouts):
+            print('Timeouts :')
+            for bot in range(nbots):
+                print(' - {:<15}: {}'.format(self.bots_list[bot]['Name'], timeouts[bot]))
+
+        if self.progress.errors:
+            print('Failed games :')
+            for name, count in sorted(self.progress.errors.items()):
+                print(' - {:<15}: {}'.format(name, count))
+
+        if nseatings > 1:
+            self.report_seatings(results + reused, seeds)
+        self.report_latency(results)
+        if self.time_basis == 'cpu':
+            self.report_latency(results, 'cpu', 'CPU times')
+        self.report_startup(results)
+        if self.profile_phases:
+            self.report_phases(results)
+        if self.profile_workers:
+            self.report_profile()
+        if self.store is not None:
+            self.store.close()
+
+    def report_seatings(self, results, seeds):
+        ''' Prints the scores of the bots by seed, every seed being played with every seating. A bot
+        scores 1 for a win and 0 for a loss (0.5 for a tie), and the ranks in between score
+        evenly in between. The score of a seed is the mean over its seatings, which cancels the
+        advantage of a seat and of a map : its standard error is compared to the one by game.
+        If the scores are logged, the scores of every seed are written to seatings.csv.
+
+        Args:
+          results (list): The dictionaries returned by run_game, and the ones taken from the journal or the cache
+          seeds   (list): The seed of every run
+        '''
+        nbots     = len(self.bots_list)
+        nseatings = len(self.seatings)
+        by_seed   = {}
+        for r in results:
+            if r['ranking'] is None:
+                continue
+            scores = np.zeros(nbots)
+            if r['ranking'] == 'tied':
+                scores[:] = 0.5
+            else:
+                for rank, seat in enumerate(r['ranking']):
+                    scores[r['seats'][seat]] = 1.0 - float(rank) / max(nbots - 1, 1)
+            by_seed.setdefault(r['run'] // nseatings, []).append(scores)
+
+        # Only the seeds played with every seating count
+        groups = sorted(group for group, games in by_seed.items() if len(games) == nseatings)
+        if not groups:
+            print('Seat permutations : no seed was played with every seating')
+            return
+        games      = np.array([scores for group in groups for scores in by_seed[group]])
+        seed_means = np.array([np.mean(by_seed[group], axis=0) for group in groups])
+
+        print('Seat permutations ({} seeds played with {} seatings, {} incomplete) :'.format(
+            len(groups), nseatings, len(by_seed) - len(groups)))
+        print('{:<15}\t{:>9}\t{:>12}\t{:>12}'.format('Bot name', 'score (%)', '+- by game', '+- by seed'))
         for bot in range(nbots):
-            s = '{:<15}\t'.format(self.bots_list[bot]['Name'])
-            for i in range(nbots):
-                rankings[bot * nbots + i] *= 100.0 / self.settings['Runs']
-                s += '{:.2f}'.format(rankings[bot * nbots + i]) + '\t'
+            by_game = 100.0 * games[:, bot].std() / np.sqrt(len(games))
+            by_seed_err = 100.0 * seed_means[:, bot].std() / np.sqrt(len(groups))
+            print('{:<15}\t{:>9.2f}\t{:>12.2f}\t{:>12.2f}'.format(self.bots_list[bot]['Name'],
+                                                                  100.0 * games[:, bot].mean(), by_game, by_seed_err))
+
+        if nbots == 2:
+            # Points of the first bot over the games of a seed : 2 (or N!) for sweeping a seed
+            points = np.round(seed_means[:, 0] * nseatings * 2) / 2
+            counts = ', '.join('{:g} : {}'.format(p, int((points == p).sum())) for p in np.unique(points))
+            print(' - Points of {} by seed (out of {}) : {}'.format(self.bots_list[0]['Name'], nseatings, counts))
+
+        if self.settings['Log scores']:
+            with open('runs/' + self.game_name + '/seatings.csv', 'w') as f:
+                f.write('seed,' + ','.join(bot['Name'] for bot in self.bots_list) + '\n')
+                for group, means in zip(groups, seed_means):
+                    f.write('{},'.format(seeds[group * nseatings]) + ','.join('{:.4f}'.format(m) for m in means) + '\n')
+
+    def report_latency(self, results, key='latency', title='Response times'):
+        ''' Prints the distribution of the response times of every bot, aggregated over the session.
+        If the scores are logged, the percentiles and histograms are also written to <key>.json
+        and <key>.csv, next to scores.log.
+
+        Args:
+          results (list):   The dictionaries returned by run_game
+          key     (string): The samples reported, 'latency' or 'cpu' for the CPU times of the bots
+          title   (string): Title of the report
+        '''
+        report = {}
+        rows   = []
+        print('{} in ms (p50 / p90 / p99 / max) :'.format(title))
+        for bot, entry in enumerate(self.bots_list):
+            report[entry['Name']] = {}
+            s = '{:<15}'.format(entry['Name'])
+            for phase, phase_name in enumerate(('first turn', 'other turns')):
+                samples = np.array([t for r in results if key in r for t in r[key][bot][phase]])
+                if len(samples) == 0:
+                    s += '\t{:>11}: -'.format(phase_name)
+                    continue
+
+                p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+                histogram = np.histogram(samples, bins=[0.0] + latency_bins + [max(samples.max(), latency_bins[-1]) + 1.0])[0]
+                report[entry['Name']][phase_name] = {'count':     len(samples),
+                                                     'mean':      samples.mean(),
+                                                     'p50':       p50,
+                                                     'p90':       p90,
+                                                     'p99':       p99,
+                                                     'max':       samples.max(),
+                                                     'bins':      latency_bins,
+                                                     'histogram': histogram.tolist()}
+                rows += [[entry['Name'], phase_name, len(samples), samples.mean(), p50, p90, p99, samples.max()]]
+                s += '\t{:>11}: {:.1f} / {:.1f} / {:.1f} / {:.1f}'.format(phase_name, p50*1e3, p90*1e3, p99*1e3,
+                                                                          samples.max()*1e3)
             print(s)
 
+        if self.settings['Log scores']:
+            with open('runs/' + self.game_name + '/' + key + '.json', 'w') as f:
+                json.dump(report, f, indent=2)
+            with open('runs/' + self.game_name + '/' + key + '.csv', 'w') as f:
+                f.write('bot,phase,count,mean,p50,p90,p99,max\n')
+                for row in rows:
+                    f.write('{},{},{},{:.6f},{:.6f},{:.6f},{:.6f},{:.6f}\n'.format(*row))
+
+    def report_phases(self, results):
+        ''' Prints the time spent by the games in every phase (see "Profile phases"), over the session
+        and by process. If the scores are logged, the totals are also written to phases.json.
+
+        Args:
+          results (list): The dictionaries returned by run_game
+        '''
+        timed = [r for r in results if r.get('phases')]
+        if not timed:
+            return
+        total      = collections.Counter()
+        processes  = collections.defaultdict(collections.Counter)
+        games      = collections.Counter()
+        for r in timed:
+            total.update(r['phases'])
+            processes[r['process']].update(r['phases'])
+            games[r['process']] += 1
+        phases  = [phase for phase in profile_phases if phase in total]
+        overall = sum(total.values())
+
+        print('Time by phase (total / per game / share) :')
+        for phase in phases:
+            print(' - {:<18}: {:9.2f} s {:9.1f} ms {:6.1f} %'.format(phase, total[phase], total[phase] * 1e3 / len(timed),
+                                                                  total[phase] * 100.0 / overall))
+        print('Time by process in s :')
+        print('{:<24}{:>6}'.format('process', 'games') + ''.join('{:>19}'.format(phase) for phase in phases))
+        for name in sorted(processes):
+            print('{:<24}{:>6}'.format(name, games[name]) + ''.join('{:>19.2f}'.format(processes[name][phase])
+                                                                    for phase in phases))
+
+        if self.settings['Log scores']:
+            report = {'games':     len(timed),
+                      'total':     dict(total),
+                      'per game':  dict((phase, total[phase] / len(timed)) for phase in phases),
+                      'processes': dict((name, dict(processes[name], games=games[name])) for name in processes)}
+            with open('runs/' + self.game_name + '/phases.json', 'w') as f:
+                json.dump(report, f, indent=2)
+
+    def report_profile(self):
+        ''' Merges the cProfile statistics of the processes of the session (see "Profile workers") into
+        runs/<Game>/profile.txt, the functions being sorted by cumulative time. The statistics of the
+        workers of a distributed session stay on their machines. '''
+        directory = 'runs/' + self.game_name + '/profile/'
+        if not os.path.exists(directory):
+            return
+        files = sorted(directory + name for name in os.listdir(directory) if name.endswith('.prof'))
+        if not files:
+            return
+        with open('runs/' + self.game_name + '/profile.txt', 'w') as f:
+            stats = pstats.Stats(*files, stream=f)
+            stats.sort_stats('cumulative').print_stats(60)
+        print('Profile of {} processes written to runs/{}/profile.txt'.format(len(files), self.game_name))
+
+    def report_startup(self, results):
+        ''' Prints the startup time saved by the persistent bots over the session.
+        The saving is estimated from the CPU time a bot spends until its first answer : the mean
+        over the fresh processes minus the mean over the reused ones, for every reused process.
+
+        Args:
+          results (list): The dictionaries returned by run_game
+        '''
+        persistent = [i for i, bot in enumerate(self.bots_list) if bot.get('Persistent', False)]
+        if not persistent:
+            return
+
+        print('Persistent bots :')
+        total_saved = 0.0
+        for i in persistent:
+            played   = [r for r in results if r['warm'][i] is not None]
+            n_cold   = sum(1 for r in played if not r['warm'][i])
+            n_warm   = sum(1 for r in played if r['warm'][i])
+            restarts = sum(1 for r in results if r['restarted'][i])
+            cold = [r['startup_cpu'][i] for r in results if r['startup_cpu'][i] is not None and not r['warm'][i]]
+            warm = [r['startup_cpu'][i] for r in results if r['startup_cpu'][i] is not None and r['warm'][i]]
+
+            saved = 0.0
+            if cold and warm:
+                saved = max(0.0, np.mean(cold) - np.mean(warm)) * n_warm
+            total_saved += saved
+
+            print(' - {:<15}: {} fresh starts ({} after a crash), {} warm starts, ~{:.2f}s of startup saved'.format(
+                self.bots_list[i]['Name'], n_cold, restarts, n_warm, saved))
+        print(' Total startup time saved : ~{:.2f}s'.format(total_saved))
+
             
             
         
 
 
+class WorkerReferee(Referee):
+    def __init__(self, config):
+        ''' The referee of a worker : it only plays the games handed out by the coordinator, which
+        keeps the rankings, the journal and the cache of the session '''
+        self.load_config(config)
+        self.journal = None
+
+    def play(self, method, args):
+        ''' Plays a task of the coordinator, see Coordinator.serve '''
+        for run_info in args[0]:
+            log_dir = run_info[1]
+            if log_dir and not os.path.exists(log_dir):
+                os.makedirs(log_dir)
+        return getattr(self, method)(*args)
+
+    def process_name(self):
+        return '{}:{}'.format(socket.gethostname(), os.getpid())
+
+
+def serve_worker(address, authkey, slots):
+    ''' Plays the games of the sessions of a coordinator (see Coordinator), with up to slots games at
+    the same time. Once a session is over, or the coordinator is lost, the worker connects again and
+    waits for the next session. The parameter file is sent by the coordinator, but the binaries and
+    scripts it names must be found from the folder of the worker.
+
+    Args:
+      address (string): The address of the coordinator, host:port
+      authkey (string): The "Authkey" of its settings
+      slots   (int):    Number of games played at the same time
+    '''
+    name = '{}:{}'.format(socket.gethostname(), os.getpid())
+    while True:
+        try:
+            conn = Client(parse_address(address), authkey=authkey)
+        except mp.AuthenticationError:
+            print('Error : the coordinator at {} has another authentication key'.format(address))
+            return
+        except (EOFError, IOError, socket.error):
+            # No session yet, or the previous one is closing
+            time.sleep(2.0)
+            continue
+
+        pool = None
+        pending = {}
+        try:
+            conn.send({'name': name, 'slots': slots})
+            session = conn.recv()
+            referee = WorkerReferee(session['config'])
+            pool = referee.make_pool(slots)
+            print(' - Worker {} playing for {}'.format(name, address))
+
+            last = monotonic()
+            while True:
+                if conn.poll(0.01):
+                    task = conn.recv()
+                    if task is None:
+                        # End of the session, leaving the coordinator time to close it
+                        time.sleep(2.0)
+                        break
+                    tid, method, args = task
+                    pending[tid] = pool.apply_async(referee.play, (method, args))
+
+                for tid in [tid for tid in pending if pending[tid].ready()]:
+                    conn.send(('result', tid, pending.pop(tid).get()))
+                    last = monotonic()
+
+                if monotonic() - last > session['heartbeat']:
+                    conn.send(('alive',))
+                    last = monotonic()
+        except (EOFError, IOError, socket.error) as e:
+            print('Warning : coordinator lost ({})'.format(str(e) or type(e).__name__))
+        finally:
+            conn.close()
+            if pool is not None:
+                # The games still running were also played by another worker, or will be again
+                if pending:
+                    pool.terminate()
+                else:
+                    pool.close()
+                pool.join()
+
+
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print('USAGE : {} [FILE]'.format(sys.argv[0]))
-        print('  Generic referee for CG Bots.')
-        print('  You must provide a json file as configuration input for the program')
+    parser = argparse.ArgumentParser(description='Generic referee for CG Bots')
+    parser.add_argument('file', nargs='?', help='The json configuration file of the session')
+    parser.add_argument('--resume', action='store_true',
+                        help='Plays only the runs missing from the journal of the interrupted session')
+    parser.add_argument('--worker', metavar='HOST:PORT',
+                        help='Plays the games of the coordinator at this address instead of a session')
+    parser.add_argument('--slots', type=int, default=mp.cpu_count(),
+                        help='Number of games a worker plays at the same time (number of cores by default)')
+    parser.add_argument('--authkey', help='The "Authkey" of the coordinator, needed by a worker')
+    args = parser.parse_args()
+    if args.file is None and args.worker is None:
+        parser.print_help()
         exit(0)
+    if args.worker is not None and not args.authkey:
+        parser.error('a worker needs the --authkey of its coordinator')
         
     print('==============================================')
     print('================= CG Referee =================')
     print('')
     print('')
-    print('Running the game :')
-    r = Referee(sys.argv[1])
-    
+    if args.worker is not None:
+        print('Running as a worker :')
+        serve_worker(args.worker, args.authkey, args.slots)
+    else:
+        print('Running the game :')
+        r = Referee(args.file, args.resume)
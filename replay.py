@@ -0,0 +1,115 @@
+#!/usr/bin/python
+
+# Reads the replays recorded by the referee ("Record replays") and plays them again
+import sys
+import subprocess
+import argparse
+
+from referee import ReplayReader, EngineProcess, EnginePlugin, load_plugin
+
+def seat_name(meta, seat):
+    ''' Name of the bot playing at a seat : the turns and the ranking count the bots by seat '''
+    return meta['bots'][seat]
+
+def ranking_names(meta, ranking):
+    ''' The ranking of a replay with the names of the bots, as "name (seat)" '''
+    if ranking is None or ranking == 'tied':
+        return ranking
+    return ', '.join('{} ({})'.format(seat_name(meta, int(seat)), seat) for seat in ranking.split())
+
+def show_turn(reader, n):
+    ''' Prints one turn of a replay '''
+    bot, code, inputs, answer, elapsed = reader.turn(n)
+    name = seat_name(reader.meta, bot)
+    if code == 0:
+        print('---- Turn {} : {} is dead'.format(n, name))
+        return
+
+    timing = 'no answer' if elapsed is None else '{:.1f} ms'.format(elapsed * 1e3)
+    print('---- Turn {} : {} ({})'.format(n, name, timing))
+    sys.stdout.write(inputs)
+    print('> {}'.format(answer))
+
+def start_engine(meta):
+    ''' Starts the engine of the replay, as the referee did for the game '''
+    engine = meta['engine']
+    if 'plugin' in engine:
+        return EnginePlugin(load_plugin(engine['plugin']), meta['seed'], None, engine['options'])
+
+    return EngineProcess(subprocess.Popen(engine['command'], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                          stderr=open('/dev/null', 'w')))
+
+def replay(reader, verbose=False):
+    ''' Plays the game again, the recorded answers of the bots being given to the engine.
+    Every request of the engine is checked against the recording.
+
+    Args:
+      reader  (ReplayReader): The replay
+      verbose (bool):         Prints the turns as they are played
+
+    Returns:
+      True if the engine behaved exactly as during the game
+    '''
+    engine = start_engine(reader.meta)
+    try:
+        for n in range(len(reader)):
+            bot, code, inputs, answer, elapsed = reader.turn(n)
+            exec_code, data = engine.next_request()
+            if exec_code != code or (code > 0 and data != inputs):
+                print('Turn {} : the engine diverges from the recording'.format(n))
+                return False
+
+            if verbose:
+                show_turn(reader, n)
+            if answer is None:
+                # The game was interrupted here
+                if code > 0:
+                    print('Turn {} : the recording stops before the answer of the bot'.format(n))
+                    return True
+                continue
+            engine.apply(answer)
+
+        ranking = reader.ranking()
+        if ranking is None:
+            print('The recording stops before the end of the game')
+            return True
+
+        exec_code, data = engine.next_request()
+        if exec_code >= 0 or data.strip() != ranking:
+            print('The engine ends the game differently : {} instead of {}'.format(data, ranking))
+            return False
+        print('Ranking : {}'.format(ranking))
+        return True
+    finally:
+        engine.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Reads or plays again a replay recorded by the referee')
+    parser.add_argument('file', help='The replay, runs/<Game>/run_<i>/replay.cgr')
+    parser.add_argument('--turn', type=int, action='append',
+                        help='Prints this turn (counting every bot, from 0), can be repeated')
+    parser.add_argument('--play', action='store_true',
+                        help='Feeds the recorded answers to the engine and checks it plays the same game. '
+                             'Must be run from the folder the referee was started from.')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Prints every turn played')
+    args = parser.parse_args()
+
+    reader = ReplayReader(args.file)
+    meta   = reader.meta
+    print('{} : seed {}, {} turns, bots by seat {}'.format(meta['game'], meta['seed'], len(reader), ', '.join(meta['bots'])))
+
+    for n in args.turn or []:
+        if not 0 <= n < len(reader):
+            print('No turn {} in the replay'.format(n))
+            continue
+        show_turn(reader, n)
+
+    ok = True
+    if args.play:
+        ok = replay(reader, args.verbose)
+    elif not args.turn:
+        print('Ranking : {}'.format(ranking_names(meta, reader.ranking())))
+
+    reader.close()
+    exit(0 if ok else 1)
@@ -0,0 +1,85 @@
+#!/usr/bin/python
+
+# Reads the "Results database" of the referee (see ResultStore in referee.py) :
+#
+#   python results.py runs/results.db                  lists the sessions
+#   python results.py runs/results.db --compare 3 5    compares the bots of two sessions
+#
+# Bots are matched by name between the sessions. On the seeds played in both sessions, the ranks of a bot
+# are compared game by game, as its other results are often decided by the map.
+import sys
+import sqlite3
+import argparse
+
+def sessions(db):
+    ''' Prints the sessions of the database '''
+    rows = db.execute('SELECT s.id, s.started, s.finished, s.game, s.runs, COUNT(g.run), SUM(g.error IS NOT NULL) '
+                      'FROM sessions s LEFT JOIN games g ON g.session = s.id GROUP BY s.id ORDER BY s.id').fetchall()
+    print('{:>5}  {:<20}{:<12}{:>8}{:>8}{:>8}  {}'.format('id', 'started', 'game', 'runs', 'games', 'failed', 'bots'))
+    for sid, started, finished, game, runs, games, failed in rows:
+        bots = [name for name, in db.execute('SELECT name FROM bots WHERE session = ? ORDER BY bot', (sid,))]
+        print('{:>5}  {:<20}{:<12}{:>8}{:>8}{:>8}  {}{}'.format(sid, started[:19].replace('T', ' '), game, runs, games,
+                                                                failed or 0, ', '.join(bots),
+                                                                '' if finished else ' (interrupted)'))
+
+def bot_stats(db, session):
+    ''' Results of the bots of a session, by name '''
+    stats = {}
+    for bot, name, version in db.execute('SELECT bot, name, version FROM bots WHERE session = ?', (session,)):
+        games, ranked, rank, wins, timeouts = db.execute(
+            'SELECT COUNT(*), COUNT(rank), AVG(rank), SUM(rank = 0), SUM(timeouts) FROM results '
+            'WHERE session = ? AND bot = ?', (session, bot)).fetchone()
+        latency, turns = db.execute('SELECT AVG(latency), COUNT(*) FROM turns WHERE session = ? AND bot = ?',
+                                    (session, bot)).fetchone()
+        stats[name] = {'bot': bot, 'version': version, 'games': games, 'ranked': ranked, 'rank': rank,
+                       'wins': float(wins or 0) / ranked if ranked else None,
+                       'timeouts': float(timeouts or 0) / games if games else None,
+                       'latency': latency * 1000 if turns else None}
+    return stats
+
+def common_ranks(db, first, second, bot1, bot2):
+    ''' Mean ranks of a bot on the seeds and seats played in both sessions, where it finished both games '''
+    return db.execute('SELECT COUNT(*), AVG(a.rank), AVG(b.rank) FROM results a '
+                      'JOIN games ga ON ga.session = a.session AND ga.run = a.run '
+                      'JOIN games gb ON gb.session = ? AND gb.seed = ga.seed '
+                      'JOIN results b ON b.session = gb.session AND b.run = gb.run AND b.bot = ? AND b.seat = a.seat '
+                      'WHERE a.session = ? AND a.bot = ? AND a.rank IS NOT NULL AND b.rank IS NOT NULL',
+                      (second, bot2, first, bot1)).fetchone()
+
+def compare(db, first, second):
+    ''' Prints the results of the bots of two sessions side by side '''
+    a, b = bot_stats(db, first), bot_stats(db, second)
+    if not a or not b:
+        sys.stderr.write('Error : unknown session {}\n'.format(first if not a else second))
+        sys.exit(1)
+    fmt  = lambda value, spec: format(value, spec) if value is not None else '-'
+    print('Session {} -> session {}'.format(first, second))
+    print('{:<15}{:>14}{:>18}{:>18}{:>18}{:>20}{:>22}'.format('Bot name', 'games', 'win rate (%)', 'mean rank',
+                                                            'timeouts/game', 'response (ms)', 'rank on same seeds'))
+    for name in sorted(set(a) | set(b)):
+        x, y = a.get(name), b.get(name)
+        if x is None or y is None:
+            print('{:<15} only in session {}'.format(name, first if y is None else second))
+            continue
+        pair = lambda key, spec, scale=1: '{} -> {}'.format(fmt(x[key] * scale if x[key] is not None else None, spec),
+                                                           fmt(y[key] * scale if y[key] is not None else None, spec))
+        n, rank_a, rank_b = common_ranks(db, first, second, x['bot'], y['bot'])
+        same = '{} -> {} ({})'.format(fmt(rank_a, '.2f'), fmt(rank_b, '.2f'), n) if n else '-'
+        print('{:<15}{:>14}{:>18}{:>18}{:>18}{:>20}{:>22}{}'.format(name, pair('games', 'd'), pair('wins', '.1f', 100),
+                                                                   pair('rank', '.2f'), pair('timeouts', '.3f'),
+                                                                   pair('latency', '.2f'), same,
+                                                                   '' if x['version'] == y['version'] else '  (changed)'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Reads the results database of cg_referee')
+    parser.add_argument('database', help='The "Results database" of the sessions')
+    parser.add_argument('--compare', nargs=2, type=int, metavar=('FIRST', 'SECOND'),
+                        help='Compares the bots of two sessions')
+    args = parser.parse_args()
+
+    db = sqlite3.connect(args.database)
+    if args.compare:
+        compare(db, *args.compare)
+    else:
+        sessions(db)
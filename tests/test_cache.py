@@ -0,0 +1,87 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import referee
+
+class TestCacheKey(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        referee.file_digests.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+        referee.file_digests.clear()
+
+    def script(self, name, content):
+        path = os.path.join(self.folder, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_command_id(self):
+        first  = self.script('first.py', 'print(1)')
+        second = self.script('second.py', 'print(2)')
+        same   = self.script('same.py', 'print(1)')
+        ids = referee.command_id(['python', first, '--depth', '3'])
+        self.assertEqual(ids[0], 'python')
+        self.assertEqual(ids[2:], ['--depth', '3'])
+        self.assertEqual(len(ids[1]), 40)
+        self.assertEqual(referee.command_id([same]), [ids[1]])
+        self.assertNotEqual(referee.command_id([second]), [ids[1]])
+
+    def test_cache_key(self):
+        r = referee.Referee.__new__(referee.Referee)
+        r.game_id = 'game'
+        r.bot_ids = ['bot a', 'bot b', 'bot c']
+        key = r.cache_key(42, [0, 1])
+        self.assertEqual(key, r.cache_key(42, [0, 1]))
+        self.assertNotEqual(key, r.cache_key(42, [1, 0]))
+        self.assertNotEqual(key, r.cache_key(43, [0, 1]))
+        self.assertNotEqual(key, r.cache_key(42, [0, 2]))
+        # The key names the bots, not their position in the Bots list
+        r.bot_ids = ['bot b', 'bot a', 'bot c']
+        self.assertEqual(key, r.cache_key(42, [1, 0]))
+
+    def test_cacheable(self):
+        r = referee.Referee.__new__(referee.Referee)
+        r.cache     = object()
+        r.bots_list = [{'Name': 'a'}, {'Name': 'b', 'Deterministic': False}, {'Name': 'c', 'Deterministic': True}]
+        self.assertTrue(r.cacheable([0, 2]))
+        self.assertTrue(r.cacheable([2, 0]))
+        self.assertFalse(r.cacheable([0, 1]))
+        self.assertFalse(r.cacheable([1, 2]))
+        r.cache = None
+        self.assertFalse(r.cacheable([0, 2]))
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_put_get(self):
+        cache = referee.ResultCache(os.path.join(self.folder, 'cache'), 1 << 20)
+        self.assertIsNone(cache.get('key'))
+        cache.put('key', {'ranking': [1, 0], 'seat_timeouts': [0, 2]})
+        self.assertEqual(cache.get('key'), {'ranking': [1, 0], 'seat_timeouts': [0, 2]})
+
+    def test_evict(self):
+        cache = referee.ResultCache(os.path.join(self.folder, 'cache'), 100)
+        for i in range(10):
+            cache.put('key{}'.format(i), {'ranking': [0, 1], 'seat_timeouts': [0, 0]})
+            os.utime(os.path.join(cache.path, 'key{}'.format(i)), (i, i))
+        cache.evict()
+        kept = sorted(os.listdir(cache.path))
+        self.assertLessEqual(sum(os.path.getsize(os.path.join(cache.path, name)) for name in kept), 100)
+        # The least recently used results go first
+        self.assertIn('key9', kept)
+        self.assertNotIn('key0', kept)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'engines'))
+import gitc_sim
+from gitc_sim import GitcState
+
+def factories(state, player=0):
+    ''' The factories seen by a player, as lists of integers '''
+    count, block = state.turn_payload(player)
+    lines = block.split('\n')[:-1]
+    return [[int(x) for x in line.replace('FACTORY ', '').split()] for line in lines if ' FACTORY ' in line]
+
+def attack(state):
+    ''' An order of the first player sending half of the cyborgs of its factory to the closest other one '''
+    mine = [f for f in factories(state) if f[1] == 1][0]
+    target = min((d, j) for j, d in enumerate(state.dist_table[mine[0]].tolist()) if j != mine[0])[1]
+    return 'MOVE {} {} {}'.format(mine[0], target, mine[2] // 2)
+
+class TestGitcState(unittest.TestCase):
+    def test_same_seed_same_map(self):
+        self.assertEqual(GitcState('42').turn_payload(0), GitcState('42').turn_payload(0))
+        self.assertNotEqual(GitcState('42').turn_payload(0), GitcState('43').turn_payload(0))
+
+    def test_first_turn(self):
+        state = GitcState('42')
+        count, block = state.turn_payload(0)
+        lines = block.split('\n')[:-1]
+        self.assertEqual(len(lines), count)
+        nfactories, nlinks = int(lines[0]), int(lines[1])
+        self.assertEqual(nlinks, nfactories * (nfactories - 1) // 2)
+        self.assertEqual(int(lines[2 + nlinks]), nfactories)
+        self.assertEqual(state.turn_info(0), lines)
+
+    def test_sides_swapped(self):
+        state = GitcState('42')
+        for mine, theirs in zip(factories(state, 0), factories(state, 1)):
+            self.assertEqual(mine[1], -theirs[1])
+            self.assertEqual(mine[2:], theirs[2:])
+
+    def test_step(self):
+        state = GitcState('42')
+        orders = attack(state)
+        self.assertFalse(state.step(orders, 'WAIT'))
+        self.assertEqual(state.turn, 1)
+        count, block = state.turn_payload(0)
+        troops = [line for line in block.split('\n') if ' TROOP ' in line]
+        self.assertEqual(len(troops), 1)
+        self.assertEqual(troops[0].split()[2], '1')
+        self.assertEqual(state.turn_payload(1)[1].count(' TROOP -1 '), 1)
+
+    def test_clone_is_independent(self):
+        state = GitcState('42')
+        state.step('WAIT', 'WAIT')
+        before = state.turn_payload(0)
+        child = state.clone()
+        child.step(attack(child), 'WAIT')
+        self.assertEqual(state.turn, 1)
+        self.assertEqual(state.turn_payload(0), before)
+        self.assertNotEqual(child.turn_payload(0), before)
+
+    def test_clone_plays_the_same_game(self):
+        state = GitcState('7')
+        child = state.clone()
+        for turn in range(20):
+            orders = attack(state) if turn % 3 == 0 else 'WAIT'
+            state.step(orders, 'WAIT')
+            child.step(orders, 'WAIT')
+            self.assertEqual(child.turn_payload(0), state.turn_payload(0))
+            self.assertEqual(child.turn_payload(1), state.turn_payload(1))
+
+    def test_game_ends(self):
+        state = GitcState('42')
+        while not state.step('WAIT', 'WAIT'):
+            pass
+        self.assertTrue(state.is_terminal())
+        self.assertIn(state.result, ('1 0', '0 1', 'tied'))
+        self.assertEqual(state.turn, gitc_sim.max_turns + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import referee
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.r = referee.Referee.__new__(referee.Referee)
+        self.r.journal   = os.path.join(self.folder, 'journal.jsonl')
+        self.r.bots_list = [{'Name': 'a'}, {'Name': 'b'}]
+        self.r.runs      = 4
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def game(self, run, ranking, timeouts):
+        return {'run': run, 'seats': [0, 1], 'ranking': ranking, 'timeouts': timeouts}
+
+    def test_resume(self):
+        self.r.start_journal([5, 5, 8, 8])
+        self.r.journal_result(self.game(2, [1, 0], [0, 1]), 8)
+        self.r.journal_result(self.game(0, 'tied', [0, 0]), 5)
+        seeds, done = self.r.load_journal([1, 2, 3, 4])
+        self.assertEqual(seeds, [5, 5, 8, 8])
+        self.assertEqual(sorted(done), [0, 2])
+        self.assertEqual(done[2]['ranking'], [1, 0])
+        self.assertEqual(done[2]['timeouts'], [0, 1])
+        self.assertEqual(done[0]['ranking'], 'tied')
+
+    def test_cut_line(self):
+        # The session was killed while a line was written
+        self.r.start_journal([5, 5, 8, 8])
+        self.r.journal_result(self.game(1, [0, 1], [0, 0]), 5)
+        with open(self.r.journal, 'a') as f:
+            f.write('{"run": 3, "seed": 8, "se')
+        seeds, done = self.r.load_journal([1, 2, 3, 4])
+        self.assertEqual(sorted(done), [1])
+
+    def test_no_journal(self):
+        seeds, done = self.r.load_journal([1, 2, 3, 4])
+        self.assertEqual((seeds, done), ([1, 2, 3, 4], {}))
+        self.assertTrue(os.path.exists(self.r.journal))
+
+    def test_other_bots(self):
+        self.r.start_journal([5, 5, 8, 8])
+        self.r.bots_list = [{'Name': 'a'}, {'Name': 'c'}]
+        self.assertRaises(SystemExit, self.r.load_journal, [1, 2, 3, 4])
+
+class TestRunSeed(unittest.TestCase):
+    def test_independent_of_runs(self):
+        # A longer session starts with the games of a shorter one
+        short = [referee.run_seed(42, group) for group in range(10)]
+        long  = [referee.run_seed(42, group) for group in range(100)]
+        self.assertEqual(long[:10], short)
+        self.assertTrue(all(0 <= seed <= 100000 for seed in long))
+        self.assertGreater(len(set(long)), 90)
+        self.assertNotEqual([referee.run_seed(43, group) for group in range(10)], short)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import os
+import sys
+import time
+import signal
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import referee
+
+# Engine of the tests : every turn, each player gets one line "<turn> <seed>" and must answer it back.
+# The line is sent in two pieces, and the first line of the second player is padded beyond the size
+# of a pipe. The player who answered right the most wins.
+engine_script = r'''
+import sys, time
+seed  = sys.argv[1]
+score = [0, 0]
+for turn in range(5):
+    for player in range(2):
+        padding = ' ' + 'x' * 300000 if turn == 0 and player == 1 else ''
+        sys.stdout.write('1\n{} '.format(turn))
+        sys.stdout.flush()
+        time.sleep(0.02)
+        sys.stdout.write('{}{}\n'.format(seed, padding))
+        sys.stdout.flush()
+        if sys.stdin.readline().strip() == '{} {}'.format(turn, seed):
+            score[player] += 1
+sys.stdout.write('-1\n')
+sys.stdout.write('tied\n' if score[0] == score[1] else '0 1\n' if score[0] > score[1] else '1 0\n')
+sys.stdout.flush()
+'''
+
+# Bots : "echo" answers right away, "slow" takes too long on its third turn, "deaf" never reads its inputs
+bot_script = r'''
+import sys, time
+turn = 0
+while True:
+    if sys.argv[1] == 'deaf':
+        time.sleep(60)
+    line = sys.stdin.readline()
+    if not line:
+        break
+    if sys.argv[1] == 'slow' and turn == 2:
+        time.sleep(2)
+    sys.stdout.write(' '.join(line.split()[:2]) + '\n')
+    sys.stdout.flush()
+    turn += 1
+'''
+
+def alarm(signum, frame):
+    raise AssertionError('the games are stalled')
+
+class TestLineBuffer(unittest.TestCase):
+    def setUp(self):
+        r, w = os.pipe()
+        self.r = os.fdopen(r, 'rb', 0)
+        self.w = os.fdopen(w, 'wb', 0)
+        self.buf = referee.LineBuffer(self.r, 'Test')
+
+    def tearDown(self):
+        for f in (self.r, self.w):
+            if not f.closed:
+                f.close()
+
+    def test_partial_lines(self):
+        self.w.write('first li')
+        self.assertTrue(self.buf.wait(1.0))
+        self.assertIsNone(self.buf.readline())
+        self.w.write('ne \r\nsecond\nthi')
+        self.buf.wait(1.0)
+        self.assertEqual(self.buf.readline(), 'first line')
+        self.assertEqual(self.buf.readline(), 'second')
+        self.assertIsNone(self.buf.readline())
+        self.assertEqual(self.buf.data, 'thi')
+
+    def test_read_line_timeout(self):
+        self.assertIsNone(self.buf.read_line(0.05))
+        self.w.write('late\n')
+        self.assertEqual(self.buf.read_line(1.0), 'late')
+
+    def test_read_bytes(self):
+        self.w.write('abc\ndefgh')
+        self.assertEqual(self.buf.read_bytes(6), 'abc\nde')
+        self.assertEqual(self.buf.take(10), 'fgh')
+        self.assertEqual(self.buf.take(10), '')
+
+    def test_end_of_stream(self):
+        self.w.write('last')
+        self.w.close()
+        self.buf.wait()
+        self.buf.wait()
+        self.assertTrue(self.buf.eof)
+        self.assertRaises(IOError, self.buf.read_line)
+
+class TestPipeWriter(unittest.TestCase):
+    def test_full_pipe(self):
+        r, w = os.pipe()
+        reader, pipe = os.fdopen(r, 'rb', 0), os.fdopen(w, 'wb', 0)
+        writer = referee.PipeWriter(pipe)
+        writer.write('x' * 1000000)
+        self.assertTrue(writer.pending)
+        received = ''
+        while not writer.flush():
+            received += os.read(r, 1 << 16)
+        received += os.read(r, 1 << 20)
+        self.assertEqual(received, 'x' * 1000000)
+        writer.close()
+        reader.close()
+        pipe.close()
+
+class TestMultiplexedGames(unittest.TestCase):
+    def setUp(self):
+        self.cwd    = os.getcwd()
+        self.folder = tempfile.mkdtemp()
+        os.chdir(self.folder)
+        for name, script in (('engine.py', engine_script), ('bot.py', bot_script)):
+            with open(name, 'w') as f:
+                f.write(script)
+        bot = lambda name, kind: {'Name': name, 'Bin': sys.executable, 'Arguments': ['bot.py', kind]}
+        self.config = {'Game':     {'Name': 'Test', 'Game bin': sys.executable, 'Arguments': ['engine.py', '$seed']},
+                       'Bots':     [bot('a', 'echo'), bot('b', 'echo'), bot('slow', 'slow'), bot('deaf', 'deaf')],
+                       'Settings': {'Log stderr': False, 'Log scores': False, 'Runs': 1, 'Threads': 1,
+                                    'Games per thread': 4, 'Hard time limits': True,
+                                    'Time limit': 0.3, 'Time limit first turn': 1.0}}
+        signal.signal(signal.SIGALRM, alarm)
+        signal.alarm(60)
+
+    def tearDown(self):
+        signal.alarm(0)
+        os.chdir(self.cwd)
+        shutil.rmtree(self.folder)
+
+    def test_interleaved_games(self):
+        r = referee.WorkerReferee(self.config)
+        runs = [(0, '', 11, [0, 1]), (1, '', 12, [0, 2]), (2, '', 13, [1, 0]), (3, '', 14, [0, 3])]
+        t_start = time.time()
+        records = dict((stats['run'], stats) for stats in r.run_multiplexed(runs))
+        elapsed = time.time() - t_start
+
+        self.assertEqual(sorted(records), [0, 1, 2, 3])
+        for stats in records.values():
+            self.assertIsNone(stats.get('error'))
+        # Both echo bots answer everything
+        self.assertEqual(records[0]['ranking'], 'tied')
+        self.assertEqual(records[2]['ranking'], 'tied')
+        self.assertEqual(sum(records[0]['timeouts']) + sum(records[2]['timeouts']), 0)
+        # The slow bot forfeits on its third turn, the deaf one on its first : the games go on without them
+        self.assertEqual(records[1]['ranking'], [0, 1])
+        self.assertEqual(records[1]['timeouts'][2], 1)
+        self.assertEqual(records[3]['ranking'], [0, 1])
+        self.assertEqual(records[3]['timeouts'][3], 1)
+        # The games were played at the same time, each one taking at least 10 x 20 ms
+        self.assertLess(elapsed, 0.8 * sum(stats['duration'] for stats in records.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import referee
+
+# A persistent bot writing one line too many after each answer, right away or a bit later
+bot_script = r'''
+import sys, time
+game = 1
+while True:
+    line = sys.stdin.readline()
+    if not line:
+        break
+    if line.strip() == '###NEWGAME###':
+        game += 1
+        continue
+    sys.stdout.write('ANSWER {}\n'.format(game))
+    sys.stdout.flush()
+    if len(sys.argv) > 1:
+        time.sleep(float(sys.argv[1]))
+    sys.stdout.write('LATE {}\n'.format(game))
+    sys.stdout.flush()
+'''
+
+class TestPersistentBot(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.script = os.path.join(self.folder, 'bot.py')
+        with open(self.script, 'w') as f:
+            f.write(bot_script)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def play(self, bot):
+        bot.start(self.folder + '/')
+        bot.stdin.write('turn\n')
+        bot.stdin.flush()
+        return bot.read_line(5.0)
+
+    def check_games(self, arguments, pause):
+        bot = referee.Bot('bot', sys.executable, [self.script] + arguments, 'Test', persistent=True)
+        try:
+            self.assertEqual(self.play(bot), 'ANSWER 1')
+            time.sleep(pause)
+            bot.stop()
+            bot.drain() # As parked by the referee
+            time.sleep(pause)
+            # The line left from the first game is not taken for the answer of the second one
+            self.assertEqual(self.play(bot), 'ANSWER 2')
+            self.assertTrue(bot.warm)
+        finally:
+            bot.stop(force=True)
+
+    def test_line_left_in_buffer(self):
+        self.check_games([], 0.1)
+
+    def test_line_written_while_parked(self):
+        self.check_games(['0.2'], 0.15)
+
+
+if __name__ == '__main__':
+    unittest.main()
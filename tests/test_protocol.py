@@ -0,0 +1,61 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import referee
+
+class FakeEngine(object):
+    ''' The streams of an engine process : the test writes its output in a pipe '''
+    def __init__(self):
+        r, w = os.pipe()
+        self.stdout = os.fdopen(r, 'rb', 0)
+        self.output = os.fdopen(w, 'wb', 0)
+        self.stdin  = open(os.devnull, 'w')
+
+    def close(self):
+        for f in (self.stdout, self.output, self.stdin):
+            f.close()
+
+class TestEngineProtocol(unittest.TestCase):
+    def setUp(self):
+        self.process = FakeEngine()
+        self.engine  = referee.EngineProcess(self.process)
+
+    def tearDown(self):
+        self.process.close()
+
+    def test_lines(self):
+        self.process.output.write('2\n1 2 3\n4 5\n')
+        self.assertEqual(self.engine.next_request(), (2, '1 2 3\n4 5\n'))
+
+    def test_framed(self):
+        block = '3\n0 FACTORY 1\n\n1 TROOP -1 0 1\n'
+        self.process.output.write('4 {}\n{}'.format(len(block), block))
+        self.process.output.write('1 2\nx\n')
+        self.assertEqual(self.engine.next_request(), (4, block))
+        self.assertEqual(self.engine.next_request(), (1, 'x\n'))
+
+    def test_framed_in_pieces(self):
+        block = 'a' * 100000 + '\n'
+        self.process.output.write('1 {}\n'.format(len(block)) + block[:10])
+        # The rest of the block is written while the referee waits for it
+        pid = os.fork()
+        if pid == 0:
+            self.process.output.write(block[10:])
+            os._exit(0)
+        self.assertEqual(self.engine.next_request(), (1, block))
+        os.waitpid(pid, 0)
+
+    def test_dead_bot(self):
+        self.process.output.write('0\n2\na\nb\n')
+        self.assertEqual(self.engine.next_request(), (0, None))
+        self.assertEqual(self.engine.next_request(), (2, 'a\nb\n'))
+
+    def test_end_of_game(self):
+        self.process.output.write('-1\n1 0\n')
+        self.assertEqual(self.engine.next_request(), (-1, '1 0'))
+
+
+if __name__ == '__main__':
+    unittest.main()
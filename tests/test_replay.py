@@ -0,0 +1,80 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import referee
+import replay
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path   = os.path.join(self.folder, 'game.cgr')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def write_game(self, writer):
+        writer.request(0, 2, 'a\nb\n')
+        writer.answer(0, 'MOVE 1 2 3', 0.0125)
+        writer.request(1, 0, None)
+        writer.answer(1, 'WAIT')
+        writer.request(0, 1, 'c\n')
+        writer.answer(0, 'WAIT', 0.001)
+        writer.end('1 0')
+
+    def check_game(self, reader):
+        self.assertEqual(len(reader), 3)
+        bot, code, inputs, answer, elapsed = reader.turn(0)
+        self.assertEqual((bot, code, inputs, answer), (0, 2, 'a\nb\n', 'MOVE 1 2 3'))
+        self.assertAlmostEqual(elapsed, 0.0125, places=6)
+        self.assertEqual(reader.turn(1), (1, 0, None, 'WAIT', None))
+        self.assertEqual(reader.turn(2)[:4], (0, 1, 'c\n', 'WAIT'))
+        self.assertEqual(reader.ranking(), '1 0')
+
+    def test_round_trip(self):
+        writer = referee.ReplayWriter(self.path, {'game': 'GITC', 'seed': 42})
+        self.write_game(writer)
+        writer.close()
+        reader = referee.ReplayReader(self.path)
+        self.assertEqual(reader.meta, {'game': 'GITC', 'seed': 42})
+        self.check_game(reader)
+        reader.close()
+
+    def test_missing_index(self):
+        # The referee died before closing the replay : the index is rebuilt from the records
+        writer = referee.ReplayWriter(self.path, {})
+        self.write_game(writer)
+        writer.f.flush()
+        reader = referee.ReplayReader(self.path)
+        self.check_game(reader)
+        reader.close()
+        writer.f.close()
+
+    def test_not_a_replay(self):
+        with open(self.path, 'wb') as f:
+            f.write('not a replay at all')
+        self.assertRaises(IOError, referee.ReplayReader, self.path)
+
+    def test_permuted_seats(self):
+        # The second game of a mirrored seed : the second bot of the list plays first
+        r = referee.Referee.__new__(referee.Referee)
+        r.record_replays = True
+        r.plugin         = None
+        r.game_name      = 'GITC'
+        r.game_dict      = {'Game bin': 'gitc', 'Arguments': ['$seed']}
+        r.bots_list      = [{'Name': 'first'}, {'Name': 'second'}]
+        writer = r.start_recorder(self.folder + '/', 42, [1, 0])
+        self.write_game(writer)
+        writer.close()
+        reader = referee.ReplayReader(os.path.join(self.folder, 'replay.cgr'))
+        self.assertEqual(reader.meta['bots'], ['second', 'first'])
+        self.assertEqual(replay.seat_name(reader.meta, reader.turn(0)[0]), 'second')
+        self.assertEqual(replay.ranking_names(reader.meta, reader.ranking()), 'first (1), second (0)')
+        reader.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
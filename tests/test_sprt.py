@@ -0,0 +1,60 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import referee
+
+def run_sprt(wins, losses, ties, min_games=0):
+    ''' SPRT with the default parameters of the referee '''
+    p = referee.sprt_defaults
+    return referee.sprt(wins, losses, ties, p['Elo0'], p['Elo1'], p['Alpha'], p['Beta'], min_games)
+
+class TestSprt(unittest.TestCase):
+    def test_bounds(self):
+        res = run_sprt(10, 10, 5)
+        self.assertAlmostEqual(res['lower'], -2.944, places=3)
+        self.assertAlmostEqual(res['upper'], 2.944, places=3)
+
+    def test_even_match(self):
+        res = run_sprt(50, 50, 20)
+        self.assertAlmostEqual(res['elo'], 0.0, places=6)
+        self.assertLess(res['elo_low'], 0.0)
+        self.assertGreater(res['elo_high'], 0.0)
+        self.assertLess(res['llr'], 0.0)
+
+    def test_stronger_bot_accepted(self):
+        res = run_sprt(300, 150, 50)
+        self.assertEqual(res['decision'], 'H1')
+        self.assertGreater(res['elo_low'], 0.0)
+
+    def test_weaker_bot_rejected(self):
+        self.assertEqual(run_sprt(150, 300, 50)['decision'], 'H0')
+
+    def test_short_one_sided_match(self):
+        # 6 wins out of 6 games is not enough evidence with the exact likelihood
+        res = run_sprt(6, 0, 0)
+        self.assertGreater(res['llr'], 0.0)
+        self.assertLess(res['llr'], res['upper'])
+        self.assertIsNone(res['decision'])
+
+    def test_min_games(self):
+        self.assertEqual(run_sprt(300, 150, 50)['decision'], 'H1')
+        self.assertIsNone(run_sprt(300, 150, 50, min_games=501)['decision'])
+
+    def test_llr_grows_with_the_evidence(self):
+        self.assertLess(run_sprt(60, 40, 10)['llr'], run_sprt(120, 80, 20)['llr'])
+
+    def test_constrained_mle(self):
+        freqs = [0.5, 0.2, 0.3]
+        p = referee.constrained_mle(freqs, [1.0, 0.5, 0.0], 0.55)
+        self.assertAlmostEqual(sum(p), 1.0, places=9)
+        self.assertAlmostEqual(p[0] + 0.5 * p[1], 0.55, places=9)
+        # The observed distribution is kept when it already has the mean
+        p = referee.constrained_mle(freqs, [1.0, 0.5, 0.0], 0.6)
+        for q, f in zip(p, freqs):
+            self.assertAlmostEqual(q, f, places=9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import referee
+
+class CountingBot(referee.Bot):
+    ''' A bot without process, counting the reads of its CPU time '''
+    def __init__(self, persistent=False):
+        referee.Bot.__init__(self, 'bot', 'bot', [], 'Test', persistent=persistent)
+        self.cpu_reads = 0
+
+    def cpu_time(self):
+        self.cpu_reads += 1
+        return 0.001 * self.cpu_reads
+
+class TestTimeBasis(unittest.TestCase):
+    def check_turns(self, basis, persistent, cpu_start):
+        r = referee.Referee.__new__(referee.Referee)
+        r.time_basis = basis
+        bots  = [CountingBot(persistent), CountingBot(persistent)]
+        stats = {'startup_cpu': [None, None], 'cpu': [([], []), ([], [])], 'latency': [([], []), ([], [])]}
+        for turn in range(6):
+            r.check_time(0, bots, turn % 2, turn, 0.0, 0.001, cpu_start, stats)
+        return bots, stats
+
+    def test_wall(self):
+        bots, stats = self.check_turns('wall', False, None)
+        self.assertEqual([bot.cpu_reads for bot in bots], [0, 0])
+        self.assertEqual(stats['cpu'], [([], []), ([], [])])
+        self.assertEqual([len(times) for times in stats['latency'][0]], [1, 2])
+
+    def test_wall_persistent(self):
+        # Only the first answer, for the startup time
+        bots, stats = self.check_turns('wall', True, None)
+        self.assertEqual([bot.cpu_reads for bot in bots], [1, 1])
+        self.assertEqual(stats['startup_cpu'], [0.001, 0.001])
+        self.assertEqual(stats['cpu'], [([], []), ([], [])])
+
+    def test_cpu(self):
+        bots, stats = self.check_turns('cpu', False, 0.0)
+        self.assertEqual([bot.cpu_reads for bot in bots], [3, 3])
+        self.assertEqual([len(times) for times in stats['cpu'][1]], [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
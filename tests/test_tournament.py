@@ -0,0 +1,67 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import referee
+
+class TestTrueSkill(unittest.TestCase):
+    def new_rating(self):
+        return [referee.ts_mu, referee.ts_sigma]
+
+    def test_win(self):
+        winner, loser = self.new_rating(), self.new_rating()
+        referee.trueskill_update(winner, loser)
+        self.assertGreater(winner[0], referee.ts_mu)
+        self.assertLess(loser[0], referee.ts_mu)
+        self.assertAlmostEqual(winner[0] - referee.ts_mu, referee.ts_mu - loser[0], places=9)
+        self.assertLess(winner[1], referee.ts_sigma)
+        self.assertLess(loser[1], referee.ts_sigma)
+
+    def test_tie_between_equals(self):
+        a, b = self.new_rating(), self.new_rating()
+        referee.trueskill_update(a, b, tie=True)
+        self.assertAlmostEqual(a[0], referee.ts_mu, places=9)
+        self.assertAlmostEqual(b[0], referee.ts_mu, places=9)
+        self.assertLess(a[1], referee.ts_sigma)
+
+    def test_upset_moves_more(self):
+        favourite, outsider = [30.0, 2.0], [20.0, 2.0]
+        expected = ([30.0, 2.0], [20.0, 2.0])
+        referee.trueskill_update(*expected)
+        referee.trueskill_update(outsider, favourite)
+        self.assertGreater(outsider[0] - 20.0, expected[0][0] - 30.0)
+        self.assertLess(favourite[0], 30.0)
+
+    def test_foregone_loss(self):
+        # The probability of the result underflows, the update stays finite
+        winner, loser = [0.0, 1.0], [100.0, 1.0]
+        referee.trueskill_update(winner, loser)
+        for value in winner + loser:
+            self.assertFalse(value != value or abs(value) == float('inf'))
+        self.assertGreater(winner[0], 0.0)
+
+
+class TestTournament(unittest.TestCase):
+    def test_round_robin(self):
+        t = referee.Tournament({'Games per pairing': 2}, ['a', 'b', 'c'])
+        self.assertEqual(t.length, 6)
+        self.assertEqual(sorted(t.schedule), [[0, 1], [0, 2], [1, 0], [1, 2], [2, 0], [2, 1]])
+
+    def test_gauntlet(self):
+        t = referee.Tournament({'Mode': 'gauntlet', 'Challenger': 'c', 'Games per pairing': 1}, ['a', 'b', 'c'])
+        self.assertEqual(t.schedule, [[2, 0], [2, 1]])
+
+    def test_ladder(self):
+        t = referee.Tournament({}, ['a', 'b', 'c'])
+        for i in range(5):
+            # a beats b and c, b beats c
+            t.update([0, 1], [0, 1])
+            t.update([2, 0], [1, 0])
+            t.update([1, 2], [0, 1])
+        self.assertEqual([row[0] for row in t.ladder()], ['a', 'b', 'c'])
+        self.assertEqual(t.ladder()[0][4:], [10, 100.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import shutil
+import subprocess
+import tempfile
+import unittest
+from distutils.spawn import find_executable
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import referee
+
+# A bot writing on its error stream, then waiting to be killed by the referee
+bot_script = r'''
+import sys, time
+sys.stderr.write('Thinking about turn 1\n')
+sys.stderr.write('no end of line')
+sys.stdout.write('ready\n')
+sys.stdout.flush()
+time.sleep(60)
+'''
+
+class TestZygote(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.script = os.path.join(self.folder, 'bot.py')
+        with open(self.script, 'w') as f:
+            f.write(bot_script)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def killed_bot_stderr(self, process, log):
+        ''' The error stream written by a bot killed by the referee '''
+        self.assertEqual(process.stdout.readline().strip(), 'ready')
+        process.kill()
+        process.wait()
+        process.stdin.close()
+        process.stdout.close()
+        with open(log) as f:
+            return f.read()
+
+    def check_interpreter(self, interpreter):
+        # A bot forked by the zygote loses nothing more than the same bot started by Popen
+        log = os.path.join(self.folder, 'popen.err')
+        with open(log, 'w') as stderr:
+            process = subprocess.Popen([interpreter, self.script], stdin=subprocess.PIPE,
+                                       stdout=subprocess.PIPE, stderr=stderr)
+        expected = self.killed_bot_stderr(process, log)
+        self.assertTrue(expected.startswith('Thinking about turn 1\n'))
+
+        zygote = referee.Zygote(interpreter, self.script)
+        log = os.path.join(self.folder, 'zygote.err')
+        self.assertEqual(self.killed_bot_stderr(zygote.spawn([], log), log), expected)
+        zygote.process.stdin.close()
+        zygote.process.wait()
+
+    def test_stderr_of_killed_bot(self):
+        self.check_interpreter(sys.executable)
+
+    @unittest.skipIf(find_executable('python3') is None, 'no Python 3')
+    def test_stderr_of_killed_bot_python3(self):
+        self.check_interpreter(find_executable('python3'))
+
+
+if __name__ == '__main__':
+    unittest.main()
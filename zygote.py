@@ -0,0 +1,143 @@
+#!/usr/bin/python
+
+# Preloaded interpreter for the Python engines and bots (see "Zygote" in the README). It is started by
+# the referee with the interpreter of the engine or bot and the path to its script :
+#
+#   python zygote.py engines/gitc.py
+#
+# It imports the modules the script imports at its top level, then forks a child for every process the
+# referee asks for. The child runs the script as __main__, with the modules already loaded. The standard
+# streams of the child are FIFOs created by the referee, as Python 2 can't pass descriptors over a
+# socket. Works with Python 2 and 3, as the bots may use either.
+#
+# Every request is one line of JSON on the standard input : {"argv": [...], "stdin": path,
+# "stdout": path, "stderr": path or null, "stderr_fifo": path or null}. The error stream goes to the
+# FIFO if there is one, else to the file, else to /dev/null. The zygote answers with the pid of the
+# child, or with "error <message>". It exits at the end of its standard input.
+import io
+import os
+import sys
+import ast
+import json
+import runpy
+import random
+import signal
+import traceback
+
+def preload(script):
+    ''' Imports the modules imported at the top level of the script, even inside a try, without
+    running it. The failures are ignored : the script meets them again when it runs. '''
+    with open(script) as f:
+        tree = ast.parse(f.read(), script)
+
+    nodes = list(tree.body)
+    while nodes:
+        node = nodes.pop(0)
+        if isinstance(node, ast.Try if hasattr(ast, 'Try') else ast.TryExcept):
+            nodes += node.body
+            continue
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            try:
+                __import__(name)
+            except Exception:
+                pass
+
+def open_output(fd, error_stream):
+    ''' The standard output or error stream of the child, buffered as in a fresh interpreter : the
+    referee kills the bots at the end of a game, so what a buffer still holds is lost. Python 2 writes
+    the error stream right away, Python 3 by lines, and -u (PYTHONUNBUFFERED) writes both streams right away. '''
+    unbuffered = getattr(sys.flags, 'unbuffered', 0) or os.environ.get('PYTHONUNBUFFERED')
+    if sys.version_info[0] < 3:
+        return os.fdopen(fd, 'w', 0 if unbuffered or error_stream else -1)
+    if unbuffered:
+        return io.TextIOWrapper(os.fdopen(fd, 'wb', 0), write_through=True)
+    return os.fdopen(fd, 'w', 1 if error_stream else -1)
+
+def run_child(script, request, control):
+    ''' Runs the script in the forked child, on the streams given by the referee. Never returns. '''
+    code = 1
+    try:
+        for fd in control:
+            os.close(fd)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+
+        # The output FIFOs first : the referee already holds their reading ends
+        fd_out = os.open(request['stdout'], os.O_WRONLY)
+        if request.get('stderr_fifo'):
+            fd_err = os.open(request['stderr_fifo'], os.O_WRONLY)
+        elif request.get('stderr'):
+            fd_err = os.open(request['stderr'], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        else:
+            fd_err = os.open(os.devnull, os.O_WRONLY)
+        fd_in = os.open(request['stdin'], os.O_RDONLY)
+        for fd, target in ((fd_in, 0), (fd_out, 1), (fd_err, 2)):
+            os.dup2(fd, target)
+            os.close(fd)
+        sys.stdin  = os.fdopen(0, 'r')
+        sys.stdout = open_output(1, False)
+        sys.stderr = open_output(2, True)
+
+        # A fresh interpreter would not share its random state with the other children
+        random.seed()
+        if 'numpy' in sys.modules:
+            sys.modules['numpy'].random.seed()
+
+        sys.argv = [script] + request['argv']
+        code = 0
+        runpy.run_path(script, run_name='__main__')
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except Exception:
+            pass
+        os._exit(code)
+
+def serve(script):
+    ''' Forks a child for every request of the referee '''
+    # The requests and answers keep their own descriptors, the modules preloaded can't write on them
+    control_in  = os.dup(0)
+    control_out = os.dup(1)
+    null = os.open(os.devnull, os.O_RDWR)
+    os.dup2(null, 0)
+    os.dup2(2, 1)
+    os.close(null)
+    requests = os.fdopen(control_in, 'r')
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    preload(script)
+    # The children are reaped by the system
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    os.write(control_out, b'ready\n')
+
+    while True:
+        line = requests.readline()
+        if not line:
+            break
+        try:
+            request = json.loads(line)
+            pid = os.fork()
+        except (ValueError, OSError) as e:
+            os.write(control_out, 'error {}\n'.format(e).encode())
+            continue
+        if pid == 0:
+            run_child(script, request, (control_in, control_out))
+        os.write(control_out, '{}\n'.format(pid).encode())
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        sys.stderr.write('Usage : python zygote.py script.py\n')
+        sys.exit(1)
+    serve(sys.argv[1])